@@ -7,6 +7,7 @@ from starlette.middleware.sessions import SessionMiddleware
 
 from codeborn.config import get_config
 from codeborn.database import db
+from codeborn.generators.map import ArmyIndex
 from codeborn.api.auth import init_oauth
 from codeborn.api.endpoints import home, healthcheck, auth, repos, bots
 
@@ -19,6 +20,7 @@ async def lifespan(app: FastAPI):
     """Lifespan context manager for FastAPI app."""
     app.state.config = config
     app.state.oauth = init_oauth(config.github)
+    app.state.army_index = ArmyIndex(config.generators.map)
     async with db(config.database):
         yield
 
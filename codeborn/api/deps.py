@@ -2,6 +2,7 @@ from fastapi import Request
 from authlib.integrations.starlette_client import OAuth
 
 from codeborn.config import CodebornConfig
+from codeborn.generators.map import ArmyIndex
 
 
 def get_oauth(request: Request) -> OAuth:
@@ -12,3 +13,8 @@ def get_oauth(request: Request) -> OAuth:
 def get_config(request: Request) -> CodebornConfig:
     """Get the application configuration from the request."""
     return request.app.state.config
+
+
+def get_army_index(request: Request) -> ArmyIndex:
+    """Get the index of armies used to place new ones from the request."""
+    return request.app.state.army_index
@@ -7,6 +7,7 @@ from tortoise.exceptions import DoesNotExist
 from pydantic import BaseModel
 
 from codeborn.config import CodebornConfig
+from codeborn.database import BOT_CHANGES_CHANNEL, notify
 from codeborn.model import User, GitHubAccount
 from codeborn.api.auth import create_token, get_current_user
 from codeborn.api.repos import refresh_repos
@@ -112,7 +113,10 @@ async def delete_account(
         user_dir = Path(config.agents.base_dir).expanduser() / github_login
         if user_dir.exists():
             shutil.rmtree(user_dir)
+        bot_gids = await user.bots.all().values_list('gid', flat=True)
         await user.delete()
+        for bot_gid in bot_gids:
+            await notify(BOT_CHANGES_CHANNEL, str(bot_gid))
         return await get_logout_response(config)
 
     raise HTTPException(status_code=400, detail="Username doesn't match.")
@@ -5,10 +5,12 @@ from pydantic import BaseModel
 from tortoise.exceptions import DoesNotExist
 
 from codeborn.config import CodebornConfig, get_config
+from codeborn.database import BOT_CHANGES_CHANNEL, notify
 from codeborn.generators.army import starting_army
-from codeborn.generators.map import random_location
+from codeborn.generators.map import ArmyIndex, random_location
 from codeborn.model import Bot, BotMemory, GitHubAccount, GithubRepo, User, Message
 from codeborn.api.auth import get_current_user
+from codeborn.api.deps import get_army_index
 
 
 router = APIRouter()
@@ -33,7 +35,8 @@ async def get_all(user: User = Depends(get_current_user)) -> dict:
 async def create(
     request: BotCreateRequest,
     user: User = Depends(get_current_user),
-    config: CodebornConfig = Depends(get_config)
+    config: CodebornConfig = Depends(get_config),
+    army_index: ArmyIndex = Depends(get_army_index),
 ) -> dict:
     """Create a new bot for the current user."""
     repo = await GithubRepo.get_or_none(gid=request.repo_gid).prefetch_related('github_account')
@@ -51,8 +54,11 @@ async def create(
     memory = BotMemory(bot=bot)
     await memory.save()
 
-    location = await random_location(config.generators.map)
-    await starting_army(bot, location, config.generators.army)
+    index = await army_index.get()
+    location = await random_location(config.generators.map, index)
+    army = await starting_army(bot, location, config.generators.army)
+    index.add(army.gid, location.x, location.y)
+    await notify(BOT_CHANGES_CHANNEL, str(bot.gid))
 
     return await bot.dump(exclude={'armies'})
 
@@ -64,6 +70,7 @@ async def restart(bot_gid: UUID, user: User = Depends(get_current_user)) -> dict
         bot = await Bot.get(user=user, gid=bot_gid)
         bot.restart_requested = True
         await bot.save(update_fields=['restart_requested'])
+        await notify(BOT_CHANGES_CHANNEL, str(bot.gid))
         return await bot.dump(exclude={'armies'})
     except DoesNotExist as e:
         raise HTTPException(status_code=404, detail='Bot not found') from e
@@ -77,6 +84,7 @@ async def disable(bot_gid: UUID, user: User = Depends(get_current_user)) -> dict
         bot.enabled = False
         bot.restart_requested = False
         await bot.save(update_fields=['enabled', 'restart_requested'])
+        await notify(BOT_CHANGES_CHANNEL, str(bot.gid))
         return await bot.dump(exclude={'armies'})
     except DoesNotExist as e:
         raise HTTPException(status_code=404, detail='Bot not found') from e
@@ -90,6 +98,7 @@ async def enable(bot_gid: UUID, user: User = Depends(get_current_user)) -> dict:
         bot.enabled = True
         bot.restart_requested = True
         await bot.save(update_fields=['enabled', 'restart_requested'])
+        await notify(BOT_CHANGES_CHANNEL, str(bot.gid))
         return await bot.dump(exclude={'armies'})
     except DoesNotExist as e:
         raise HTTPException(status_code=404, detail='Bot not found') from e
@@ -6,16 +6,27 @@ import sys
 import threading
 from datetime import datetime, timedelta
 from contextlib import redirect_stdout, redirect_stderr
-from typing import Any
+from typing import Any, BinaryIO
 
 from codeborn.client.game_api import GameApi
 from codeborn.client.io import IORedirect, auto_flush_print, log_exceptions
-from codeborn.client.messages import ApiMessage, MessageType
+from codeborn.client.messages import FRAME_HEADER, ApiMessage, Framing, MessageType
+from codeborn.client.state import apply_state_delta, derive_fields
 
 
 MEMORY_UPLOAD_INTERVAL = 90  # seconds
 
 
+def read_exactly(stream: BinaryIO, size: int) -> bytes:
+    """Read exactly `size` bytes, a pipe may return fewer at once. Raise EOFError if the stream ends sooner."""
+    data = bytearray()
+    while len(data) < size:
+        if not (chunk := stream.read(size - len(data))):
+            raise EOFError
+        data += chunk
+    return bytes(data)
+
+
 class Bot:
     """Base class for user-created Codeborn bots.
 
@@ -32,8 +43,12 @@ class Bot:
 
         self._stdout = sys.stdout
         self._stderr = sys.stderr
+        self._input_framing = Framing.ndjson
+        self._output_framing = Framing.ndjson
+        self._send_lock = threading.Lock()
 
         self.game_state: dict[str, Any] = {}
+        self.game_state_version: int | None = None
         self.game_state_timestamp: datetime = datetime.now()
         self._game_state_ready = threading.Event()
 
@@ -55,20 +70,32 @@ class Bot:
 
     async def _listen(self) -> None:
         """Listen for messages from the engine asynchronously."""
+        self.send(ApiMessage(type=MessageType.handshake, payload={'framings': [Framing.msgpack, Framing.ndjson]}))
+
         while True:
-            if message_bytes := await asyncio.to_thread(sys.stdin.buffer.readline):
-                try:
-                    message = ApiMessage.from_bytes(message_bytes)
-                except Exception:
-                    continue
-            else:
+            try:
+                message = await asyncio.to_thread(self._read_message)
+            except EOFError:
                 break
+            except Exception:
+                continue
 
             if self._handle_engine_message(message):
                 continue
 
             self.on_message(message)
 
+    def _read_message(self) -> ApiMessage:
+        """Read a single message from stdin, raise EOFError at the end of input."""
+        stdin = sys.stdin.buffer
+        if self._input_framing == Framing.msgpack:
+            (length,) = FRAME_HEADER.unpack(read_exactly(stdin, FRAME_HEADER.size))
+            return ApiMessage.from_frame(read_exactly(stdin, length))
+
+        if message_bytes := stdin.readline():
+            return ApiMessage.from_bytes(message_bytes)
+        raise EOFError
+
     async def _upload_memory(self) -> None:
         """Periodically send memory snapshot to the engine."""
         while True:
@@ -88,14 +115,22 @@ class Bot:
     def _handle_engine_message(self, message: ApiMessage) -> bool:
         """Handle built-in messages (not exposed to user code)."""
         match message.type:
+            case MessageType.handshake:
+                if message.payload.get('framing') == Framing.msgpack:
+                    self._input_framing = Framing.msgpack  # The engine switched, switch our output too
+                    with self._send_lock:
+                        self._write(ApiMessage(type=MessageType.handshake, payload={'framing': Framing.msgpack}))
+                        self._output_framing = Framing.msgpack
+                return True
             case MessageType.heartbeat_request:
-                message = ApiMessage(type=MessageType.heartbeat_response)
+                message = ApiMessage(
+                    type=MessageType.heartbeat_response,
+                    payload={'state_version': self.game_state_version}
+                )
                 self.send(message)
                 return True
             case MessageType.state_sync:
-                self.game_state = message.payload
-                self.game_state_timestamp = message.datetime
-                self._game_state_ready.set()
+                self._sync_game_state(message)
                 return True
             case MessageType.memory_download:
                 self.memory = message.payload['data']
@@ -105,6 +140,24 @@ class Bot:
             case _:
                 return False
 
+    def _sync_game_state(self, message: ApiMessage) -> None:
+        """Update game state from a full snapshot or a delta against the current state."""
+        payload = dict(message.payload)
+        version = payload.pop('version', None)
+
+        if 'delta' in payload:
+            if self.game_state_version is None or payload['base_version'] != self.game_state_version:
+                self.game_state_version = None  # Out of sync, the engine sends a full snapshot next time
+                return
+            apply_state_delta(self.game_state, payload['delta'])
+            derive_fields(self.game_state['me'], message.datetime)
+        else:
+            self.game_state = payload
+
+        self.game_state_version = version
+        self.game_state_timestamp = message.datetime
+        self._game_state_ready.set()
+
     def start(self) -> None:
         """Entry point for user code."""
         with contextlib.suppress(KeyboardInterrupt):
@@ -141,7 +194,12 @@ class Bot:
 
     def send(self, message: ApiMessage) -> None:
         """Send a message to the engine."""
-        self._stdout.buffer.write(message.to_bytes())
+        with self._send_lock:
+            self._write(message)
+
+    def _write(self, message: ApiMessage) -> None:
+        """Write a message to stdout using the current framing."""
+        self._stdout.buffer.write(message.encode(self._output_framing))
         self._stdout.buffer.flush()
 
     def log_debug(self, text: str) -> None:
@@ -1,6 +1,7 @@
 
 from __future__ import annotations
 
+import struct
 from datetime import datetime, timezone
 from enum import StrEnum
 from typing import Any
@@ -30,6 +31,23 @@ class MessageType(StrEnum):
     command = 'command'
     command_result = 'command_result'
 
+    # Connection
+    handshake = 'handshake'
+
+
+class Framing(StrEnum):
+    """Framings of messages on the engine-agent pipes.
+
+    Both sides start with `ndjson`. A side switches its output to another framing after
+    sending a `handshake` message with the new `framing` in its payload.
+    """
+
+    ndjson = 'ndjson'  # Newline-delimited JSON
+    msgpack = 'msgpack'  # MessagePack, each frame prefixed by its length as a 4-byte big-endian integer
+
+
+FRAME_HEADER = struct.Struct('>I')
+
 
 class ApiMessage(msgspec.Struct, kw_only=True, frozen=True):
     """A message sent between the Codeborn engine and agents."""
@@ -38,6 +56,7 @@ class ApiMessage(msgspec.Struct, kw_only=True, frozen=True):
     gid: UUID = msgspec.field(default_factory=uuid4)
     payload: dict[str, Any] = msgspec.field(default_factory=dict)
     datetime: datetime = msgspec.field(default_factory=lambda: datetime.now(timezone.utc))
+    response_to: UUID | None = None
 
     @classmethod
     def from_bytes(cls, raw: bytes) -> ApiMessage:
@@ -47,3 +66,17 @@ class ApiMessage(msgspec.Struct, kw_only=True, frozen=True):
     def to_bytes(self) -> bytes:
         """Encode the Message instance into a JSON string."""
         return msgspec.json.encode(self) + b'\n'
+
+    @classmethod
+    def from_frame(cls, body: bytes) -> ApiMessage:
+        """Decode a MessagePack frame body into a Message instance."""
+        return msgspec.msgpack.decode(body, type=cls)
+
+    def to_frame(self) -> bytes:
+        """Encode the Message instance into a length-prefixed MessagePack frame."""
+        body = msgspec.msgpack.encode(self)
+        return FRAME_HEADER.pack(len(body)) + body
+
+    def encode(self, framing: Framing) -> bytes:
+        """Encode the Message instance using a given framing."""
+        return self.to_frame() if framing == Framing.msgpack else self.to_bytes()
@@ -0,0 +1,20 @@
+"""Entry point of a pre-started agent container waiting in the engine's pool.
+
+The client framework is imported before the container is assigned to a bot. Once it is,
+the engine copies the bot's package into the container and writes its module name as the
+first line of stdin. The module then runs the same way as with `python -m`.
+"""
+import runpy
+import sys
+
+import codeborn.client.bot  # noqa: F401
+
+
+def main() -> None:
+    """Wait for a bot module name and run it."""
+    if module_name := sys.stdin.buffer.readline().decode().strip():
+        runpy.run_module(module_name, run_name='__main__', alter_sys=True)
+
+
+if __name__ == '__main__':
+    main()
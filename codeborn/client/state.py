@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+# Fields of `me` derived from a timestamp field, deltas don't carry them
+DERIVED_FIELDS = {
+    'heartbeat_age_sec': 'last_heartbeat',
+    'uptime_sec': 'start_at',
+}
+
+
+def apply_state_delta(game_state: dict[str, Any], delta: dict[str, Any]) -> None:
+    """Apply a structural `state_sync` delta to a game state in place."""
+    me = game_state['me']
+    me.update(delta['me'])
+
+    armies = {army['gid']: army for army in me['armies']}
+
+    removed_units = set(delta['units']['removed'])
+    for army in armies.values():
+        army['units'] = [unit for unit in army['units'] if unit['gid'] not in removed_units]
+
+    for army_gid in delta['armies']['removed']:
+        armies.pop(army_gid, None)
+
+    for army in delta['armies']['added']:
+        armies[army['gid']] = army
+
+    for army in delta['armies']['changed']:
+        armies[army['gid']].update(army)
+
+    for unit in delta['units']['added'] + delta['units']['changed']:
+        unit = dict(unit)
+        army_gid = unit.pop('army_gid')
+        for army in armies.values():
+            army['units'] = [u for u in army['units'] if u['gid'] != unit['gid']]
+        armies[army_gid]['units'].append(unit)
+
+    me['armies'] = list(armies.values())
+
+    if 'visible' in delta:
+        game_state['visible'] = delta['visible']
+
+
+def derive_fields(me: dict[str, Any], now: datetime) -> None:
+    """Update fields of `me` derived from timestamps to their values at a given time."""
+    for field, timestamp in DERIVED_FIELDS.items():
+        if me.get(timestamp):
+            me[field] = (now - datetime.fromisoformat(me[timestamp])).total_seconds()
+        else:
+            me[field] = None
@@ -0,0 +1,110 @@
+"""Fork server running bots on the engine host.
+
+The zygote imports the client framework once and forks a child for every bot. The
+engine connects to its unix socket, sends a JSON request together with the child's
+stdin, stdout and stderr file descriptors, and receives the child's pid. The
+connection stays open until the child exits, then its exit code is sent.
+"""
+import json
+import os
+import resource
+import runpy
+import selectors
+import signal
+import socket
+import sys
+import traceback
+
+import msgspec  # noqa: F401
+import codeborn.client.bot  # noqa: F401
+
+
+MAX_REQUEST_SIZE = 64 * 1024
+
+
+def run_child(request: dict, fds: list[int]) -> None:
+    """Run a bot module in a forked child, never returns."""
+    code = 1
+    try:
+        os.setsid()
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+            os.close(fd)
+        sys.stdin = open(0, 'r', closefd=False)
+        sys.stdout = open(1, 'w', closefd=False)
+        sys.stderr = open(2, 'w', closefd=False)
+
+        for name, limit in request['limits'].items():
+            resource.setrlimit(getattr(resource, name), (limit, limit))
+
+        os.chdir(request['cwd'])
+        sys.path.insert(0, request['cwd'])
+        sys.argv = [request['module']]
+        runpy.run_module(request['module'], run_name='__main__', alter_sys=True)
+        code = 0
+    except SystemExit as exc:
+        code = exc.code if isinstance(exc.code, int) else 1
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except Exception:
+                pass
+        os._exit(code)
+
+
+def serve(socket_path: str) -> None:
+    """Accept spawn requests until stdin, a pipe from the engine, is closed."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Stopped by the engine, after it stops the children
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen()
+
+    selector = selectors.DefaultSelector()
+    selector.register(server, selectors.EVENT_READ, 'accept')
+    selector.register(sys.stdin, selectors.EVENT_READ, 'engine')
+    children: dict[int, tuple[int, socket.socket]] = {}
+
+    while True:
+        for key, _ in selector.select():
+            if key.data == 'engine':
+                return  # The engine exited
+
+            if key.data == 'accept':
+                connection, _ = server.accept()
+                message, fds, _, _ = socket.recv_fds(connection, MAX_REQUEST_SIZE, 3)
+
+                pid = os.fork()
+                if pid == 0:
+                    selector.close()
+                    server.close()
+                    connection.close()
+                    for _, child_connection in children.values():
+                        child_connection.close()
+                    run_child(json.loads(message), fds)
+
+                for fd in fds:
+                    os.close(fd)
+                connection.sendall(f'{pid}\n'.encode())
+                pidfd = os.pidfd_open(pid)
+                children[pid] = (pidfd, connection)
+                selector.register(pidfd, selectors.EVENT_READ, pid)
+            else:
+                pidfd, connection = children.pop(key.data)
+                selector.unregister(pidfd)
+                os.close(pidfd)
+                _, status = os.waitpid(key.data, 0)
+                try:
+                    connection.sendall(f'{os.waitstatus_to_exitcode(status)}\n'.encode())
+                except OSError:
+                    pass
+                connection.close()
+
+
+if __name__ == '__main__':
+    serve(sys.argv[1])
@@ -16,6 +16,7 @@ from pydantic import BaseModel, EmailStr, Field, HttpUrl, PositiveInt, IPvAnyAdd
 from pydantic.fields import FieldInfo
 from ansible.parsing.vault import VaultLib, VaultSecret
 
+from codeborn.client.messages import MessageType
 from codeborn.model import TerrainType, UnitType
 
 if TYPE_CHECKING:
@@ -28,6 +29,8 @@ ENV_DELIMITER = '__'
 
 PositiveFloat = Annotated[float, Field(gt=0)]
 NonNegativeFloat = Annotated[float, Field(ge=0)]
+NonNegativeInt = Annotated[int, Field(ge=0)]
+UnitFloat = Annotated[float, Field(ge=0, le=1)]
 
 DomainName = Annotated[str, Field(pattern=r"^[a-z\d]([a-z\d-]{0,61}[a-z\d])?(?:\.[a-z\d-]{1,63})*$")]
 CookieDomain = Annotated[str, Field(pattern=r"^\.?[a-z\d]([a-z\d-]{0,61}[a-z\d])?(?:\.[a-z\d-]{1,63})*$")]
@@ -137,18 +140,164 @@ class AgentsHeartbeatConfig(BaseModel):
 
     interval: PositiveFloat
     timeout: PositiveFloat
+    persist_interval: PositiveFloat
 
 
 class AgentsRestartConfig(BaseModel):
     """Agent restart policy configuration."""
 
     interval: PositiveFloat
+    concurrency: PositiveInt
+    backoff_base: PositiveFloat
+    backoff_max: PositiveFloat
+    backoff_jitter: UnitFloat
+    stable_after: PositiveFloat
 
 
 class StateUpdateConfig(BaseModel):
     """Agents state update policy configuration."""
 
     interval: PositiveFloat
+    vision_radius: NonNegativeInt  # Moves from an army within which terrain and foreign armies are visible
+
+
+class WorldPersistenceConfig(BaseModel):
+    """Configuration of persisting the in-memory world to the database."""
+
+    interval: PositiveFloat
+
+
+class MapReloadConfig(BaseModel):
+    """Configuration of reloading the terrain grid when the map changes."""
+
+    interval: PositiveFloat  # Seconds between attempts to listen for map changes
+
+
+class MessageSinkConfig(BaseModel):
+    """Configuration of buffered persistence of inbound messages."""
+
+    batch_size: PositiveInt
+    flush_interval: PositiveFloat
+    max_size: PositiveInt
+    retry_max: PositiveFloat
+    droppable_types: set[MessageType] = set()
+
+
+class MessageRetentionConfig(BaseModel):
+    """Configuration of message partitions and their retention."""
+
+    interval: PositiveFloat
+    premake_days: NonNegativeInt
+    default_retention: PositiveFloat
+    retention: dict[MessageType, PositiveFloat] = {}
+
+
+class MetricsConfig(BaseModel):
+    """Engine metrics configuration."""
+
+    interval: PositiveFloat
+
+
+class AgentsFanoutConfig(BaseModel):
+    """Configuration of messages sent to all agents at once."""
+
+    concurrency: PositiveInt
+    send_timeout: PositiveFloat  # Agents whose stdin doesn't drain a write for longer are skipped
+
+
+class InboxOverflowPolicy(enum.StrEnum):
+    """What to do with a message read from an agent when its inbox is full."""
+
+    block = 'block'  # Stop reading the agent's output until there is free space
+    drop_newest = 'drop_newest'
+    drop_oldest = 'drop_oldest'
+
+
+class AgentsInboxConfig(BaseModel):
+    """Configuration of queues of messages read from agents and waiting to be handled."""
+
+    max_size: PositiveInt
+    overflow: InboxOverflowPolicy
+
+
+class AgentsTransportConfig(BaseModel):
+    """Configuration of framing of messages exchanged with agents."""
+
+    binary_framing: bool
+    handshake_timeout: PositiveFloat
+    max_frame_size: PositiveInt
+
+
+class AgentsPoolConfig(BaseModel):
+    """Configuration of the pool of pre-started agent containers."""
+
+    size: NonNegativeInt  # 0 disables the pool
+    idle_ttl: PositiveFloat
+    interval: PositiveFloat
+
+
+class AgentsForkServerConfig(BaseModel):
+    """Resource limits of agents forked by the fork server runtime."""
+
+    memory_limit: PositiveInt  # Bytes of address space
+    cpu_time_limit: PositiveInt  # Seconds
+    open_files_limit: PositiveInt
+
+
+class BudgetAction(enum.StrEnum):
+    """What to do with an agent using more resources than its budget."""
+
+    log = 'log'
+    throttle = 'throttle'  # Suspend it for `throttle_duration`
+    restart = 'restart'
+
+
+class ResourceSamplingConfig(BaseModel):
+    """Configuration of sampling resource usage of agents."""
+
+    interval: PositiveFloat
+    window: PositiveInt  # Number of samples averaged
+    cpu_budget: PositiveFloat | None = None  # Percent of a single CPU
+    memory_budget: PositiveInt | None = None  # Bytes
+    budget_action: BudgetAction = BudgetAction.log
+    throttle_duration: PositiveFloat
+
+
+class AgentsOutboxConfig(BaseModel):
+    """Configuration of queues of messages waiting to be written to agents."""
+
+    max_size: PositiveInt
+
+
+class RateLimitConfig(BaseModel):
+    """Token bucket refilled at `rate` tokens per second and holding at most `burst` tokens."""
+
+    rate: PositiveFloat
+    burst: PositiveInt
+
+
+class LoadSheddingConfig(BaseModel):
+    """Thresholds above which commands of all bots are rejected."""
+
+    max_sink_fill: UnitFloat  # Fraction of `message_sink.max_size`
+    max_pool_usage: UnitFloat  # Fraction of busy database connections
+
+
+class AgentsRateLimitConfig(BaseModel):
+    """Configuration of limits of commands sent by bots."""
+
+    per_bot: RateLimitConfig
+    per_command: dict[str, RateLimitConfig] = {}
+    load_shedding: LoadSheddingConfig
+
+
+class CommandTickConfig(BaseModel):
+    """Configuration of resolving commands in batches, once per tick."""
+
+    enabled: bool  # Otherwise commands are handled as they arrive
+    interval: PositiveFloat
+    max_held: PositiveInt
+    max_failed_flushes: PositiveInt
 
 
 class MemoryUpdateConfig(BaseModel):
@@ -169,6 +318,20 @@ class AgentsConfig(BaseModel):
     heartbeat: AgentsHeartbeatConfig
     state_update: StateUpdateConfig
     memory_update: MemoryUpdateConfig
+    fanout: AgentsFanoutConfig
+    pool: AgentsPoolConfig
+    forkserver: AgentsForkServerConfig
+    transport: AgentsTransportConfig
+    inbox: AgentsInboxConfig
+    outbox: AgentsOutboxConfig
+    rate_limit: AgentsRateLimitConfig
+    command_tick: CommandTickConfig
+    world_persistence: WorldPersistenceConfig
+    map_reload: MapReloadConfig
+    message_sink: MessageSinkConfig
+    message_retention: MessageRetentionConfig
+    metrics: MetricsConfig
+    resources: ResourceSamplingConfig
 
     @property
     def runtime_class(self) -> type[BotAgent]:
@@ -254,12 +417,20 @@ class UnitConfig(BaseModel):
     stamina_recovery: PositiveFloat
 
 
+class MapNoise(enum.StrEnum):
+    """Implementation of noise used by the map generator."""
+
+    fractal = 'fractal'  # Vectorized, honours octaves, persistence and lacunarity
+    legacy = 'legacy'  # Per-pixel `perlin_noise`, kept to compare maps
+
+
 class MapGeneratorConfig(BaseModel):
     """Map generator configuration."""
 
     width: PositiveInt
     height: PositiveInt
     chunk_size: PositiveInt
+    index_ttl: PositiveFloat  # Seconds until the index of armies used to place new ones is loaded again
     seed: int = random.randrange(10 ** 16)
     elevation_scale: PositiveInt
     elevation_contrast_enhancement: float = 1.0
@@ -268,6 +439,8 @@ class MapGeneratorConfig(BaseModel):
     octaves: PositiveInt
     persistence: PositiveFloat
     lacunarity: PositiveFloat
+    noise: MapNoise = MapNoise.fractal
+    batch_rows: PositiveInt  # Map rows written to the database at once
     ranges: dict[TerrainType, dict[str, tuple[NonNegativeFloat, NonNegativeFloat]]]
 
 
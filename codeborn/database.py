@@ -1,6 +1,8 @@
 from contextlib import asynccontextmanager
-from typing import AsyncIterator
+from typing import AsyncIterator, Callable
 
+import asyncpg
+from structlog import BoundLogger
 from tortoise import Tortoise
 
 from codeborn.config import DatabaseConfig, get_config
@@ -9,6 +11,24 @@ from codeborn.logger import get_logger
 
 AERICH_CONFIG = get_config().database.tortoise_config  # For Aerich migrations
 
+BOT_CHANGES_CHANNEL = 'bot_changes'
+MAP_CHANGES_CHANNEL = 'map_changes'
+
+# The message table as migrations create it, Tortoise can't generate a partitioned table
+PARTITIONED_MESSAGE_TABLE = '''
+DROP TABLE "message";
+CREATE TABLE "message" (
+    "gid" UUID NOT NULL,
+    "type" VARCHAR(18) NOT NULL,
+    "datetime" TIMESTAMPTZ NOT NULL,
+    "response_to" UUID,
+    "payload" JSONB NOT NULL,
+    "bot_id" UUID NOT NULL REFERENCES "bot" ("gid") ON DELETE CASCADE,
+    PRIMARY KEY ("gid", "datetime", "type")
+) PARTITION BY RANGE ("datetime");
+CREATE INDEX "idx_message_bot_id_datetime" ON "message" ("bot_id", "datetime" DESC);
+'''
+
 
 async def init_db(config: DatabaseConfig) -> None:
     """Initialize the database connection."""
@@ -18,6 +38,28 @@ async def init_db(config: DatabaseConfig) -> None:
     if config.init_schema:
         logger.info('Generating database schema.')
         await Tortoise.generate_schemas()
+        await partition_messages(logger)
+
+
+async def partition_messages(logger: BoundLogger) -> None:
+    """Replace an unpartitioned message table made by `generate_schemas` by a partitioned one.
+
+    Partitions are created by the engine's message retention. A table already holding
+    messages is not touched, it has to be migrated.
+    """
+    connection = Tortoise.get_connection('default')
+    _, rows = await connection.execute_query(
+        '''SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = '"message"'::regclass)'''
+    )
+    if rows[0][0]:
+        return
+
+    _, rows = await connection.execute_query('SELECT EXISTS (SELECT 1 FROM "message")')
+    if rows[0][0]:
+        raise RuntimeError('Table "message" is not partitioned, migrate it by `aerich upgrade`.')
+
+    logger.warning('Partitioning the empty message table.')
+    await connection.execute_script(PARTITIONED_MESSAGE_TABLE)
 
 
 async def close_db() -> None:
@@ -35,3 +77,45 @@ async def db(config: DatabaseConfig) -> AsyncIterator[None]:
         yield
     finally:
         await close_db()
+
+
+def pool_usage() -> float | None:
+    """Get the fraction of busy connections of the default connection pool, None until the pool is created."""
+    pool: asyncpg.Pool | None = getattr(Tortoise.get_connection('default'), '_pool', None)
+    if pool is None:
+        return None
+    return 1 - pool.get_idle_size() / pool.get_max_size()
+
+
+async def notify(channel: str, payload: str) -> None:
+    """Send a notification to all connections listening on a channel."""
+    await Tortoise.get_connection('default').execute_query('SELECT pg_notify($1, $2)', [channel, payload])
+
+
+@asynccontextmanager
+async def connect(config: DatabaseConfig) -> AsyncIterator[asyncpg.Connection]:
+    """Async context manager for a dedicated asyncpg connection outside of the ORM pool."""
+    connection = await asyncpg.connect(
+        host=str(config.host),
+        port=config.port,
+        user=config.user,
+        password=config.password,
+        database=config.name,
+        timeout=config.timeout,
+    )
+    try:
+        yield connection
+    finally:
+        await connection.close()
+
+
+@asynccontextmanager
+async def listen(
+    config: DatabaseConfig,
+    channel: str,
+    on_notification: Callable[[str], None]
+) -> AsyncIterator[asyncpg.Connection]:
+    """Async context manager listening for notifications on a dedicated connection."""
+    async with connect(config) as connection:
+        await connection.add_listener(channel, lambda _conn, _pid, _channel, payload: on_notification(payload))
+        yield connection
@@ -1,39 +1,85 @@
 import asyncio
 
 from codeborn.client.messages import MessageType
-from codeborn.database import db
-from codeborn.config import CodebornConfig, get_config
+from codeborn.database import db, pool_usage
+from codeborn.config import AgentsRateLimitConfig, CodebornConfig, CommandTickConfig, get_config
 from codeborn.logger import get_logger, init_logging
-from codeborn.model import BotMemory, Message
+from codeborn.client.messages import ApiMessage
+from codeborn.model import BotMemory
 from codeborn.engine import lifecycle
 from codeborn.engine.agents.registry import AgentRegistry
 from codeborn.engine.agents import BotAgent
-from codeborn.engine.commands import Router
+from codeborn.engine.changes import BotChangeFeed
+from codeborn.engine.commands import Router, error_response
+from codeborn.engine.metrics import get_metrics
+from codeborn.engine.ratelimit import RateLimiter
+from codeborn.engine.sink import MessageSink
+from codeborn.engine.world import World
 
 
 class MessageDispatcher:
     """Manager of bot messages."""
 
-    def __init__(self, router: Router) -> None:
+    def __init__(
+        self,
+        router: Router,
+        world: World,
+        sink: MessageSink,
+        rate_limit: AgentsRateLimitConfig,
+        command_tick: CommandTickConfig,
+    ) -> None:
         self._logger = get_logger(component='message_dispatcher')
         self._router = router
+        self._world = world
+        self._sink = sink
+        self._command_tick = command_tick
+        self._rate_limit = rate_limit
+        self._rate_limiter = RateLimiter(rate_limit)
+        self._metrics = get_metrics()
 
-    async def _log_heartbeat(self, agent: BotAgent, message: Message) -> None:
-        """Log a heartbeat message to the database."""
-        await agent.bot.refresh_from_db()
-        agent.bot.last_heartbeat = message.datetime
-        await agent.bot.save(update_fields=['last_heartbeat'])
+    async def _log_heartbeat(self, agent: BotAgent, message: ApiMessage) -> None:
+        """Record a heartbeat in memory, it's written to the database by `lifecycle.persist_heartbeats`."""
+        if message.payload.get('state_version') is None:
+            agent.state_sync.reset()  # Bot lost track of the state, send a full snapshot next time
 
-    async def _save_memory(self, agent: BotAgent, message: Message) -> None:
+        agent.record_heartbeat(message.datetime)
+
+    async def _save_memory(self, agent: BotAgent, message: ApiMessage) -> None:
         """Save memory upload to the database."""
         await BotMemory.filter(bot=agent.bot).update(
             data=message.payload['data'],
             updated_at=message.datetime
         )
 
-    async def on_message(self, agent: BotAgent, message: Message) -> None:
+    def _is_overloaded(self) -> bool:
+        """Check if the engine should shed load because buffers or the database pool are saturated."""
+        config = self._rate_limit.load_shedding
+        if self._sink.fill >= config.max_sink_fill:
+            return True
+        return (usage := pool_usage()) is not None and usage >= config.max_pool_usage
+
+    async def _reject_command(self, agent: BotAgent, message: ApiMessage) -> bool:
+        """Reply with an error to a command over a rate limit or sent while overloaded, without running it."""
+        command = message.payload.get('command')
+        if self._is_overloaded():
+            reason = 'Engine overloaded'
+            self._metrics.increment('commands.shed', command=command)
+        elif not self._rate_limiter.allow(agent.bot.gid, command, asyncio.get_running_loop().time()):
+            reason = 'Rate limit exceeded'
+            self._metrics.increment('agent.commands.throttled', bot_gid=agent.bot.gid, command=command)
+        else:
+            return False
+
+        await agent.send_message(ApiMessage(
+            type=MessageType.command_result,
+            payload=error_response(reason, command=command),
+            response_to=message.gid,
+        ))
+        return True
+
+    async def on_message(self, agent: BotAgent, message: ApiMessage) -> None:
         """Handle messages received from bots."""
-        await message.save()
+        await self._sink.put(agent.bot.gid, message)
 
         match message.type:
             case MessageType.heartbeat_response:
@@ -45,7 +91,12 @@ class MessageDispatcher:
                 await self._save_memory(agent, message)
             case MessageType.command:
                 self._logger.debug('Received command', bot_gid=agent.bot.gid, payload=message.payload)
-                matched = await self._router.match(agent, message)
+                if await self._reject_command(agent, message):
+                    return
+                if self._command_tick.enabled:
+                    matched = self._router.enqueue(agent, message)  # Resolved by `lifecycle.command_tick`
+                else:
+                    matched = await self._router.match(agent, message, self._world)
                 if not matched:
                     self._logger.warning('No command handler matched.', bot_gid=agent.bot.gid, payload=message.payload)
             case _:
@@ -56,21 +107,52 @@ async def main(config: CodebornConfig) -> None:
     """Main entry point for the engine."""
     logger = get_logger(component='main')
 
-    async with db(config.database):
+    async with db(config.database), config.agents.runtime_class.runtime(config.agents):
         from codeborn.engine.commands.army import router as army_router  # import after logger init
-        message_dispatcher = MessageDispatcher(army_router)
+        world = World(config.generators.map.chunk_size)
+        await world.load()
+
+        message_sink = MessageSink(config.agents.message_sink)
+        message_dispatcher = MessageDispatcher(
+            army_router, world, message_sink, config.agents.rate_limit, config.agents.command_tick
+        )
         agent_registry = AgentRegistry(config.agents, message_dispatcher.on_message)
+        bot_changes = BotChangeFeed(config.database, config.agents.restart)
 
         try:
             async with asyncio.TaskGroup() as tg:
-                tg.create_task(lifecycle.restart(config.agents.restart, agent_registry))
-                tg.create_task(lifecycle.heartbeat(config.agents.heartbeat, agent_registry))
-                tg.create_task(lifecycle.state_update(config.agents.state_update, agent_registry))
+                tg.create_task(bot_changes.listen())
+                tg.create_task(bot_changes.poll())
+                tg.create_task(lifecycle.restart(
+                    config.agents.restart, config.agents.state_update, agent_registry, world, bot_changes
+                ))
+                tg.create_task(
+                    lifecycle.heartbeat(config.agents.heartbeat, config.agents.fanout, agent_registry, bot_changes)
+                )
+                tg.create_task(lifecycle.persist_heartbeats(config.agents.heartbeat, agent_registry))
+                tg.create_task(
+                    lifecycle.state_update(config.agents.state_update, config.agents.fanout, agent_registry, world)
+                )
+                tg.create_task(lifecycle.persist_world(config.agents.world_persistence, world))
+                tg.create_task(lifecycle.reload_map(config.database, config.agents.map_reload, world))
+                if config.agents.command_tick.enabled:
+                    tg.create_task(lifecycle.command_tick(config.agents.command_tick, army_router, world))
+                tg.create_task(lifecycle.sample_resources(config.agents.resources, agent_registry, bot_changes))
+                tg.create_task(lifecycle.report_metrics(config.agents.metrics))
+                tg.create_task(lifecycle.message_retention(config.agents.message_retention))
+                tg.create_task(message_sink.run())
         except Exception as exc:
             logger.exception('TaskGroup crashed cancelled', exc_info=exc)
         finally:
             logger.info('Stopping all agents')
+            await lifecycle.save_heartbeats(agent_registry)
             await agent_registry.remove_all()
+            logger.info('Persisting world')
+            await world.flush()
+            try:
+                await message_sink.flush()
+            except Exception as exc:
+                logger.exception('Persisting messages failed.', exc_info=exc)
 
 
 if __name__ == '__main__':
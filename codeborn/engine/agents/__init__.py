@@ -4,11 +4,20 @@ import abc
 import datetime
 import asyncio
 import contextlib
+import signal
 from collections.abc import Awaitable
-from typing import Callable, TYPE_CHECKING
+from typing import AsyncIterator, Callable, Protocol, TYPE_CHECKING
+
+import msgspec
 
 from codeborn.logger import get_logger
-from codeborn.model import Message, Bot
+from codeborn.model import Bot
+from codeborn.client.messages import FRAME_HEADER, ApiMessage, Framing, MessageType
+from codeborn.config import InboxOverflowPolicy
+from codeborn.engine.agents.outbox import Outbox
+from codeborn.engine.metrics import get_metrics
+from codeborn.engine.resources import ProcReader, ResourceReader
+from codeborn.engine.state import StateSyncTracker
 
 if TYPE_CHECKING:
     from codeborn.config import AgentsConfig
@@ -16,6 +25,30 @@ if TYPE_CHECKING:
 
 class BotAgent(abc.ABC):
     bot: Bot
+    state_sync: StateSyncTracker
+    last_heartbeat: datetime.datetime
+    heartbeat_persisted: bool
+
+    @property
+    def heartbeat_age(self) -> datetime.timedelta:
+        """Get the age of the last heartbeat kept in memory."""
+        return datetime.datetime.now(datetime.timezone.utc) - self.last_heartbeat
+
+    def record_heartbeat(self, at: datetime.datetime) -> None:
+        """Remember a heartbeat response, it's persisted later in a batch."""
+        self.last_heartbeat = at
+        self.heartbeat_persisted = False
+
+    @property
+    def slow_consumer(self) -> bool:
+        """Check if the agent doesn't keep up with messages sent to it."""
+        return False
+
+    @classmethod
+    @contextlib.asynccontextmanager
+    async def runtime(cls, config: AgentsConfig) -> AsyncIterator[None]:
+        """Set up resources shared by all agents of this type for the lifetime of the engine."""
+        yield
 
     @property
     @abc.abstractmethod
@@ -23,16 +56,54 @@ class BotAgent(abc.ABC):
         """Check if the agent is alive."""
 
     @abc.abstractmethod
-    async def start(self, on_message: Callable[[BotAgent, Message], Awaitable[None]]) -> None:
+    async def start(self, on_message: Callable[[BotAgent, ApiMessage], Awaitable[None]]) -> None:
         """Start the agent."""
 
     @abc.abstractmethod
     async def stop(self) -> None:
         """Stop the agent."""
 
+    async def resource_reader(self) -> ResourceReader | None:
+        """Get a reader of resource counters of the agent, None if they are not available."""
+        return None
+
+    async def throttle(self, duration: float) -> None:
+        """Suspend the agent for a given number of seconds."""
+
     @abc.abstractmethod
-    async def send_message(self, message: Message) -> None:
-        """Send a message to the agent."""
+    async def send_message(self, message: ApiMessage) -> None:
+        """Send a message to the agent.
+
+        Payload of a `state_sync` message is the full game state, it's encoded by `state_sync`
+        when the message is written, so replaced messages don't affect the encoded deltas.
+        """
+
+
+class AgentProcess(Protocol):
+    """Interface of a bot process used by agents, implemented by `asyncio.subprocess.Process`."""
+
+    @property
+    def pid(self) -> int: ...
+
+    @property
+    def returncode(self) -> int | None: ...
+
+    @property
+    def stdin(self) -> asyncio.StreamWriter | None: ...
+
+    @property
+    def stdout(self) -> asyncio.StreamReader | None: ...
+
+    @property
+    def stderr(self) -> asyncio.StreamReader | None: ...
+
+    async def wait(self) -> int: ...
+
+    def send_signal(self, sig: int) -> None: ...
+
+    def terminate(self) -> None: ...
+
+    def kill(self) -> None: ...
 
 
 class AsyncProcessAgent(BotAgent, abc.ABC):
@@ -41,62 +112,207 @@ class AsyncProcessAgent(BotAgent, abc.ABC):
     def __init__(self, bot: Bot, config: AgentsConfig) -> None:
         self.bot = bot
         self.config = config
+        self.state_sync = StateSyncTracker()
 
         self.last_heartbeat = datetime.datetime.now(datetime.timezone.utc)
+        self.heartbeat_persisted = True  # Nothing to persist until the first heartbeat response
 
         self._logger = get_logger(bot_gid=str(self.bot.gid))
-        self._process: asyncio.subprocess.Process | None = None
+        self._process: AgentProcess | None = None
         self._stdout_task: asyncio.Task | None = None
         self._stderr_task: asyncio.Task | None = None
+        self._stdin_task: asyncio.Task | None = None
+        self._inbox_task: asyncio.Task | None = None
+        self._resume_task: asyncio.Task | None = None
+        self._draining_since: float | None = None
+        self._outbox = Outbox(config.outbox, bot.gid)
+        self._inbox: asyncio.Queue[ApiMessage] = asyncio.Queue(maxsize=config.inbox.max_size)
+        self._input_framing = Framing.ndjson
+        self._output_framing = Framing.ndjson
+        self._binary_framing_offered = asyncio.Event()
+
+        self._metrics = get_metrics()
+        self._metrics.gauge('agent.inbox.depth', self._inbox.qsize, bot_gid=bot.gid)
 
     @property
     def is_alive(self) -> bool:
         return self._process is not None and self._process.returncode is None
 
-    async def send_message(self, message: Message) -> None:
-        """Send a message to the agent process."""
-        if self._process and self._process.stdin:
+    @property
+    def slow_consumer(self) -> bool:
+        """Check if the last write to stdin hasn't drained within `fanout.send_timeout`."""
+        return (
+            self._draining_since is not None
+            and asyncio.get_running_loop().time() - self._draining_since > self.config.fanout.send_timeout
+        )
+
+    def _start_io(self, on_message: Callable[[BotAgent, ApiMessage], Awaitable[None]]) -> None:
+        """Start tasks reading and writing pipes of the started process and handling its messages."""
+        self._stdout_task = asyncio.create_task(self._listen_stdout())
+        self._stderr_task = asyncio.create_task(self._listen_stderr())
+        self._stdin_task = asyncio.create_task(self._write_stdin())
+        self._inbox_task = asyncio.create_task(self._handle_inbox(on_message))
+
+    async def send_message(self, message: ApiMessage) -> None:
+        """Queue a message for the agent process, it's written by the stdin writer."""
+        self._outbox.put(message)
+
+    async def _write_stdin(self) -> None:
+        """Write queued messages to stdin, all messages queued since the last drain in one write.
+
+        The first write waits for the agent's handshake for a while, so an agent supporting
+        binary framing gets even the initial state in it. Agents without it get NDJSON.
+        The agent is a slow consumer while a write takes long to drain.
+        """
+        assert self._process and self._process.stdin
+        loop = asyncio.get_running_loop()
+        if self.config.transport.binary_framing:
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._binary_framing_offered.wait(), self.config.transport.handshake_timeout)
+
+        while True:
+            messages = [
+                msgspec.structs.replace(message, payload=self.state_sync.encode(message.payload))
+                if message.type == MessageType.state_sync else message
+                for message in await self._outbox.get_batch()
+            ]
+
+            data = bytearray()
+            if self._binary_framing_offered.is_set() and self._output_framing == Framing.ndjson:
+                data += ApiMessage(type=MessageType.handshake, payload={'framing': Framing.msgpack}).to_bytes()
+                self._output_framing = Framing.msgpack
+                self._logger.debug('Switched to binary framing.')
+            for message in messages:
+                data += message.encode(self._output_framing)
+
             try:
-                self._process.stdin.write(message.to_bytes())
+                self._process.stdin.write(data)
+                self._draining_since = loop.time()
                 await self._process.stdin.drain()
-                self._logger.debug('Sent message', raw=message)
+                self._logger.debug('Sent messages', count=len(messages))
             except Exception as exc:
-                self._logger.warning(f'Failed to send message: {exc!r}')
-        else:
-            self._logger.warning('Stdin unavailable, cannot send message.')
+                self._logger.warning(f'Failed to send messages: {exc!r}', count=len(messages))
+                return
+            finally:
+                self._draining_since = None
 
-    async def _listen_stdout(self, on_message: Callable[[BotAgent, Message], Awaitable[None]]) -> None:
+    async def _receive(self, message: ApiMessage) -> None:
+        """Queue a message read from the agent, apply the overflow policy when the inbox is full."""
+        try:
+            self._inbox.put_nowait(message)
+            return
+        except asyncio.QueueFull:
+            pass
+
+        match self.config.inbox.overflow:
+            case InboxOverflowPolicy.block:
+                self._metrics.increment('agent.inbox.blocked', bot_gid=self.bot.gid)
+                await self._inbox.put(message)
+            case InboxOverflowPolicy.drop_newest:
+                self._metrics.increment('agent.inbox.dropped', bot_gid=self.bot.gid, type=message.type.value)
+            case InboxOverflowPolicy.drop_oldest:
+                dropped = self._inbox.get_nowait()
+                self._metrics.increment('agent.inbox.dropped', bot_gid=self.bot.gid, type=dropped.type.value)
+                self._inbox.put_nowait(message)
+
+    async def _handle_inbox(self, on_message: Callable[[BotAgent, ApiMessage], Awaitable[None]]) -> None:
+        """Handle messages read from the agent one by one, in the order they were sent."""
+        while True:
+            message = await self._inbox.get()
+            try:
+                await on_message(self, message)
+            except Exception as exc:
+                self._logger.error('Message handling error.', exc_info=exc, message_type=message.type)
+
+    async def _listen_stdout(self) -> None:
         """Read stdout and decode messages."""
         assert self._process and self._process.stdout
-        while not self._process.stdout.at_eof():
-            if message_bytes := await self._process.stdout.readline():
-                try:
-                    message = Message.from_bytes(self.bot.gid, message_bytes)
-                    await on_message(self, message)
-                except Exception as exc:
-                    self._logger.error('Stdout parsing error.', exc_info=exc, raw=message_bytes)
-            else:
+        while True:
+            try:
+                message = await self._read_message(self._process.stdout)
+            except EOFError:
+                break
+            except Exception as exc:
+                self._logger.error('Stdout unreadable, stopped reading.', exc_info=exc, framing=self._input_framing)
                 break
 
-    async def _listen_stderr(self, on_message: Callable[[BotAgent, Message], Awaitable[None]]) -> None:
+            if message is None:
+                continue
+            elif message.type == MessageType.handshake:
+                self._handshake(message)
+            else:
+                await self._receive(message)
+
+    async def _read_message(self, stream: asyncio.StreamReader) -> ApiMessage | None:
+        """Read a single message, return None if it can't be decoded and raise EOFError at the end of output."""
+        if self._input_framing == Framing.msgpack:
+            (length,) = FRAME_HEADER.unpack(await stream.readexactly(FRAME_HEADER.size))
+            if length > self.config.transport.max_frame_size:
+                raise ValueError(f'Frame of {length} bytes exceeds the maximum frame size.')
+            message_bytes = await stream.readexactly(length)
+            decode = ApiMessage.from_frame
+        elif message_bytes := await stream.readline():
+            decode = ApiMessage.from_bytes
+        else:
+            raise EOFError
+
+        try:
+            return decode(message_bytes)
+        except Exception as exc:
+            self._logger.error('Stdout parsing error.', exc_info=exc, raw=message_bytes[:1024])
+            return None
+
+    def _handshake(self, message: ApiMessage) -> None:
+        """Handle a handshake, either an offer of framings or a switch of the agent's output framing."""
+        if framing := message.payload.get('framing'):
+            self._input_framing = Framing(framing)
+            self._logger.debug('Agent switched framing.', framing=self._input_framing)
+        elif self.config.transport.binary_framing and Framing.msgpack in message.payload.get('framings', []):
+            self._binary_framing_offered.set()
+
+    async def _listen_stderr(self) -> None:
         """Read and log stderr lines separately."""
         assert self._process and self._process.stderr
         while not self._process.stderr.at_eof():
             if message_bytes := await self._process.stderr.readline():
                 try:
-                    message = Message.from_bytes(self.bot.gid, message_bytes)
-                    await on_message(self, message)
+                    message = ApiMessage.from_bytes(message_bytes)
                 except Exception as exc:
                     self._logger.error('Stderr parsing error.', exc_info=exc, raw=message_bytes)
+                else:
+                    await self._receive(message)
             else:
                 break
 
+    async def resource_reader(self) -> ResourceReader | None:
+        """Read counters of the agent process from /proc."""
+        return ProcReader(self._process.pid) if self._process and self.is_alive else None
+
+    async def throttle(self, duration: float) -> None:
+        """Stop the agent process with SIGSTOP and continue it after a given number of seconds."""
+        if self._process and self.is_alive and not self._resume_task:
+            self._process.send_signal(signal.SIGSTOP)
+            self._resume_task = asyncio.create_task(self._resume_after(duration))
+
+    async def _resume_after(self, duration: float) -> None:
+        """Continue the agent process stopped by `throttle()`."""
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            self._resume_task = None
+            if self._process:
+                with contextlib.suppress(ProcessLookupError):
+                    self._process.send_signal(signal.SIGCONT)
+
     async def stop(self) -> None:
         """Terminate process safely."""
+        self._outbox.close()
+        self._metrics.remove_gauge('agent.inbox.depth', bot_gid=self.bot.gid)
         if self._process:
             self._logger.info('Stopping agent')
 
-            for task in (self._stdout_task, self._stderr_task):
+            tasks = (self._stdin_task, self._stdout_task, self._stderr_task, self._inbox_task, self._resume_task)
+            for task in tasks:
                 if task:
                     task.cancel()
                     with contextlib.suppress(asyncio.CancelledError):
@@ -1,12 +1,16 @@
 from __future__ import annotations
 
 import asyncio
-from typing import Awaitable, Callable, TYPE_CHECKING
+import contextlib
+from typing import AsyncIterator, Awaitable, Callable, TYPE_CHECKING
 
+from codeborn.client.messages import ApiMessage
 from codeborn.logger import get_logger
-from codeborn.model import Message, Bot
+from codeborn.model import Bot
 
 from codeborn.engine.agents import AsyncProcessAgent
+from codeborn.engine.agents.pool import ContainerPool, docker_run_args, remove_container
+from codeborn.engine.resources import CgroupReader, ResourceReader
 
 if TYPE_CHECKING:
     from codeborn.config import AgentsConfig
@@ -16,10 +20,13 @@ if TYPE_CHECKING:
 class DockerAgent(AsyncProcessAgent):
     """Docker container agent using subprocess I/O."""
 
+    _pool: ContainerPool | None = None
+
     def __init__(self, bot: Bot, config: AgentsConfig) -> None:
         super().__init__(bot, config)
 
         self._docker_image = config.container_image
+        self._container_name = f'agent-{self.bot.gid}'
         self._logger = get_logger(
             agent_gid=self.bot.gid,
             agent_type='docker',
@@ -27,38 +34,90 @@ class DockerAgent(AsyncProcessAgent):
             entry_point=self.bot.entry_point
         )
 
+    @classmethod
+    @contextlib.asynccontextmanager
+    async def runtime(cls, config: AgentsConfig) -> AsyncIterator[None]:
+        """Keep a pool of pre-started containers while the engine runs."""
+        if not config.pool.size:
+            yield
+            return
+
+        cls._pool = ContainerPool(config)
+        pool_task = asyncio.create_task(cls._pool.run())
+        try:
+            yield
+        finally:
+            pool_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await pool_task
+            await cls._pool.close()
+            cls._pool = None
+
     @property
     def container_name(self) -> str:
         """Name of the container running this process."""
-        return f'agent-{self.bot.gid}'
+        return self._container_name
 
-    async def start(self, on_message: Callable[[BotAgent, Message], Awaitable[None]]) -> None:
+    async def start(self, on_message: Callable[[BotAgent, ApiMessage], Awaitable[None]]) -> None:
         """Start the agent process and begin listening for messages."""
-        entry_point = self.bot.entry_point_path
-        engine_name = entry_point.name
-
-        self._process = await asyncio.create_subprocess_exec(
-            'docker', 'run', '--rm', '-i',
-            '--name', self.container_name,
-            '--network', 'none',
-            '--cpus', '0.5',
-            '--memory', '250m',
-            '--cap-drop', 'ALL',
-            '-e', 'PYTHONUNBUFFERED=0',
-            '-v', f'{self.bot.entry_point_path}:/{engine_name}:ro,Z',
-            '-e', 'PYTHONPATH=/',
-            self._docker_image,
-            'python', '-m', engine_name,
-            stdin=asyncio.subprocess.PIPE,
+        if self._pool:
+            container = await self._pool.acquire()
+            self._container_name = container.name
+            self._process = container.process
+            await self._pool.attach(container, self.bot.entry_point_path)
+        else:
+            entry_point = self.bot.entry_point_path
+            engine_name = entry_point.name
+
+            self._process = await asyncio.create_subprocess_exec(
+                *docker_run_args(self.config, self.container_name, '-v', f'{entry_point}:/{engine_name}:ro,Z'),
+                'python', '-m', engine_name,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                limit=self.config.transport.max_frame_size,
+            )
+
+        self._start_io(on_message)
+        self._logger.info('Agent started.', container_name=self.container_name)
+
+    async def resource_reader(self) -> ResourceReader | None:
+        """Read counters of the container from its cgroup."""
+        if not self.is_alive:
+            return None
+
+        process = await asyncio.create_subprocess_exec(
+            'docker', 'inspect', '--format', '{{.Id}}', self.container_name,
             stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
         )
+        stdout, _ = await process.communicate()
+        return CgroupReader.for_container(stdout.decode().strip()) if process.returncode == 0 else None
+
+    async def throttle(self, duration: float) -> None:
+        """Pause the container and unpause it after a given number of seconds."""
+        if self.is_alive and not self._resume_task:
+            await self._docker('pause')
+            self._resume_task = asyncio.create_task(self._resume_after(duration))
 
-        self._stdout_task = asyncio.create_task(self._listen_stdout(on_message))
-        self._stderr_task = asyncio.create_task(self._listen_stderr(on_message))
-        self._logger.info('Agent started.')
+    async def _resume_after(self, duration: float) -> None:
+        """Unpause the container paused by `throttle()`."""
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            self._resume_task = None
+            await self._docker('unpause')
+
+    async def _docker(self, command: str) -> None:
+        """Run a docker command taking the container name as its only argument."""
+        process = await asyncio.create_subprocess_exec(
+            'docker', command, self.container_name,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        await process.wait()
 
     async def stop(self) -> None:
         """Terminate container safely."""
         await super().stop()
-        await asyncio.create_subprocess_exec('docker', 'rm', '-f', self.container_name)
+        await remove_container(self.container_name)
@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import os
+import signal
+import socket
+import sys
+import tempfile
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, TYPE_CHECKING
+
+from codeborn import to_abs_path
+from codeborn.client.messages import ApiMessage
+from codeborn.logger import get_logger
+from codeborn.model import Bot
+
+from codeborn.engine.agents import AsyncProcessAgent
+
+if TYPE_CHECKING:
+    from codeborn.config import AgentsConfig, AgentsForkServerConfig
+    from codeborn.engine.agents import BotAgent
+
+
+ZYGOTE_ENTRY_POINT = 'codeborn.client.zygote'
+
+
+class ForkedProcess:
+    """A bot process forked by the zygote, implementing the `AgentProcess` interface used by agents.
+
+    The zygote reaps the process, so its pid can be reused once it exits. Signals are
+    sent through a pidfd where the platform has them, it never refers to another process.
+    """
+
+    def __init__(
+        self,
+        pid: int,
+        stdin: asyncio.StreamWriter,
+        stdout: asyncio.StreamReader,
+        stderr: asyncio.StreamReader,
+        zygote: tuple[asyncio.StreamReader, asyncio.StreamWriter],
+    ) -> None:
+        self.pid = pid
+        self.stdin = stdin
+        self.stdout = stdout
+        self.stderr = stderr
+        self.returncode: int | None = None
+        self._pidfd: int | None = None
+        if hasattr(os, 'pidfd_open'):
+            with contextlib.suppress(ProcessLookupError):  # Already exited, the zygote sends its exit code
+                self._pidfd = os.pidfd_open(pid)
+        self._exit_task = asyncio.create_task(self._wait_for_exit(zygote))
+
+    async def _wait_for_exit(self, zygote: tuple[asyncio.StreamReader, asyncio.StreamWriter]) -> None:
+        """Wait for the exit code sent by the zygote, then release the pipes."""
+        reader, writer = zygote
+        try:
+            line = await reader.readline()
+            self.returncode = int(line) if line.strip() else -1  # The zygote died
+        finally:
+            writer.close()
+            self.stdin.close()
+            if self._pidfd is not None:
+                os.close(self._pidfd)
+                self._pidfd = None
+
+    async def wait(self) -> int:
+        """Wait for the process to exit."""
+        await asyncio.shield(self._exit_task)
+        assert self.returncode is not None
+        return self.returncode
+
+    def send_signal(self, sig: int) -> None:
+        """Send a signal to the process."""
+        if self.returncode is not None or self._exit_task.done():
+            raise ProcessLookupError(self.pid)
+        if self._pidfd is not None:
+            signal.pidfd_send_signal(self._pidfd, sig)
+        else:
+            os.kill(self.pid, sig)
+
+    def terminate(self) -> None:
+        """Terminate the process."""
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self) -> None:
+        """Kill the process."""
+        self.send_signal(signal.SIGKILL)
+
+
+class ForkServer:
+    """Zygote process with the client framework imported, forking a child for every bot."""
+
+    def __init__(self, config: AgentsForkServerConfig, limit: int) -> None:
+        self._config = config
+        self._limit = limit
+        self._logger = get_logger(component='fork_server')
+        self._directory = tempfile.TemporaryDirectory(prefix='codeborn-zygote-')
+        self._socket_path = str(Path(self._directory.name) / 'zygote.sock')
+        self._zygote: asyncio.subprocess.Process | None = None
+
+    async def start(self) -> None:
+        """Start the zygote and wait until it accepts requests."""
+        self._zygote = await asyncio.create_subprocess_exec(
+            sys.executable, '-m', ZYGOTE_ENTRY_POINT, self._socket_path,
+            stdin=asyncio.subprocess.PIPE,  # Closing it stops the zygote
+        )
+        while not os.path.exists(self._socket_path):
+            if self._zygote.returncode is not None:
+                raise RuntimeError(f'Zygote exited with code {self._zygote.returncode}.')
+            await asyncio.sleep(0.05)
+        self._logger.info('Zygote started.', pid=self._zygote.pid)
+
+    async def stop(self) -> None:
+        """Stop the zygote."""
+        if self._zygote:
+            assert self._zygote.stdin
+            self._zygote.stdin.close()
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._zygote.wait(), timeout=3)
+            if self._zygote.returncode is None:
+                self._zygote.kill()
+                await self._zygote.wait()
+            self._zygote = None
+        self._directory.cleanup()
+        self._logger.info('Zygote stopped.')
+
+    async def spawn(self, module_path: Path) -> ForkedProcess:
+        """Fork a child running a bot module, connected to the engine by new pipes."""
+        loop = asyncio.get_running_loop()
+        stdin_read, stdin_write = os.pipe()
+        stdout_read, stdout_write = os.pipe()
+        stderr_read, stderr_write = os.pipe()
+        request = {
+            'cwd': str(module_path.parent),
+            'module': module_path.name,
+            'limits': {
+                'RLIMIT_AS': self._config.memory_limit,
+                'RLIMIT_CPU': self._config.cpu_time_limit,
+                'RLIMIT_NOFILE': self._config.open_files_limit,
+            },
+        }
+
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            connection.setblocking(False)
+            await loop.sock_connect(connection, self._socket_path)
+            socket.send_fds(connection, [json.dumps(request).encode()], [stdin_read, stdout_write, stderr_write])
+        except BaseException:
+            connection.close()
+            for fd in (stdin_write, stdout_read, stderr_read):
+                os.close(fd)
+            raise
+        finally:
+            for fd in (stdin_read, stdout_write, stderr_write):
+                os.close(fd)  # Owned by the child now
+
+        zygote = await asyncio.open_unix_connection(sock=connection)
+        if not (pid := (await zygote[0].readline()).strip()):
+            zygote[1].close()
+            for fd in (stdin_write, stdout_read, stderr_read):
+                os.close(fd)
+            raise RuntimeError('Zygote failed to fork a child.')
+
+        stdin_transport, stdin_protocol = await loop.connect_write_pipe(
+            asyncio.streams.FlowControlMixin, open(stdin_write, 'wb', buffering=0)
+        )
+        stdin = asyncio.StreamWriter(stdin_transport, stdin_protocol, None, loop)
+        return ForkedProcess(
+            int(pid),
+            stdin,
+            await self._read_pipe(stdout_read),
+            await self._read_pipe(stderr_read),
+            zygote,
+        )
+
+    async def _read_pipe(self, fd: int) -> asyncio.StreamReader:
+        """Connect a stream reader to the read end of a pipe."""
+        reader = asyncio.StreamReader(limit=self._limit)
+        await asyncio.get_running_loop().connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(reader), open(fd, 'rb', buffering=0)
+        )
+        return reader
+
+
+class ForkServerAgent(AsyncProcessAgent):
+    """An agent forked from a zygote with the client framework already imported."""
+
+    _fork_server: ForkServer | None = None
+
+    def __init__(self, bot: Bot, config: AgentsConfig) -> None:
+        super().__init__(bot, config)
+
+        self._logger = get_logger(
+            bot_gid=str(self.bot.gid),
+            agent_type='forkserver',
+            entry_point=self.bot.entry_point
+        )
+
+    @classmethod
+    @contextlib.asynccontextmanager
+    async def runtime(cls, config: AgentsConfig) -> AsyncIterator[None]:
+        """Keep the zygote running while the engine runs."""
+        cls._fork_server = ForkServer(config.forkserver, config.transport.max_frame_size)
+        await cls._fork_server.start()
+        try:
+            yield
+        finally:
+            await cls._fork_server.stop()
+            cls._fork_server = None
+
+    async def start(self, on_message: Callable[[BotAgent, ApiMessage], Awaitable[None]]) -> None:
+        """Fork the agent process and begin listening for messages."""
+        assert self._fork_server, 'ForkServerAgent.runtime() is not running.'
+        self._process = await self._fork_server.spawn(to_abs_path(self.bot.entry_point))
+
+        self._start_io(on_message)
+        self._logger.info('Agent started', pid=self._process.pid)
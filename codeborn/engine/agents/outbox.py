@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from uuid import UUID
+
+from codeborn.client.messages import ApiMessage, MessageType
+from codeborn.config import AgentsOutboxConfig
+from codeborn.engine.metrics import get_metrics
+
+
+PRIORITY_TYPES = frozenset({MessageType.command_result, MessageType.heartbeat_request})
+
+
+class Outbox:
+    """Bounded queue of messages waiting to be written to an agent.
+
+    Priority messages are written first. Only the latest `state_sync` is kept, a newer
+    one replaces the queued one. When the outbox is full, the oldest non-priority
+    message is dropped to make room.
+    """
+
+    def __init__(self, config: AgentsOutboxConfig, bot_gid: UUID) -> None:
+        self._config = config
+        self._bot_gid = bot_gid
+        self._priority: deque[ApiMessage] = deque()
+        self._normal: deque[ApiMessage] = deque()
+        self._state_sync: ApiMessage | None = None
+        self._ready = asyncio.Event()
+
+        self._metrics = get_metrics()
+        self._metrics.gauge('agent.outbox.depth', self.__len__, bot_gid=bot_gid)
+
+    def __len__(self) -> int:
+        return len(self._priority) + len(self._normal) + (self._state_sync is not None)
+
+    def close(self) -> None:
+        """Stop reporting the outbox depth."""
+        self._metrics.remove_gauge('agent.outbox.depth', bot_gid=self._bot_gid)
+
+    def put(self, message: ApiMessage) -> None:
+        """Add a message to the outbox."""
+        if message.type == MessageType.state_sync:
+            if self._state_sync is not None:
+                self._metrics.increment('agent.outbox.coalesced', bot_gid=self._bot_gid)
+            elif not self._make_room(message):
+                return
+            self._state_sync = message
+        elif self._make_room(message):
+            (self._priority if message.type in PRIORITY_TYPES else self._normal).append(message)
+        else:
+            return
+
+        self._ready.set()
+
+    def _make_room(self, message: ApiMessage) -> bool:
+        """Drop the oldest non-priority message if the outbox is full, return False if the message must be dropped."""
+        if len(self) < self._config.max_size:
+            return True
+
+        if self._normal:
+            dropped = self._normal.popleft()
+        elif self._state_sync is not None:
+            dropped, self._state_sync = self._state_sync, None
+        else:
+            dropped = message
+
+        self._metrics.increment('agent.outbox.dropped', bot_gid=self._bot_gid, type=dropped.type.value)
+        return dropped is not message
+
+    async def get_batch(self) -> list[ApiMessage]:
+        """Wait for messages and take all of them, priority messages first."""
+        while not len(self):
+            self._ready.clear()
+            await self._ready.wait()
+
+        batch = [*self._priority, *self._normal]
+        if self._state_sync is not None:
+            batch.append(self._state_sync)
+
+        self._priority.clear()
+        self._normal.clear()
+        self._state_sync = None
+        return batch
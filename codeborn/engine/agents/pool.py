@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+from collections import deque
+from pathlib import Path
+from typing import TYPE_CHECKING
+from uuid import uuid4
+
+import msgspec
+
+from codeborn.logger import get_logger
+from codeborn.engine.metrics import get_metrics
+
+if TYPE_CHECKING:
+    from codeborn.config import AgentsConfig
+
+
+POOL_ENTRY_POINT = 'codeborn.client.pool'
+COPY_ATTEMPTS = 20
+COPY_RETRY_DELAY = 0.1  # Seconds, a container just started may not exist yet
+
+
+def docker_run_args(config: AgentsConfig, container_name: str, *options: str) -> list[str]:
+    """Get arguments of `docker run` starting an agent container, the image and command must follow."""
+    return [
+        'docker', 'run', '--rm', '-i',
+        '--name', container_name,
+        '--network', 'none',
+        '--cpus', '0.5',
+        '--memory', '250m',
+        '--cap-drop', 'ALL',
+        '-e', 'PYTHONUNBUFFERED=0',
+        '-e', 'PYTHONPATH=/',
+        *options,
+        config.container_image,
+    ]
+
+
+async def remove_container(container_name: str) -> None:
+    """Force remove a container."""
+    process = await asyncio.create_subprocess_exec(
+        'docker', 'rm', '-f', container_name,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    await process.wait()
+
+
+class PooledContainer(msgspec.Struct):
+    """An idle container waiting for a bot."""
+
+    name: str
+    process: asyncio.subprocess.Process
+    started_at: float
+
+    @property
+    def is_alive(self) -> bool:
+        """Check if the container is still running."""
+        return self.process.returncode is None
+
+
+class ContainerPool:
+    """Pool of pre-started agent containers with the client framework already imported.
+
+    Containers idle for longer than `idle_ttl` are replaced, so they pick up a rebuilt
+    image. The pool is refilled in the background whenever a container is taken.
+    """
+
+    def __init__(self, config: AgentsConfig) -> None:
+        self._config = config
+        self._logger = get_logger(component='container_pool')
+        self._idle: deque[PooledContainer] = deque()
+        self._refill = asyncio.Event()
+
+        self._metrics = get_metrics()
+        self._metrics.gauge('container_pool.idle', lambda: len(self._idle))
+
+    def _is_expired(self, container: PooledContainer) -> bool:
+        """Check if a container was idle for too long."""
+        return asyncio.get_running_loop().time() - container.started_at > self._config.pool.idle_ttl
+
+    async def acquire(self) -> PooledContainer:
+        """Take an idle container, start a new one if there is none."""
+        self._refill.set()
+        while self._idle:
+            container = self._idle.popleft()
+            if container.is_alive and not self._is_expired(container):
+                self._metrics.increment('container_pool.hits')
+                return container
+            await self._discard(container)
+
+        self._metrics.increment('container_pool.misses')
+        return await self._start_container()
+
+    async def attach(self, container: PooledContainer, entry_point: Path) -> None:
+        """Copy a bot package into a container and start it."""
+        for attempt in range(COPY_ATTEMPTS):
+            process = await asyncio.create_subprocess_exec(
+                'docker', 'cp', str(entry_point), f'{container.name}:/{entry_point.name}',
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            _, stderr = await process.communicate()
+            if not process.returncode:
+                break
+            if not container.is_alive or attempt == COPY_ATTEMPTS - 1:
+                raise RuntimeError(f'Copying bot to container "{container.name}" failed: {stderr.decode().strip()}')
+            await asyncio.sleep(COPY_RETRY_DELAY)
+
+        assert container.process.stdin
+        container.process.stdin.write(f'{entry_point.name}\n'.encode())
+        await container.process.stdin.drain()
+
+    async def run(self) -> None:
+        """Keep the pool filled until cancelled."""
+        self._logger.info('Started')
+        try:
+            while True:
+                self._refill.clear()
+                for container in [container for container in self._idle if self._is_expired(container)]:
+                    self._idle.remove(container)
+                    await self._discard(container)
+
+                if (missing := self._config.pool.size - len(self._idle)) > 0:
+                    results = await asyncio.gather(
+                        *(self._start_container() for _ in range(missing)),
+                        return_exceptions=True,
+                    )
+                    for result in results:
+                        if isinstance(result, BaseException):
+                            self._logger.warning('Starting pooled container failed.', exc_info=result)
+                        else:
+                            self._idle.append(result)
+
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(self._refill.wait(), self._config.pool.interval)
+        finally:
+            self._logger.info('Stopped.')
+
+    async def close(self) -> None:
+        """Remove all idle containers."""
+        idle, self._idle = self._idle, deque()
+        await asyncio.gather(*(self._discard(container) for container in idle))
+        self._metrics.remove_gauge('container_pool.idle')
+
+    async def _start_container(self) -> PooledContainer:
+        """Start a new idle container."""
+        name = f'agent-pool-{uuid4()}'
+        process = await asyncio.create_subprocess_exec(
+            *docker_run_args(self._config, name),
+            'python', '-m', POOL_ENTRY_POINT,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            limit=self._config.transport.max_frame_size,
+        )
+        return PooledContainer(name=name, process=process, started_at=asyncio.get_running_loop().time())
+
+    async def _discard(self, container: PooledContainer) -> None:
+        """Stop and remove a container that won't be used."""
+        if container.is_alive:
+            with contextlib.suppress(ProcessLookupError):
+                container.process.kill()
+            await container.process.wait()
+        await remove_container(container.name)
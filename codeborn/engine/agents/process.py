@@ -7,7 +7,8 @@ from collections.abc import Awaitable
 
 from codeborn import to_abs_path
 from codeborn.logger import get_logger
-from codeborn.model import Message, Bot
+from codeborn.client.messages import ApiMessage
+from codeborn.model import Bot
 
 from codeborn.engine.agents import AsyncProcessAgent
 
@@ -28,7 +29,7 @@ class ProcessAgent(AsyncProcessAgent):
             entry_point=self.bot.entry_point
         )
 
-    async def start(self, on_message: Callable[[BotAgent, Message], Awaitable[None]]) -> None:
+    async def start(self, on_message: Callable[[BotAgent, ApiMessage], Awaitable[None]]) -> None:
         """Start the agent process and begin listening for messages."""
         module_path = to_abs_path(self.bot.entry_point)
         self._process = await asyncio.create_subprocess_exec(
@@ -37,8 +38,8 @@ class ProcessAgent(AsyncProcessAgent):
             stdin=asyncio.subprocess.PIPE,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
+            limit=self.config.transport.max_frame_size,
         )
 
-        self._stdout_task = asyncio.create_task(self._listen_stdout(on_message))
-        self._stderr_task = asyncio.create_task(self._listen_stderr(on_message))
+        self._start_io(on_message)
         self._logger.info('Agent started')
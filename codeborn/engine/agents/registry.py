@@ -1,12 +1,16 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
+from collections import Counter
+from collections.abc import AsyncIterator
 from typing import TYPE_CHECKING, Awaitable, Callable
 from uuid import UUID
 
 from codeborn.config import AgentsConfig
 from codeborn.logger import get_logger
-from codeborn.model import Message, Bot
+from codeborn.client.messages import ApiMessage
+from codeborn.model import Bot
 
 if TYPE_CHECKING:
     from codeborn.engine.agents import BotAgent
@@ -15,41 +19,73 @@ if TYPE_CHECKING:
 class AgentRegistry:
     """Registry for managing agents."""
 
-    def __init__(self, config: AgentsConfig, on_message: Callable[[BotAgent, Message], Awaitable[None]]) -> None:
+    def __init__(self, config: AgentsConfig, on_message: Callable[[BotAgent, ApiMessage], Awaitable[None]]) -> None:
         self._config = config
         self._logger = get_logger(component='agent_registry')
         self._agents: dict[UUID, BotAgent] = {}
         self._on_message = on_message
-        self._async_lock = asyncio.Lock()
+        self._locks: dict[UUID, asyncio.Lock] = {}
+        self._lock_users = Counter[UUID]()
+
+    @contextlib.asynccontextmanager
+    async def _lock(self, bot_gid: UUID) -> AsyncIterator[None]:
+        """Hold a lock serializing starts and stops of a single agent, it's forgotten once unused."""
+        lock = self._locks.setdefault(bot_gid, asyncio.Lock())
+        self._lock_users[bot_gid] += 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._lock_users[bot_gid] -= 1
+            if not self._lock_users[bot_gid]:
+                del self._lock_users[bot_gid]
+                del self._locks[bot_gid]
 
     async def add_agent(self, agent: BotAgent) -> None:
         """Register and start an agent."""
-        self._logger.info('Adding agent', bot_gid=str(agent.bot.gid))
+        async with self._lock(agent.bot.gid):
+            await self._add_agent(agent)
 
-        async with self._async_lock:
-            if await self.get_agent(agent.bot.gid) is not None:
-                raise ValueError(f'Agent with gid "{agent.bot.gid}" already registered.')
+    async def _add_agent(self, agent: BotAgent) -> None:
+        """Register and start an agent, the caller holds its lock."""
+        self._logger.info('Adding agent', bot_gid=str(agent.bot.gid))
+        if await self.get_agent(agent.bot.gid) is not None:
+            raise ValueError(f'Agent with gid "{agent.bot.gid}" already registered.')
 
-            self._agents[agent.bot.gid] = agent
+        # Registered only once started, so heartbeats don't take a starting agent for a dead one
+        try:
             await agent.start(self._on_message)
+        except BaseException:
+            await agent.stop()
+            raise
+        self._agents[agent.bot.gid] = agent
+
+    async def remove_agent(self, bot_gid: UUID, agent: BotAgent | None = None) -> bool:
+        """Stop and unregister the agent of a bot, get whether it was registered.
+
+        When `agent` is given, it's removed only if it's still the registered one, not a replacement.
+        """
+        async with self._lock(bot_gid):
+            return await self._remove_agent(bot_gid, agent)
+
+    async def _remove_agent(self, bot_gid: UUID, agent: BotAgent | None = None) -> bool:
+        """Stop and unregister an agent, the caller holds its lock."""
+        registered = self._agents.get(bot_gid)
+        if registered is None or (agent is not None and registered is not agent):
+            return False
 
-    async def remove_agent(self, bot_gid: UUID) -> None:
-        """Stop and unregister an agent by its gid."""
         self._logger.info('Removing agent', bot_gid=str(bot_gid))
-        async with self._async_lock:
-            if agent := self._agents.pop(bot_gid, None):
-                await agent.stop()
-            else:
-                raise ValueError(f'Agent with gid "{bot_gid}" not found.')
+        del self._agents[bot_gid]
+        await registered.stop()
+        return True
 
     async def remove_all(self) -> None:
         """Stop and unregister all agents."""
-        await asyncio.gather(*(self.remove_agent(agent.bot.gid) for agent in await self.get_agents()))
+        await asyncio.gather(*(self.remove_agent(agent.bot.gid, agent) for agent in await self.get_agents()))
 
     async def get_agents(self) -> list[BotAgent]:
         """Get a list of all registered agents."""
-        async with self._async_lock:
-            return list(self._agents.values())
+        return list(self._agents.values())
 
     async def get_agent(self, bot_gid: UUID) -> BotAgent | None:
         """Get a registered agent by its bot_gid."""
@@ -57,9 +93,9 @@ class AgentRegistry:
 
     async def restart_agent(self, bot: Bot) -> BotAgent:
         """Restart an agent for a given bot."""
-        if agent := await self.get_agent(bot.gid):
-            await self.remove_agent(agent.bot.gid)
+        async with self._lock(bot.gid):
+            await self._remove_agent(bot.gid)
 
-        agent = self._config.runtime_class(bot, self._config)  # type: ignore
-        await self.add_agent(agent)
-        return agent
+            agent = self._config.runtime_class(bot, self._config)  # type: ignore
+            await self._add_agent(agent)
+            return agent
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import random
+from uuid import UUID
+
+from codeborn.config import AgentsRestartConfig
+
+
+class RestartBackoff:
+    """Exponential backoff with jitter for agents that keep crashing.
+
+    A failure shortly after start doubles the delay before the next start. An agent
+    that ran for at least `stable_after` seconds starts with a clean record.
+    """
+
+    def __init__(self, config: AgentsRestartConfig) -> None:
+        self._config = config
+        self._failures: dict[UUID, int] = {}
+        self._started_at: dict[UUID, float] = {}
+        self._next_start: dict[UUID, float] = {}
+
+    def is_failing(self, bot_gid: UUID) -> bool:
+        """Check if a failure of a bot was already recorded and it's waiting for the next start."""
+        return bot_gid in self._next_start
+
+    def started(self, bot_gid: UUID, now: float) -> None:
+        """Record a successful start of an agent."""
+        self._started_at[bot_gid] = now
+        self._next_start.pop(bot_gid, None)
+
+    def failed(self, bot_gid: UUID, now: float) -> None:
+        """Record a crash or a failed start of an agent and schedule its next start."""
+        started_at = self._started_at.get(bot_gid, now)
+        if now - started_at >= self._config.stable_after:
+            self._failures.pop(bot_gid, None)
+
+        failures = self._failures[bot_gid] = self._failures.get(bot_gid, 0) + 1
+        delay = min(self._config.backoff_max, self._config.backoff_base * 2 ** (failures - 1))
+        delay *= 1 - self._config.backoff_jitter * random.random()
+        self._next_start[bot_gid] = now + delay
+
+    def retry_in(self, bot_gid: UUID, now: float) -> float:
+        """Get seconds remaining until an agent may be started again."""
+        return max(0.0, self._next_start.get(bot_gid, now) - now)
+
+    def reset(self, bot_gid: UUID) -> None:
+        """Forget failures of a bot, e.g. when its restart was requested by the user."""
+        self._failures.pop(bot_gid, None)
+        self._next_start.pop(bot_gid, None)
+
+    def was_started(self, bot_gid: UUID) -> bool:
+        """Check if an agent of a bot was started before."""
+        return bot_gid in self._started_at
@@ -0,0 +1,87 @@
+"""Micro-benchmark of the engine wire codec.
+
+Compares the msgspec `ApiMessage` codec with the previous codec, which parsed every
+line with `json` into a Tortoise `Message` model. Run with `hatch run bench-codec`.
+"""
+from __future__ import annotations
+
+import json
+import timeit
+from datetime import datetime
+from typing import Any, Callable
+from uuid import UUID, uuid4
+
+from tortoise import Tortoise
+
+from codeborn.client.messages import ApiMessage, MessageType
+from codeborn.model import Message
+
+
+ROUNDS = 20_000
+
+SAMPLES: dict[str, ApiMessage] = {
+    'heartbeat_response': ApiMessage(type=MessageType.heartbeat_response, payload={'state_version': 42}),
+    'command': ApiMessage(
+        type=MessageType.command,
+        payload={'command': 'move', 'army_gid': str(uuid4()), 'location': {'x': 12, 'y': 34}},
+    ),
+    'bot_log': ApiMessage(type=MessageType.bot_log, payload={'text': 'Moving army north. ' * 5}),
+}
+
+
+def legacy_decode(bot_id: UUID, raw: bytes) -> Message:
+    """Decode a line the way the engine did before, straight into an ORM model."""
+    data = json.loads(raw.strip().decode())
+    gid = UUID(data['gid']) if 'gid' in data else uuid4()
+    return Message(
+        gid=gid,
+        bot_id=bot_id,
+        type=data['type'],
+        payload=data.get('payload', {}),
+        datetime=datetime.fromisoformat(data['datetime']),
+    )
+
+
+def legacy_encode(message: Message) -> bytes:
+    """Encode an ORM model the way the engine did before."""
+    data = {
+        'gid': str(message.gid),
+        'bot_id': str(message.bot_id),  # type: ignore
+        'type': message.type,
+        'datetime': message.datetime.isoformat(),
+        'response_to': str(message.response_to) if message.response_to else None,
+        'payload': message.payload,
+    }
+    return json.dumps(data, ensure_ascii=False).encode() + b'\n'
+
+
+def measure(func: Callable[[], Any]) -> float:
+    """Get the best time of a single call in microseconds."""
+    return min(timeit.repeat(func, number=ROUNDS, repeat=5)) / ROUNDS * 1_000_000
+
+
+def main() -> None:
+    Tortoise.init_models(['codeborn.model'], 'models')  # Model metadata only, no database needed
+    bot_id = uuid4()
+
+    print(f'{"message":<20} {"op":<8} {"legacy µs":>10} {"msgspec µs":>11} {"speedup":>8}')
+    for name, message in SAMPLES.items():
+        raw = message.to_bytes()
+        orm_message = legacy_decode(bot_id, raw)
+
+        results = {
+            'decode': (
+                measure(lambda: legacy_decode(bot_id, raw)),
+                measure(lambda: ApiMessage.from_bytes(raw)),
+            ),
+            'encode': (
+                measure(lambda: legacy_encode(orm_message)),
+                measure(lambda: message.to_bytes()),
+            ),
+        }
+        for op, (legacy, current) in results.items():
+            print(f'{name:<20} {op:<8} {legacy:>10.2f} {current:>11.2f} {legacy / current:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
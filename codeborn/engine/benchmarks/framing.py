@@ -0,0 +1,86 @@
+"""Throughput benchmark of the engine-agent framings.
+
+Encodes a stream of messages in NDJSON and in length-prefixed MessagePack frames and
+reads it back through an `asyncio.StreamReader`, the same way the engine reads agent
+output. Run with `hatch run bench-framing`.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any
+from uuid import uuid4
+
+from codeborn.client.messages import FRAME_HEADER, ApiMessage, Framing, MessageType
+
+
+STREAM_SIZE = 64 * 1024 * 1024
+
+
+def game_state(armies: int) -> dict[str, Any]:
+    """Build a synthetic `state_sync` payload with a given number of armies."""
+    return {
+        'me': {
+            'gid': str(uuid4()),
+            'name': 'benchmark',
+            'armies': [
+                {
+                    'gid': str(uuid4()),
+                    'location': {'gid': str(uuid4()), 'terrain': 'plains', 'x': index % 512, 'y': index // 512},
+                    'units': [
+                        {'gid': str(uuid4()), 'type': unit_type, 'stamina': 0.75, 'count': 100}
+                        for unit_type in ('light_infantry', 'archer', 'heavy_cavalry')
+                    ],
+                }
+                for index in range(armies)
+            ],
+        },
+    }
+
+
+SAMPLES: dict[str, ApiMessage] = {
+    'heartbeat_response': ApiMessage(type=MessageType.heartbeat_response, payload={'state_version': 42}),
+    'state_sync 100 armies': ApiMessage(type=MessageType.state_sync, payload=game_state(100)),
+    'state_sync 10k armies': ApiMessage(type=MessageType.state_sync, payload=game_state(10_000)),
+}
+
+
+async def read_all(data: bytes, framing: Framing, count: int) -> None:
+    """Read and decode all messages from a stream."""
+    reader = asyncio.StreamReader(limit=len(data))
+    reader.feed_data(data)
+    reader.feed_eof()
+
+    for _ in range(count):
+        if framing == Framing.msgpack:
+            (length,) = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+            ApiMessage.from_frame(await reader.readexactly(length))
+        else:
+            ApiMessage.from_bytes(await reader.readline())
+
+
+def measure(message: ApiMessage, framing: Framing) -> tuple[int, float, float]:
+    """Get the frame size and encode and decode throughput in MB/s."""
+    size = len(message.encode(framing))
+    count = max(1, STREAM_SIZE // size)
+
+    started_at = time.perf_counter()
+    data = b''.join(message.encode(framing) for _ in range(count))
+    encoded_at = time.perf_counter()
+    asyncio.run(read_all(data, framing, count))
+    decoded_at = time.perf_counter()
+
+    megabytes = len(data) / 1024 / 1024
+    return size, megabytes / (encoded_at - started_at), megabytes / (decoded_at - encoded_at)
+
+
+def main() -> None:
+    print(f'{"message":<24} {"framing":<8} {"size B":>10} {"encode MB/s":>12} {"decode MB/s":>12}')
+    for name, message in SAMPLES.items():
+        for framing in Framing:
+            size, encode, decode = measure(message, framing)
+            print(f'{name:<24} {framing:<8} {size:>10} {encode:>12.1f} {decode:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
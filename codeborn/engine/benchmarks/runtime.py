@@ -0,0 +1,103 @@
+"""Benchmark of agent runtimes on the engine host.
+
+Starts the same idle bot with a fresh interpreter, as `ProcessAgent` does, and forked
+from the zygote, as `ForkServerAgent` does. Reports the latency until the bot's first
+message and its memory: RSS, and PSS, which splits pages shared copy-on-write with the
+zygote among the processes sharing them. Run with `hatch run bench-runtime`.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+import codeborn
+from codeborn.config import AgentsForkServerConfig
+from codeborn.engine.agents.forkserver import ForkServer
+
+
+BOTS = 20
+BOT_SOURCE = '''
+from codeborn.client.bot import Bot
+
+
+class IdleBot(Bot):
+    def run(self) -> None:
+        pass
+
+
+IdleBot().start()
+'''
+
+
+def memory_kib(pid: int) -> tuple[int, int]:
+    """Get RSS and PSS of a process in KiB."""
+    values = {}
+    for line in Path(f'/proc/{pid}/smaps_rollup').read_text().splitlines()[1:]:
+        name, value, *_ = line.split()
+        values[name.rstrip(':')] = int(value)
+    return values['Rss'], values['Pss']
+
+
+async def start_subprocess(module_path: Path) -> asyncio.subprocess.Process:
+    """Start a bot the way `ProcessAgent` does."""
+    return await asyncio.create_subprocess_exec(
+        sys.executable, '-m', module_path.name,
+        cwd=module_path.parent,
+        env={**os.environ, 'PYTHONPATH': str(Path(codeborn.__file__).parent.parent)},
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+
+
+async def measure(name: str, start: Callable[[Path], Awaitable[Any]], module_path: Path) -> None:
+    """Start bots one by one, keep them running and report their startup latency and memory."""
+    processes = []
+    latencies = []
+    try:
+        for _ in range(BOTS):
+            started_at = time.perf_counter()
+            process = await start(module_path)
+            await process.stdout.readline()  # The handshake
+            latencies.append((time.perf_counter() - started_at) * 1000)
+            processes.append(process)
+
+        memory = [memory_kib(process.pid) for process in processes]
+        print(
+            f'{name:<12} {statistics.median(latencies):>14.1f} {max(latencies):>11.1f} '
+            f'{statistics.mean(rss for rss, _ in memory) / 1024:>12.1f} '
+            f'{statistics.mean(pss for _, pss in memory) / 1024:>12.1f}'
+        )
+    finally:
+        for process in processes:
+            process.kill()
+            await process.wait()
+
+
+async def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        module_path = Path(directory) / 'idle_bot'
+        module_path.mkdir()
+        (module_path / '__main__.py').write_text(BOT_SOURCE)
+
+        fork_server = ForkServer(
+            AgentsForkServerConfig(memory_limit=1024 ** 3, cpu_time_limit=3600, open_files_limit=64),
+            limit=64 * 1024,
+        )
+        await fork_server.start()
+        try:
+            print(f'{"runtime":<12} {"median start ms":>14} {"max ms":>11} {"RSS MiB":>12} {"PSS MiB":>12}')
+            await measure('subprocess', start_subprocess, module_path)
+            await measure('forkserver', fork_server.spawn, module_path)
+        finally:
+            await fork_server.stop()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timezone
+from uuid import UUID
+
+from codeborn.config import AgentsRestartConfig, DatabaseConfig
+from codeborn.database import BOT_CHANGES_CHANNEL, listen
+from codeborn.logger import get_logger
+from codeborn.model import Bot
+
+
+class BotChangeFeed:
+    """Stream of gids of bots that need attention of the engine.
+
+    Changes made by the API arrive as Postgres notifications. Lost notifications are
+    picked up by polling bots with a newer `updated_at`. The engine can push its own
+    changes too, e.g. when an agent dies.
+    """
+
+    def __init__(self, database: DatabaseConfig, config: AgentsRestartConfig) -> None:
+        self._database = database
+        self._config = config
+        self._logger = get_logger(component='bot_changes')
+        self._pending: set[UUID] = set()
+        self._changed = asyncio.Event()
+        self._last_update: datetime | None = None
+
+    def push(self, *bot_gids: UUID) -> None:
+        """Mark bots as changed."""
+        self._pending.update(bot_gids)
+        self._changed.set()
+
+    def __aiter__(self) -> BotChangeFeed:
+        return self
+
+    async def __anext__(self) -> set[UUID]:
+        """Wait for changes and return gids of all bots changed since the last call."""
+        await self._changed.wait()
+        self._changed.clear()
+        pending, self._pending = self._pending, set()
+        return pending
+
+    def _on_notification(self, payload: str) -> None:
+        """Handle a notification with a gid of a changed bot."""
+        try:
+            self.push(UUID(payload))
+        except ValueError:
+            self._logger.warning('Invalid bot change notification.', payload=payload)
+
+    async def listen(self) -> None:
+        """Receive change notifications, reconnect when the connection is lost."""
+        self._logger.info('Started')
+        try:
+            while True:
+                try:
+                    closed = asyncio.Event()
+                    async with listen(self._database, BOT_CHANGES_CHANNEL, self._on_notification) as connection:
+                        connection.add_termination_listener(lambda _conn: closed.set())
+                        self._logger.info('Listening for bot changes.')
+                        await closed.wait()
+                    self._logger.warning('Bot changes connection lost.')
+                except Exception as exc:
+                    self._logger.warning('Listening for bot changes failed.', exc_info=exc)
+                await asyncio.sleep(self._config.interval)
+        finally:
+            self._logger.info('Stopped.')
+
+    async def poll(self) -> None:
+        """Periodically push bots updated since the last poll, a fallback for lost notifications."""
+        self._logger.info('Started')
+        try:
+            while True:
+                try:
+                    await self._poll_once()
+                except Exception as exc:
+                    self._logger.warning('Polling bot changes failed.', exc_info=exc)
+                await asyncio.sleep(self._config.interval)
+        finally:
+            self._logger.info('Stopped.')
+
+    async def _poll_once(self) -> None:
+        """Push bots updated since the last poll."""
+        if self._last_update is None:
+            latest = await Bot.all().order_by('-updated_at').limit(1).values_list('updated_at', flat=True)
+            self._last_update = latest[0] if latest else datetime.now(timezone.utc)
+            return
+
+        changes = await Bot.filter(updated_at__gt=self._last_update).values_list('gid', 'updated_at')
+        if changes:
+            self.push(*(gid for gid, _ in changes))
+            self._last_update = max(updated_at for _, updated_at in changes)
@@ -1,16 +1,26 @@
 from __future__ import annotations
 
-from typing import Any, Awaitable, Callable, TypeVar
+from collections import defaultdict
+from itertools import zip_longest
+from typing import Any, Awaitable, Callable, TypeVar, TYPE_CHECKING
+from uuid import UUID
 
+import msgspec
 from structlog import BoundLogger
 
 from codeborn.logger import get_logger
-from codeborn.model import Message
-from codeborn.client.messages import MessageType
+from codeborn.client.messages import ApiMessage, MessageType
 from codeborn.engine.agents import BotAgent
 
+if TYPE_CHECKING:
+    from codeborn.config import CommandTickConfig
+    from codeborn.engine.world import World
 
-Route = TypeVar('Route', bound=Callable[[Message, BotAgent, BoundLogger], Awaitable[dict[str, Any] | Message | None]])
+
+Route = TypeVar(
+    'Route',
+    bound=Callable[[ApiMessage, BotAgent, 'World', BoundLogger], Awaitable[dict[str, Any] | ApiMessage | None]]
+)
 
 
 def error_response(reason: str, **kwargs) -> dict[str, str]:
@@ -31,12 +41,20 @@ def success_response(**kwargs) -> dict[str, str]:
 
 
 class Router:
-    """A simple command router."""
+    """A simple command router.
+
+    Commands are either handled as soon as they arrive by `match()`, or collected by
+    `enqueue()` and resolved together at the end of a tick by `resolve_tick()`.
+    """
 
     def __init__(self, routers: list[Router] | None = None) -> None:
         self._logger = get_logger(component='command_router')
         self.routers = routers or []
         self.routes = {}
+        self._pending: list[tuple[BotAgent, ApiMessage]] = []
+        self._unflushed: list[tuple[BotAgent, ApiMessage, dict[str, Any] | ApiMessage]] = []
+        self._ticks = 0
+        self._failed_flushes = 0
 
     def route(self, command: str) -> Callable[[Route], Route]:
         """Decorator that just prints when applied, returns the same function."""
@@ -45,27 +63,123 @@ class Router:
             return func
         return decorator
 
-    async def match(self, agent: BotAgent, message: Message) -> bool:
+    def find_route(self, command: str) -> Route | None:
+        """Find a handler of a command in this router or its sub-routers."""
+        if route := self.routes.get(command):
+            return route
+
+        for router in self.routers:
+            if route := router.find_route(command):
+                return route
+
+        return None
+
+    def enqueue(self, agent: BotAgent, message: ApiMessage) -> bool:
+        """Collect a command to be resolved at the end of the current tick."""
+        if self.find_route(message.payload['command']) is None:
+            return False
+
+        self._pending.append((agent, message))
+        return True
+
+    def _tick_order(self) -> list[tuple[BotAgent, ApiMessage]]:
+        """Order pending commands fairly: one command of every bot per round, bots sorted by gid.
+
+        Commands of a bot keep their order. The bot going first rotates every tick, so
+        the order doesn't depend on arrival times or favour any bot.
+        """
+        by_bot: dict[UUID, list[tuple[BotAgent, ApiMessage]]] = defaultdict(list)
+        for agent, message in self._pending:
+            by_bot[agent.bot.gid].append((agent, message))
+
+        bots = sorted(by_bot)
+        if bots:
+            start = self._ticks % len(bots)
+            bots = bots[start:] + bots[:start]
+
+        rounds = zip_longest(*(by_bot[bot_gid] for bot_gid in bots))
+        return [command for commands in rounds for command in commands if command is not None]
+
+    async def resolve_tick(self, world: World, config: CommandTickConfig) -> int:
+        """Resolve all commands collected during a tick in memory, persist the world once and respond.
+
+        Responses are sent only after the world is flushed, so a bot never sees a
+        result before it's stored. When the flush fails, responses are held until a
+        later tick flushes the world. Once more than `config.max_held` responses are
+        held or flushes failed `config.max_failed_flushes` times in a row, held
+        responses are replaced by errors. Returns the number of resolved commands.
+        """
+        commands = self._tick_order()
+        self._pending = []
+        self._ticks += 1
+
+        for agent, message in commands:
+            route = self.find_route(message.payload['command'])
+            assert route
+            if response := await self._handle(route, message, agent, world):
+                self._unflushed.append((agent, message, response))
+
+        try:
+            await world.flush()
+        except Exception as exc:
+            self._failed_flushes += 1
+            self._logger.exception(
+                'Persisting tick failed, holding responses until a flush succeeds.',
+                held=len(self._unflushed),
+                failed_flushes=self._failed_flushes,
+                exc_info=exc,
+            )
+            if len(self._unflushed) > config.max_held or self._failed_flushes >= config.max_failed_flushes:
+                responses, self._unflushed = self._unflushed, []
+                for agent, message, _ in responses:
+                    await self._respond(
+                        agent, message, error_response('World not persisted', command=message.payload['command'])
+                    )
+            return len(commands)
+
+        self._failed_flushes = 0
+        responses, self._unflushed = self._unflushed, []
+        for agent, message, response in responses:
+            await self._respond(agent, message, response)
+
+        return len(commands)
+
+    async def match(self, agent: BotAgent, message: ApiMessage, world: World) -> bool:
         """Match a command and execute the corresponding handler."""
         if route := self.routes.get(message.payload['command']):
-            if response := await route(message, agent, self._logger):
+            if response := await self._handle(route, message, agent, world):
                 await self._respond(agent, message, response)
             return True
 
         for router in self.routers:
-            if await router.match(agent, message):
+            if await router.match(agent, message, world):
                 return True
 
         return False
 
-    async def _respond(self, agent: BotAgent, message: Message, response: dict[str, Any] | Message) -> None:
+    async def _handle(
+        self,
+        route: Route,
+        message: ApiMessage,
+        agent: BotAgent,
+        world: World,
+    ) -> dict[str, Any] | ApiMessage | None:
+        """Run the handler of a command, get an error response when it fails."""
+        try:
+            return await route(message, agent, world, self._logger)
+        except Exception as exc:
+            self._logger.error('Command handling error.', exc_info=exc, bot_gid=agent.bot.gid)
+            return error_response('Command failed', command=message.payload['command'])
+
+    async def _respond(self, agent: BotAgent, message: ApiMessage, response: dict[str, Any] | ApiMessage) -> None:
         """Send a response message to the agent."""
         if isinstance(response, dict):
-            response = Message(
-                bot=agent.bot,
+            response = ApiMessage(
                 type=MessageType.command_result,
-                payload=response
+                payload=response,
+                response_to=message.gid
             )
+        else:
+            response = msgspec.structs.replace(response, response_to=message.gid)
 
-        response.response_to = message.gid
         await agent.send_message(response)
@@ -1,16 +1,17 @@
 from typing import Any
 from structlog import BoundLogger
 
-from codeborn.model import Army, Location, Message, Unit
+from codeborn.client.messages import ApiMessage
 from codeborn.engine.agents import BotAgent
 from codeborn.engine.commands import Router, error_response, success_response
+from codeborn.engine.world import World
 
 
 router = Router()
 
 
 @router.route('move')
-async def move(message: Message, agent: BotAgent, logger: BoundLogger) -> dict[str, Any]:
+async def move(message: ApiMessage, agent: BotAgent, world: World, logger: BoundLogger) -> dict[str, Any]:
     """Handle command messages received from bots.
 
     ```
@@ -23,15 +24,12 @@ async def move(message: Message, agent: BotAgent, logger: BoundLogger) -> dict[s
     }
     ```
     """
-    army = await Army.get_or_none(
-        gid=message.payload['army_gid'],
-        bot=agent.bot
-    ).prefetch_related('units', 'location')
+    army = world.get_army(agent.bot.gid, message.payload['army_gid'])
 
     if army is None:
         return error_response('Army not found')
 
-    new_location = await Location.get_or_none(**message.payload['location'])
+    new_location = world.get_location(**message.payload['location'])
 
     if new_location is None:
         return error_response('Location not found')
@@ -42,25 +40,25 @@ async def move(message: Message, agent: BotAgent, logger: BoundLogger) -> dict[s
     if not army.location.is_adjacent(new_location):
         return error_response('Destination not adjacent')
 
+    movement_cost = world.movement_cost(new_location)
+
     for unit in army.units:
-        if unit.stamina < new_location.terrain.movement_cost:
+        if unit.stamina < movement_cost:
             return error_response('Not enough stamina')
 
     for unit in army.units:
-        unit.stamina -= new_location.terrain.movement_cost
-        await unit.save(update_fields=['stamina'])
+        world.update_unit(unit, stamina=unit.stamina - movement_cost)
 
-    army.location = new_location
-    await army.save(update_fields=['location_id'])
+    world.move_army(army, new_location)
 
     return success_response(
-        army=await army.dump(),
-        location=await new_location.dump()
+        army=army.dump(),
+        location=new_location.dump()
     )
 
 
 @router.route('split')
-async def split(message: Message, agent: BotAgent, logger: BoundLogger) -> dict[str, Any]:
+async def split(message: ApiMessage, agent: BotAgent, world: World, logger: BoundLogger) -> dict[str, Any]:
     """Handle command messages received from bots.
 
     ```
@@ -73,10 +71,7 @@ async def split(message: Message, agent: BotAgent, logger: BoundLogger) -> dict[
     }
     ```
     """
-    army = await Army.get_or_none(
-        gid=message.payload['army_gid'],
-        bot=agent.bot
-    ).prefetch_related('units', 'location')
+    army = world.get_army(agent.bot.gid, message.payload['army_gid'])
 
     if army is None:
         return error_response('Army not found')
@@ -102,8 +97,7 @@ async def split(message: Message, agent: BotAgent, logger: BoundLogger) -> dict[
     if all(count == 0 for count in old_units.values()):
         return error_response('Cannot split all units from army')
 
-    new_army = Army(bot=agent.bot, location=army.location)
-    await new_army.save()
+    new_army = world.add_army(agent.bot.gid, army.location)
 
     # Remove units from original army
     for unit_gid, count in old_units.items():
@@ -111,30 +105,21 @@ async def split(message: Message, agent: BotAgent, logger: BoundLogger) -> dict[
 
         if orig_unit.count != count:
             if count == 0:
-                await orig_unit.delete()
+                world.remove_unit(orig_unit)
             else:
-                orig_unit.count = count
-                await orig_unit.save(update_fields=['count'])
+                world.update_unit(orig_unit, count=count)
 
         if new_count := message.payload['units'].get(str(unit_gid), 0):
-            new_unit = Unit(
-                army=new_army,
-                type=orig_unit.type,
-                count=new_count,
-                stamina=orig_unit.stamina
-            )
-            await new_unit.save()
-
-    await new_army.fetch_related('units', 'location')
+            world.add_unit(new_army, orig_unit.type, new_count, orig_unit.stamina)
 
     return success_response(
-        orig=await army.dump(),
-        new=await new_army.dump()
+        orig=army.dump(),
+        new=new_army.dump()
     )
 
 
 @router.route('merge')
-async def merge(message: Message, agent: BotAgent, logger: BoundLogger) -> dict[str, Any]:
+async def merge(message: ApiMessage, agent: BotAgent, world: World, logger: BoundLogger) -> dict[str, Any]:
     """Handle command messages received from bots.
 
     ```
@@ -153,10 +138,7 @@ async def merge(message: Message, agent: BotAgent, logger: BoundLogger) -> dict[
 
     armies = []
     for army_gid in armies_gids:
-        army = await Army.get_or_none(
-            gid=army_gid,
-            bot=agent.bot
-        ).prefetch_related('units', 'location')
+        army = world.get_army(agent.bot.gid, army_gid)
 
         if army is None:
             return error_response(f'Army {army_gid} not found')
@@ -166,24 +148,21 @@ async def merge(message: Message, agent: BotAgent, logger: BoundLogger) -> dict[
     target_army = armies[0]
     merged_armies = armies[1:]
 
-    for army in merged_armies:
-        if army.location != target_army.location:
-            return error_response('All armies must be in the same location to merge')
+    if any(army.location != target_army.location for army in merged_armies):
+        return error_response('All armies must be in the same location to merge')
 
-        for unit in army.units:
+    for army in merged_armies:
+        for unit in list(army.units):
             target_unit = next((u for u in target_army.units if u.type == unit.type), None)
             if target_unit is None:
-                unit.army = target_army
-                await unit.save(update_fields=['army_id'])
+                world.update_unit(unit, army=target_army)
             else:
                 total_count = target_unit.count + unit.count
-                target_unit.stamina = (
+                stamina = (
                     (target_unit.stamina * target_unit.count) +
                     (unit.stamina * unit.count)
                 ) / total_count
-                target_unit.count = total_count
-                await target_unit.save(update_fields=['count', 'stamina'])
-                await unit.delete()
-        await army.delete()
-    await target_army.fetch_related('units', 'location')
-    return success_response(army=await target_army.dump())
+                world.update_unit(target_unit, count=total_count, stamina=stamina)
+                world.remove_unit(unit)
+        world.remove_army(army)
+    return success_response(army=target_army.dump())
@@ -1,13 +1,30 @@
 import asyncio
 import datetime
-from typing import AsyncIterator, cast
+from collections import Counter
+from typing import Any, AsyncIterator, Awaitable, Callable, cast
+from uuid import UUID
 
-from codeborn.client.messages import MessageType
-from codeborn.config import AgentsHeartbeatConfig, AgentsRestartConfig, StateUpdateConfig
+from structlog import BoundLogger
+
+from codeborn.client.messages import ApiMessage, MessageType
+from codeborn.config import (
+    AgentsFanoutConfig, AgentsHeartbeatConfig, AgentsRestartConfig, BudgetAction, CommandTickConfig, DatabaseConfig,
+    MapReloadConfig, MessageRetentionConfig, MetricsConfig, ResourceSamplingConfig, StateUpdateConfig,
+    WorldPersistenceConfig
+)
+from codeborn.database import MAP_CHANGES_CHANNEL, listen
 from codeborn.logger import get_logger
-from codeborn.model import Bot, BotMemory, Message
+from codeborn.model import Bot, BotMemory
 from codeborn.engine.agents import BotAgent
 from codeborn.engine.agents.registry import AgentRegistry
+from codeborn.engine.backoff import RestartBackoff
+from codeborn.engine.changes import BotChangeFeed
+from codeborn.engine.commands import Router
+from codeborn.engine.metrics import get_metrics
+from codeborn.engine.resources import ResourceHistory, ResourceUsage
+from codeborn.engine.retention import apply_retention
+from codeborn.engine.state import build_state_snapshots
+from codeborn.engine.world import World
 
 
 async def delay(interval: float) -> AsyncIterator[int]:
@@ -28,16 +45,58 @@ async def delay(interval: float) -> AsyncIterator[int]:
         return
 
 
-async def send_state_update(agent: BotAgent) -> None:
-    """Send the latest world state to a given agent."""
-    await agent.bot.fetch_related('armies', 'armies__units', 'armies__location')
+async def fan_out(
+    agents: list[BotAgent],
+    send: Callable[[BotAgent], Awaitable[None]],
+    config: AgentsFanoutConfig,
+    logger: BoundLogger,
+) -> Counter[str]:
+    """Send messages to all agents concurrently.
+
+    Agents whose stdin doesn't drain a write within `send_timeout` are slow consumers,
+    they are skipped until they catch up, so their outboxes don't grow.
+    """
+    semaphore = asyncio.Semaphore(config.concurrency)
+    counts: Counter[str] = Counter()
+
+    async def send_one(agent: BotAgent) -> None:
+        if agent.slow_consumer:
+            logger.warning('Agent is a slow consumer.', bot_gid=agent.bot.gid, timeout=config.send_timeout)
+            counts['skipped'] += 1
+            return
+
+        async with semaphore:
+            try:
+                await send(agent)
+                counts['sent'] += 1
+            except Exception as exc:
+                logger.warning('Sending message failed.', bot_gid=agent.bot.gid, exc_info=exc)
+                counts['failed'] += 1
 
-    game_state = {
-        'me': await agent.bot.dump()
-    }
+    await asyncio.gather(*(send_one(agent) for agent in agents))
+    return counts
+
+
+def log_tick(logger: BoundLogger, started_at: float, counts: Counter[str]) -> None:
+    """Log duration and send counts of a single tick."""
+    duration = asyncio.get_running_loop().time() - started_at
+    log = logger.warning if counts['skipped'] or counts['failed'] else logger.debug
+    log(
+        'Tick finished.',
+        duration=round(duration, 4),
+        sent=counts['sent'],
+        skipped=counts['skipped'],
+        failed=counts['failed'],
+    )
 
-    message = Message(
-        bot=agent.bot,
+
+async def send_state_update(agent: BotAgent, game_state: dict[str, Any]) -> None:
+    """Send the latest world state to a given agent.
+
+    It is sent as a delta against the previous state sent to the agent if possible.
+    A state still waiting in the agent's outbox is replaced.
+    """
+    message = ApiMessage(
         type=MessageType.state_sync,
         payload=game_state
     )
@@ -47,58 +106,119 @@ async def send_state_update(agent: BotAgent) -> None:
 async def upload_memory(agent: BotAgent) -> None:
     """Send message with memory dump to a given agent."""
     memory = cast(BotMemory, await agent.bot.memory)
-    message = Message(
-        bot=agent.bot,
+    message = ApiMessage(
         type=MessageType.memory_download,  # download from bots PoV
         payload=await memory.dump(exclude=['gid', 'bot_gid'])
     )
     await agent.send_message(message)
 
 
-async def heartbeat(config: AgentsHeartbeatConfig, registry: AgentRegistry) -> None:
-    """Send heartbeat messages to all agents every second."""
+async def heartbeat(
+    config: AgentsHeartbeatConfig,
+    fanout: AgentsFanoutConfig,
+    registry: AgentRegistry,
+    changes: BotChangeFeed,
+) -> None:
+    """Send heartbeat messages to all agents every interval."""
     logger = get_logger(component='heartbeat')
+    loop = asyncio.get_running_loop()
+
+    async def send_heartbeat(agent: BotAgent) -> None:
+        message = ApiMessage(type=MessageType.heartbeat_request)
+        await agent.send_message(message)
+
     try:
         logger.info('Started')
 
         async for _ in delay(config.interval):
+            started_at = loop.time()
+            alive_agents = []
+
             for agent in await registry.get_agents():
-                heartbeat_age = agent.bot.heartbeat_age.total_seconds() if agent.bot.heartbeat_age else None
+                heartbeat_age = agent.heartbeat_age.total_seconds()
                 if not agent.is_alive:
                     logger.warning(
                         'Agent not running.',
                         bot_gid=agent.bot.gid,
                         heartbeat_age=heartbeat_age
                     )
-                    await registry.remove_agent(agent.bot.gid)
+                    if await registry.remove_agent(agent.bot.gid, agent):
+                        changes.push(agent.bot.gid)  # Let restart bring it back
 
-                elif heartbeat_age is not None and heartbeat_age > config.timeout:
+                elif heartbeat_age > config.timeout:
                     logger.warning(
                         'Agent heartbeat timeout.',
                         bot_gid=agent.bot.gid,
                         heartbeat_age=heartbeat_age
                     )
-                    await registry.remove_agent(agent.bot.gid)
+                    if await registry.remove_agent(agent.bot.gid, agent):
+                        changes.push(agent.bot.gid)  # Let restart bring it back
 
                 else:
-                    message = Message(
-                        bot=agent.bot,
-                        type=MessageType.heartbeat_request,
-                    )
-                    await agent.send_message(message)
+                    alive_agents.append(agent)
+
+            counts = await fan_out(alive_agents, send_heartbeat, fanout, logger)
+            log_tick(logger, started_at, counts)
+    finally:
+        logger.info('Stopped.')
+
+
+async def save_heartbeats(registry: AgentRegistry) -> int:
+    """Write heartbeats received since the last save to the database in one UPDATE."""
+    agents = [agent for agent in await registry.get_agents() if not agent.heartbeat_persisted]
+    if not agents:
+        return 0
+
+    for agent in agents:
+        agent.bot.last_heartbeat = agent.last_heartbeat
+        agent.heartbeat_persisted = True
+
+    await Bot.bulk_update([agent.bot for agent in agents], fields=['last_heartbeat'])
+    return len(agents)
+
+
+async def persist_heartbeats(config: AgentsHeartbeatConfig, registry: AgentRegistry) -> None:
+    """Periodically write in-memory heartbeats of all agents to the database."""
+    logger = get_logger(component='persist_heartbeats')
+    try:
+        logger.info('Started')
+
+        async for _ in delay(config.persist_interval):
+            try:
+                count = await save_heartbeats(registry)
+                logger.debug('Heartbeats persisted.', count=count)
+            except Exception as exc:
+                logger.exception('Persisting heartbeats failed.', exc_info=exc)
     finally:
         logger.info('Stopped.')
 
 
-async def restart(config: AgentsRestartConfig, registry: AgentRegistry) -> None:
-    """Check agents that need to be restarted every interval."""
+async def restart(
+    config: AgentsRestartConfig,
+    state_update: StateUpdateConfig,
+    registry: AgentRegistry,
+    world: World,
+    changes: BotChangeFeed,
+) -> None:
+    """Start, stop and restart agents of bots as they change."""
     logger = get_logger(component='restart')
+    loop = asyncio.get_running_loop()
+    metrics = get_metrics()
+
+    admission = asyncio.Semaphore(config.concurrency)
+    backoff = RestartBackoff(config)
+    starting: set[UUID] = set()
+    startups = Counter[str]()
+    metrics.gauge('agents.startup.queued', lambda: startups['queued'])
+    metrics.gauge('agents.startup.running', lambda: startups['running'])
 
     async def restart_agent(bot: Bot) -> None:
         """Restart an agent for a given bot."""
+        await world.load_bot(bot.gid)
         agent = await registry.restart_agent(bot)
 
-        await send_state_update(agent)  # Send initial state update early
+        snapshots = await build_state_snapshots(world, [bot], state_update.vision_radius)
+        await send_state_update(agent, snapshots[bot.gid])  # Send initial state update early
         await upload_memory(agent)  # Send memory dump early
 
         bot.restart_requested = False
@@ -106,32 +226,273 @@ async def restart(config: AgentsRestartConfig, registry: AgentRegistry) -> None:
         bot.last_heartbeat = None  # type: ignore
         await bot.save(update_fields=['restart_requested', 'start_at', 'last_heartbeat'])
 
+    async def start_agent(bot: Bot) -> None:
+        """Start an agent once admitted, back off when the start fails."""
+        startups['queued'] += 1
+        try:
+            await admission.acquire()
+        finally:
+            startups['queued'] -= 1
+
+        startups['running'] += 1
+        started_at = loop.time()
+        try:
+            await restart_agent(bot)
+            backoff.started(bot.gid, loop.time())
+            metrics.observe('agents.startup.seconds', loop.time() - started_at)
+        except Exception as exc:
+            logger.error('Starting agent failed.', exc_info=exc, bot_gid=str(bot.gid))
+            metrics.increment('agents.startup.failed')
+            backoff.failed(bot.gid, loop.time())
+            schedule_retry(bot)
+        finally:
+            startups['running'] -= 1
+            starting.discard(bot.gid)
+            admission.release()
+
+    def schedule_retry(bot: Bot) -> None:
+        """Reconcile a bot again once its backoff expires."""
+        retry_in = backoff.retry_in(bot.gid, loop.time())
+        logger.info('Delaying agent start.', bot_gid=str(bot.gid), retry_in=round(retry_in, 1))
+        loop.call_later(retry_in, changes.push, bot.gid)
+
+    async def reconcile(bots: list[Bot], tg: asyncio.TaskGroup) -> None:
+        """Bring agents of given bots to their desired state."""
+        for bot in bots:
+            if bot.gid in starting:
+                continue  # The start saves the bot, so it's reconciled again afterwards
+
+            if not bot.enabled:
+                backoff.reset(bot.gid)
+                if await registry.get_agent(bot.gid) is not None:
+                    logger.info('Stopping disabled agent.', bot_gid=str(bot.gid), bot_name=bot.entry_point)
+                    await registry.remove_agent(bot.gid)
+                else:
+                    logger.info('Skipping disabled agent.', bot_gid=str(bot.gid), bot_name=bot.entry_point)
+                continue
+
+            if bot.restart_requested:
+                if not backoff.is_failing(bot.gid):
+                    backoff.reset(bot.gid)  # Explicit restart starts with a clean record
+            elif await registry.get_agent(bot.gid):
+                continue
+            elif backoff.was_started(bot.gid) and not backoff.is_failing(bot.gid):
+                logger.warning('Agent crashed.', bot_gid=str(bot.gid), bot_name=bot.entry_point)
+                metrics.increment('agents.crashed')
+                backoff.failed(bot.gid, loop.time())
+
+            if backoff.retry_in(bot.gid, loop.time()) > 0:
+                schedule_retry(bot)
+                continue
+
+            logger.info('Starting agent.', bot_gid=str(bot.gid), bot_name=bot.entry_point)
+            starting.add(bot.gid)
+            tg.create_task(start_agent(bot))
+
     try:
         logger.info('Started')
+        async with asyncio.TaskGroup() as tg:
+            await reconcile(await Bot.filter(enabled=True), tg)
 
-        async for _ in delay(config.interval):
-            for bot in await Bot.all():
-                if not bot.enabled:
-                    if await registry.get_agent(bot.gid) is not None:
-                        logger.info('Stopping disabled agent.', bot_gid=str(bot.gid), bot_name=bot.entry_point)
-                        await registry.remove_agent(bot.gid)
-                    else:
-                        logger.info('Skipping disabled agent.', bot_gid=str(bot.gid), bot_name=bot.entry_point)
-                elif bot.restart_requested or not await registry.get_agent(bot.gid):
-                    logger.info('Starting agent.', bot_gid=str(bot.gid), bot_name=bot.entry_point)
-                    await restart_agent(bot)
+            async for bot_gids in changes:
+                bots = await Bot.filter(gid__in=bot_gids)
+                await reconcile(bots, tg)
+
+                for bot_gid in bot_gids - {bot.gid for bot in bots}:
+                    backoff.reset(bot_gid)
+                    world.unload_bot(bot_gid)
+                    if await registry.get_agent(bot_gid) is not None:
+                        logger.info('Stopping agent of deleted bot.', bot_gid=str(bot_gid))
+                        await registry.remove_agent(bot_gid)
     finally:
+        metrics.remove_gauge('agents.startup.queued')
+        metrics.remove_gauge('agents.startup.running')
         logger.info('Stopped.')
 
 
-async def state_update(config: StateUpdateConfig, registry: AgentRegistry):
+async def state_update(
+    config: StateUpdateConfig,
+    fanout: AgentsFanoutConfig,
+    registry: AgentRegistry,
+    world: World,
+) -> None:
     """Periodically update all bots with the latest world state."""
     logger = get_logger(component='state_update')
+    loop = asyncio.get_running_loop()
     try:
         logger.info('Started')
 
         async for _ in delay(config.interval):
-            for agent in await registry.get_agents():
-                await send_state_update(agent)
+            started_at = loop.time()
+            agents = await registry.get_agents()
+            snapshots = await build_state_snapshots(world, [agent.bot for agent in agents], config.vision_radius)
+            counts = await fan_out(
+                agents,
+                lambda agent: send_state_update(agent, snapshots[agent.bot.gid]),
+                fanout,
+                logger,
+            )
+            log_tick(logger, started_at, counts)
+    finally:
+        logger.info('Stopped.')
+
+
+async def persist_world(config: WorldPersistenceConfig, world: World) -> None:
+    """Periodically write changes of the in-memory world to the database."""
+    logger = get_logger(component='persist_world')
+    try:
+        logger.info('Started')
+
+        async for _ in delay(config.interval):
+            try:
+                await world.flush()
+            except Exception as exc:
+                logger.exception('Persisting world failed.', exc_info=exc)
+    finally:
+        logger.info('Stopped.')
+
+
+async def reload_map(database: DatabaseConfig, config: MapReloadConfig, world: World) -> None:
+    """Reload the terrain grid of the world whenever the map generator writes a new map."""
+    logger = get_logger(component='map_reload')
+    try:
+        logger.info('Started')
+
+        while True:
+            try:
+                wake_up = asyncio.Event()
+                closed = asyncio.Event()
+                async with listen(database, MAP_CHANGES_CHANNEL, lambda _payload: wake_up.set()) as connection:
+                    connection.add_termination_listener(lambda _conn: (closed.set(), wake_up.set()))
+                    logger.info('Listening for map changes.')
+                    while not closed.is_set():
+                        await wake_up.wait()
+                        wake_up.clear()
+                        if not closed.is_set():
+                            await world.reload_terrain()
+                logger.warning('Map changes connection lost.')
+            except Exception as exc:
+                logger.warning('Listening for map changes failed.', exc_info=exc)
+            await asyncio.sleep(config.interval)
+    finally:
+        logger.info('Stopped.')
+
+
+async def command_tick(config: CommandTickConfig, router: Router, world: World) -> None:
+    """Resolve commands collected by the router once per tick."""
+    logger = get_logger(component='command_tick')
+    metrics = get_metrics()
+    loop = asyncio.get_running_loop()
+    try:
+        logger.info('Started')
+
+        async for _ in delay(config.interval):
+            started_at = loop.time()
+            if count := await router.resolve_tick(world, config):
+                metrics.observe('commands.tick.size', count)
+                metrics.observe('commands.tick.seconds', loop.time() - started_at)
+    finally:
+        logger.info('Stopped.')
+
+
+RESOURCE_GAUGES = {
+    'agent.cpu_percent': 'cpu_percent',
+    'agent.rss_bytes': 'rss_bytes',
+    'agent.io_read_bytes_per_second': 'read_bytes_per_second',
+    'agent.io_write_bytes_per_second': 'write_bytes_per_second',
+}
+
+
+def over_budget(config: ResourceSamplingConfig, usage: ResourceUsage) -> dict[str, float]:
+    """Get usage exceeding the configured budgets, keyed by resource."""
+    exceeded = {}
+    if config.cpu_budget is not None and usage.cpu_percent > config.cpu_budget:
+        exceeded['cpu_percent'] = usage.cpu_percent
+    if config.memory_budget is not None and usage.rss_bytes > config.memory_budget:
+        exceeded['rss_bytes'] = usage.rss_bytes
+    return exceeded
+
+
+async def sample_resources(config: ResourceSamplingConfig, registry: AgentRegistry, changes: BotChangeFeed) -> None:
+    """Periodically sample CPU, memory and I/O of all agents and enforce resource budgets."""
+    logger = get_logger(component='resources')
+    metrics = get_metrics()
+    loop = asyncio.get_running_loop()
+    histories: dict[UUID, tuple[BotAgent, ResourceHistory]] = {}
+
+    def usage_getter(history: ResourceHistory, field: str) -> Callable[[], float]:
+        return lambda: getattr(history.usage, field, 0.0)
+
+    def forget(bot_gid: UUID) -> None:
+        histories.pop(bot_gid, None)
+        for name in RESOURCE_GAUGES:
+            metrics.remove_gauge(name, bot_gid=bot_gid)
+
+    try:
+        logger.info('Started')
+
+        async for _ in delay(config.interval):
+            agents = {agent.bot.gid: agent for agent in await registry.get_agents()}
+            for bot_gid, (agent, _) in list(histories.items()):
+                if agents.get(bot_gid) is not agent:
+                    forget(bot_gid)  # Removed or replaced by a new agent
+
+            for bot_gid, agent in agents.items():
+                if bot_gid not in histories:
+                    if not (reader := await agent.resource_reader()):
+                        continue
+                    history = ResourceHistory(reader, config.window)
+                    histories[bot_gid] = (agent, history)
+                    for name, field in RESOURCE_GAUGES.items():
+                        metrics.gauge(name, usage_getter(history, field), bot_gid=bot_gid)
+
+                _, history = histories[bot_gid]
+                try:
+                    history.sample(loop.time())
+                except OSError:
+                    forget(bot_gid)  # The agent exited, the heartbeat will notice it
+                    continue
+
+                if not (usage := history.usage) or not (exceeded := over_budget(config, usage)):
+                    continue
+
+                metrics.increment('agent.resources.over_budget', action=config.budget_action.value)
+                logger.warning('Agent over resource budget.', bot_gid=bot_gid, action=config.budget_action, **exceeded)
+                if config.budget_action == BudgetAction.throttle:
+                    await agent.throttle(config.throttle_duration)
+                elif config.budget_action == BudgetAction.restart:
+                    forget(bot_gid)
+                    if await registry.remove_agent(bot_gid, agent):
+                        changes.push(bot_gid)  # Let restart bring it back
+    finally:
+        for bot_gid in list(histories):
+            forget(bot_gid)
+        logger.info('Stopped.')
+
+
+async def report_metrics(config: MetricsConfig) -> None:
+    """Periodically log all engine metrics."""
+    logger = get_logger(component='metrics')
+    metrics = get_metrics()
+    try:
+        logger.info('Started')
+
+        async for _ in delay(config.interval):
+            logger.info('Engine metrics.', **metrics.collect())
+    finally:
+        logger.info('Stopped.')
+
+
+async def message_retention(config: MessageRetentionConfig) -> None:
+    """Periodically prepare upcoming message partitions and drop expired ones."""
+    logger = get_logger(component='message_retention')
+    try:
+        logger.info('Started')
+
+        async for _ in delay(config.interval):
+            try:
+                await apply_retention(config)
+            except Exception as exc:
+                logger.exception('Message retention failed.', exc_info=exc)
     finally:
         logger.info('Stopped.')
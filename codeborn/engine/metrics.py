@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from collections import Counter
+from functools import cache
+from typing import Callable
+
+
+def metric_name(name: str, **labels: object) -> str:
+    """Get a metric name with labels, e.g. `message_sink.dropped{type=bot_log}`."""
+    if not labels:
+        return name
+    return name + '{' + ','.join(f'{key}={value}' for key, value in sorted(labels.items())) + '}'
+
+
+class Metrics:
+    """In-process registry of engine counters and gauges."""
+
+    def __init__(self) -> None:
+        self._counters: Counter[str] = Counter()
+        self._gauges: dict[str, Callable[[], float]] = {}
+
+    def increment(self, name: str, value: float = 1, **labels: object) -> None:
+        """Increment a counter."""
+        self._counters[metric_name(name, **labels)] += value
+
+    def observe(self, name: str, value: float, **labels: object) -> None:
+        """Record an observation, e.g. a duration, as `.count`, `.sum` and `.max` counters."""
+        self._counters[metric_name(f'{name}.count', **labels)] += 1
+        self._counters[metric_name(f'{name}.sum', **labels)] += value
+        max_name = metric_name(f'{name}.max', **labels)
+        self._counters[max_name] = max(self._counters[max_name], value)
+
+    def gauge(self, name: str, getter: Callable[[], float], **labels: object) -> None:
+        """Register a gauge evaluated every time metrics are collected."""
+        self._gauges[metric_name(name, **labels)] = getter
+
+    def remove_gauge(self, name: str, **labels: object) -> None:
+        """Unregister a gauge."""
+        self._gauges.pop(metric_name(name, **labels), None)
+
+    def collect(self) -> dict[str, float]:
+        """Get current values of all counters and gauges."""
+        values: dict[str, float] = dict(self._counters)
+        for name, getter in self._gauges.items():
+            values[name] = getter()
+        return dict(sorted(values.items()))
+
+
+@cache
+def get_metrics() -> Metrics:
+    """Get the engine metrics registry."""
+    return Metrics()
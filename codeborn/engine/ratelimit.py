@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from uuid import UUID
+
+from codeborn.config import AgentsRateLimitConfig, RateLimitConfig
+
+
+PRUNE_INTERVAL = 60.0
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at a fixed rate."""
+
+    __slots__ = ('_config', '_tokens', '_updated_at')
+
+    def __init__(self, config: RateLimitConfig, now: float) -> None:
+        self._config = config
+        self._tokens = float(config.burst)
+        self._updated_at = now
+
+    def refill(self, now: float) -> float:
+        """Add tokens accumulated since the last refill and get the current number of tokens."""
+        elapsed = max(0.0, now - self._updated_at)
+        self._tokens = min(float(self._config.burst), self._tokens + elapsed * self._config.rate)
+        self._updated_at = now
+        return self._tokens
+
+    def is_full(self, now: float) -> bool:
+        """Check if the bucket is as good as a new one."""
+        return self.refill(now) >= self._config.burst
+
+    def take(self) -> None:
+        """Take a token, the bucket must be refilled first."""
+        self._tokens -= 1
+
+
+class RateLimiter:
+    """Per-bot and per-command rate limits of bot commands.
+
+    A command is allowed only if both the bot's bucket and the bucket of the bot's
+    command type have a token, then a token is taken from each. Buckets that refilled
+    completely are forgotten from time to time, they are recreated full.
+    """
+
+    def __init__(self, config: AgentsRateLimitConfig) -> None:
+        self._config = config
+        self._buckets: dict[tuple[UUID, str | None], TokenBucket] = {}
+        self._pruned_at = 0.0
+
+    def _bucket(self, bot_gid: UUID, command: str | None, config: RateLimitConfig, now: float) -> TokenBucket:
+        """Get a bucket of a bot, creating a full one if needed."""
+        if (bucket := self._buckets.get((bot_gid, command))) is None:
+            bucket = self._buckets[bot_gid, command] = TokenBucket(config, now)
+        return bucket
+
+    def allow(self, bot_gid: UUID, command: str, now: float) -> bool:
+        """Check if a bot may run a command now and take its tokens if so."""
+        if now - self._pruned_at >= PRUNE_INTERVAL:
+            self.prune(now)
+
+        buckets = [self._bucket(bot_gid, None, self._config.per_bot, now)]
+        if command_config := self._config.per_command.get(command):
+            buckets.append(self._bucket(bot_gid, command, command_config, now))
+
+        if any(bucket.refill(now) < 1 for bucket in buckets):
+            return False
+
+        for bucket in buckets:
+            bucket.take()
+        return True
+
+    def prune(self, now: float) -> None:
+        """Forget buckets which refilled completely."""
+        self._buckets = {
+            key: bucket for key, bucket in self._buckets.items()
+            if not bucket.is_full(now)
+        }
+        self._pruned_at = now
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import abc
+import os
+from collections import deque
+from pathlib import Path
+
+import msgspec
+
+
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+CGROUP_ROOT = Path('/sys/fs/cgroup')
+
+
+class ResourceSample(msgspec.Struct, frozen=True):
+    """Cumulative resource counters of an agent at a point in time."""
+
+    at: float
+    cpu_seconds: float
+    rss_bytes: int
+    read_bytes: int
+    write_bytes: int
+
+
+class ResourceUsage(msgspec.Struct, frozen=True):
+    """Resource usage of an agent averaged over the rolling window."""
+
+    cpu_percent: float
+    rss_bytes: float
+    read_bytes_per_second: float
+    write_bytes_per_second: float
+
+
+class ResourceReader(abc.ABC):
+    """Source of resource counters of a single agent."""
+
+    @abc.abstractmethod
+    def read(self, at: float) -> ResourceSample:
+        """Read current counters, raise OSError if they are not available anymore."""
+
+
+class ProcReader(ResourceReader):
+    """Read counters of a process from `/proc/<pid>`."""
+
+    def __init__(self, pid: int) -> None:
+        self._path = Path(f'/proc/{pid}')
+
+    def read(self, at: float) -> ResourceSample:
+        # The command in the second field may contain spaces, fields after it are fixed
+        stat = (self._path / 'stat').read_text().rsplit(')', 1)[1].split()
+        utime, stime = int(stat[11]), int(stat[12])
+
+        rss_bytes = 0
+        for line in (self._path / 'status').read_text().splitlines():
+            if line.startswith('VmRSS:'):
+                rss_bytes = int(line.split()[1]) * 1024
+
+        io = self._read_io()
+        return ResourceSample(
+            at=at,
+            cpu_seconds=(utime + stime) / CLOCK_TICKS,
+            rss_bytes=rss_bytes,
+            read_bytes=io.get('read_bytes', 0),
+            write_bytes=io.get('write_bytes', 0),
+        )
+
+    def _read_io(self) -> dict[str, int]:
+        """Read I/O counters, they are readable only by the owner of the process."""
+        try:
+            lines = (self._path / 'io').read_text().splitlines()
+        except PermissionError:
+            return {}
+        return {name: int(value) for name, value in (line.split(': ') for line in lines)}
+
+
+class CgroupReader(ResourceReader):
+    """Read counters of a container from its cgroup v2 directory."""
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+
+    @classmethod
+    def for_container(cls, container_id: str) -> CgroupReader | None:
+        """Find the cgroup of a Docker container, with either the systemd or the cgroupfs driver."""
+        systemd_path = CGROUP_ROOT / 'system.slice' / f'docker-{container_id}.scope'
+        cgroupfs_path = CGROUP_ROOT / 'docker' / container_id
+        for path in (systemd_path, cgroupfs_path):
+            if path.is_dir():
+                return cls(path)
+        return None
+
+    def read(self, at: float) -> ResourceSample:
+        cpu_usec = 0
+        for line in (self._path / 'cpu.stat').read_text().splitlines():
+            name, value = line.split()
+            if name == 'usage_usec':
+                cpu_usec = int(value)
+
+        read_bytes = write_bytes = 0
+        for line in (self._path / 'io.stat').read_text().splitlines():
+            for field in line.split()[1:]:
+                name, value = field.split('=')
+                if name == 'rbytes':
+                    read_bytes += int(value)
+                elif name == 'wbytes':
+                    write_bytes += int(value)
+
+        return ResourceSample(
+            at=at,
+            cpu_seconds=cpu_usec / 1_000_000,
+            rss_bytes=int((self._path / 'memory.current').read_text()),
+            read_bytes=read_bytes,
+            write_bytes=write_bytes,
+        )
+
+
+class ResourceHistory:
+    """Rolling window of resource samples of a single agent."""
+
+    def __init__(self, reader: ResourceReader, window: int) -> None:
+        self.reader = reader
+        self._samples: deque[ResourceSample] = deque(maxlen=window + 1)
+
+    def sample(self, at: float) -> None:
+        """Read and remember new counters."""
+        self._samples.append(self.reader.read(at))
+
+    @property
+    def usage(self) -> ResourceUsage | None:
+        """Get usage averaged over the window, None until there are two samples."""
+        if len(self._samples) < 2:
+            return None
+
+        first, last = self._samples[0], self._samples[-1]
+        duration = (last.at - first.at) or 1e-9
+        return ResourceUsage(
+            cpu_percent=(last.cpu_seconds - first.cpu_seconds) / duration * 100,
+            rss_bytes=sum(sample.rss_bytes for sample in self._samples) / len(self._samples),
+            read_bytes_per_second=(last.read_bytes - first.read_bytes) / duration,
+            write_bytes_per_second=(last.write_bytes - first.write_bytes) / duration,
+        )
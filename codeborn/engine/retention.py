@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import re
+from datetime import date, datetime, time, timedelta, timezone
+
+from tortoise import Tortoise
+
+from codeborn.client.messages import MessageType
+from codeborn.config import MessageRetentionConfig
+from codeborn.logger import get_logger
+
+
+MESSAGE_TABLE = 'message'
+PARTITION_PREFIX = f'{MESSAGE_TABLE}_p'
+DEFAULT_SUBPARTITION = 'default'
+PARTITION_RE = re.compile(rf'^{PARTITION_PREFIX}(?P<day>\d{{8}})$')
+SUBPARTITION_RE = re.compile(rf'^{PARTITION_PREFIX}(?P<day>\d{{8}})_(?P<type>\w+)$')
+
+
+def day_start(day: date) -> datetime:
+    """Get the UTC start of a day."""
+    return datetime.combine(day, time(), tzinfo=timezone.utc)
+
+
+def partition_name(day: date) -> str:
+    """Name of the partition holding messages of a day."""
+    return f'{PARTITION_PREFIX}{day:%Y%m%d}'
+
+
+def subpartition_name(day: date, message_type: MessageType | None) -> str:
+    """Name of the sub-partition holding messages of a type (or all unknown types) of a day."""
+    return f'{partition_name(day)}_{message_type.value if message_type else DEFAULT_SUBPARTITION}'
+
+
+def retention_of(config: MessageRetentionConfig, message_type: MessageType | None) -> timedelta:
+    """Get retention period of a message type."""
+    if message_type is not None and message_type in config.retention:
+        return timedelta(seconds=config.retention[message_type])
+    return timedelta(seconds=config.default_retention)
+
+
+async def list_partitions(parent: str) -> list[str]:
+    """List names of direct partitions of a table."""
+    rows = await Tortoise.get_connection('default').execute_query_dict(
+        """
+        SELECT child.relname AS name
+        FROM pg_inherits
+        JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid
+        JOIN pg_class AS parent ON parent.oid = pg_inherits.inhparent
+        WHERE parent.relname = $1
+        """,
+        [parent]
+    )
+    return [row['name'] for row in rows]
+
+
+async def create_partitions(days: list[date]) -> None:
+    """Create daily partitions of the message table, each sub-partitioned by message type."""
+    statements = []
+    for day in days:
+        name = partition_name(day)
+        start = day_start(day).isoformat()
+        end = day_start(day + timedelta(days=1)).isoformat()
+        statements.append(
+            f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{MESSAGE_TABLE}" '
+            f"FOR VALUES FROM ('{start}') TO ('{end}') PARTITION BY LIST (\"type\");"
+        )
+        for message_type in MessageType:
+            statements.append(
+                f'CREATE TABLE IF NOT EXISTS "{subpartition_name(day, message_type)}" PARTITION OF "{name}" '
+                f"FOR VALUES IN ('{message_type.value}');"
+            )
+        statements.append(f'CREATE TABLE IF NOT EXISTS "{subpartition_name(day, None)}" PARTITION OF "{name}" DEFAULT;')
+
+    await Tortoise.get_connection('default').execute_script('\n'.join(statements))
+
+
+async def drop_expired_partitions(config: MessageRetentionConfig, now: datetime) -> list[str]:
+    """Drop partitions whose newest possible message is older than the retention of its type.
+
+    Dropping a partition is O(1) regardless of the number of rows in it. Retention
+    is effectively rounded up to the end of the day the message was stored in.
+    """
+    connection = Tortoise.get_connection('default')
+    dropped = []
+
+    for name in await list_partitions(MESSAGE_TABLE):
+        if not (match := PARTITION_RE.match(name)):
+            continue
+
+        day_end = day_start(datetime.strptime(match['day'], '%Y%m%d').date() + timedelta(days=1))
+        subpartitions = await list_partitions(name)
+
+        expired = []
+        for subpartition in subpartitions:
+            if not (sub_match := SUBPARTITION_RE.match(subpartition)):
+                continue
+            message_type = MessageType._value2member_map_.get(sub_match['type'])  # None for the default one
+            if day_end + retention_of(config, message_type) <= now:  # type: ignore
+                expired.append(subpartition)
+
+        if subpartitions and len(expired) == len(subpartitions):
+            expired = [name]  # Drops the partition with all its sub-partitions
+
+        for table in expired:
+            await connection.execute_script(f'DROP TABLE IF EXISTS "{table}";')
+            dropped.append(table)
+
+    return dropped
+
+
+async def apply_retention(config: MessageRetentionConfig) -> None:
+    """Create upcoming message partitions and drop expired ones."""
+    logger = get_logger(component='message_retention')
+    now = datetime.now(timezone.utc)
+    today = now.date()
+
+    await create_partitions([today + timedelta(days=offset) for offset in range(config.premake_days + 1)])
+    if dropped := await drop_expired_partitions(config, now):
+        logger.info('Dropped expired message partitions.', partitions=dropped)
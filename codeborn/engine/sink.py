@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+from datetime import datetime, timezone
+from uuid import UUID
+
+import asyncpg
+from tortoise.exceptions import IntegrityError, ValidationError
+
+from codeborn.config import MessageSinkConfig
+from codeborn.logger import get_logger
+from codeborn.client.messages import ApiMessage
+from codeborn.model import Message
+from codeborn.engine.metrics import get_metrics
+
+
+class MessageSink:
+    """Bounded buffer of inbound messages persisted to the database in batches.
+
+    A batch is written once it reaches `batch_size` messages or `flush_interval`
+    seconds after its first message. When the buffer is full, messages of droppable
+    types are discarded and other messages wait for free space. Messages are turned
+    into ORM rows only when they are written, stamped with the time they were received.
+    When a batch fails because of its data, its messages are written one by one, so a bad
+    one loses only itself. When the database is unavailable, messages are kept and written
+    again with a growing delay.
+    """
+
+    def __init__(self, config: MessageSinkConfig) -> None:
+        self._config = config
+        self._logger = get_logger(component='message_sink')
+        self._queue: asyncio.Queue[tuple[UUID, ApiMessage, datetime]] = asyncio.Queue(maxsize=config.max_size)
+        self._batch: list[tuple[UUID, ApiMessage, datetime]] = []
+
+        self._metrics = get_metrics()
+        self._metrics.gauge('message_sink.depth', lambda: self._queue.qsize() + len(self._batch))
+
+    @property
+    def fill(self) -> float:
+        """Get the fraction of the buffer in use."""
+        return self._queue.qsize() / self._config.max_size
+
+    async def put(self, bot_gid: UUID, message: ApiMessage) -> None:
+        """Add a message received from a bot to the buffer."""
+        item = (bot_gid, message, datetime.now(timezone.utc))
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            if message.type in self._config.droppable_types:
+                self._metrics.increment('message_sink.dropped', type=message.type.value)
+                return
+
+            self._metrics.increment('message_sink.backpressure', type=message.type.value)
+            await self._queue.put(item)
+
+    async def run(self) -> None:
+        """Persist buffered messages until cancelled."""
+        self._logger.info('Started')
+        retry_in = self._config.flush_interval
+        try:
+            while True:
+                if not self._batch:
+                    self._batch.append(await self._queue.get())
+                with contextlib.suppress(TimeoutError):
+                    async with asyncio.timeout(self._config.flush_interval):
+                        while len(self._batch) < self._config.batch_size:
+                            self._batch.append(await self._queue.get())
+
+                try:
+                    await self.flush()
+                    retry_in = self._config.flush_interval
+                except Exception as exc:
+                    self._metrics.increment('message_sink.retried')
+                    self._logger.warning(
+                        'Persisting messages failed, keeping them.', count=len(self._batch), retry_in=retry_in,
+                        exc_info=exc,
+                    )
+                    await asyncio.sleep(retry_in)
+                    retry_in = min(retry_in * 2, self._config.retry_max)
+        finally:
+            self._logger.info('Stopped.')
+
+    async def flush(self) -> None:
+        """Persist the current batch and everything waiting in the buffer.
+
+        When the database is unavailable, the error is raised and messages not persisted
+        yet stay in the batch. The batch takes at most `max_size` messages from the buffer,
+        the rest wait there, so memory stays bounded during an outage.
+        """
+        while not self._queue.empty() and len(self._batch) < self._config.max_size:
+            self._batch.append(self._queue.get_nowait())
+
+        while self._batch:
+            rows = [
+                Message.from_api(bot_gid, message, received_at)
+                for bot_gid, message, received_at in self._batch[:self._config.batch_size]
+            ]
+            try:
+                await Message.bulk_create(rows)
+            except Exception as exc:
+                if not is_data_error(exc):
+                    raise
+                self._logger.warning('Persisting messages failed, retrying one by one.', count=len(rows), exc_info=exc)
+                await self._persist_each(rows)
+            else:
+                self._metrics.increment('message_sink.persisted', len(rows))
+                del self._batch[:len(rows)]
+
+    async def _persist_each(self, rows: list[Message]) -> None:
+        """Persist messages at the start of the batch one by one, dropping those with bad data."""
+        for row in rows:
+            try:
+                await Message.bulk_create([row])
+                self._metrics.increment('message_sink.persisted')
+            except Exception as exc:
+                if not is_data_error(exc):
+                    raise
+                self._metrics.increment('message_sink.failed')
+                self._logger.exception(
+                    'Persisting message failed.', gid=str(row.gid), bot_gid=str(row.bot_id), exc_info=exc
+                )
+            del self._batch[0]
+
+
+def is_data_error(exc: Exception) -> bool:
+    """Check if writing failed because of the written data, not because the database is unavailable."""
+    return isinstance(exc, (IntegrityError, ValidationError)) or isinstance(exc.__cause__, asyncpg.DataError)
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from typing import Any, TYPE_CHECKING
+from uuid import UUID
+
+from codeborn.client.state import DERIVED_FIELDS
+from codeborn.model import Bot
+
+if TYPE_CHECKING:
+    from codeborn.engine.world import World
+
+
+async def build_state_snapshots(world: World, bots: list[Bot], vision_radius: int) -> dict[UUID, dict[str, Any]]:
+    """Build `state_sync` payloads for all given bots from the in-memory world."""
+    snapshots: dict[UUID, dict[str, Any]] = {}
+    for bot in bots:
+        me = await bot.dump(exclude=['armies'])
+        me['armies'] = [army.dump() for army in world.get_bot_armies(bot.gid)]
+        snapshots[bot.gid] = {'me': me, 'visible': world.get_visible(bot.gid, vision_radius)}
+    return snapshots
+
+
+def _army_fields(army: dict[str, Any]) -> dict[str, Any]:
+    """Get army fields without its units."""
+    return {key: value for key, value in army.items() if key != 'units'}
+
+
+def diff_state(old: dict[str, Any], new: dict[str, Any]) -> dict[str, Any]:
+    """Compute a structural delta between two `me` trees of a game state.
+
+    Fields derived from timestamps change every tick, they are sent only in full
+    snapshots and clients derive them again after applying a delta.
+    """
+    old_armies = {army['gid']: army for army in old['armies']}
+    new_armies = {army['gid']: army for army in new['armies']}
+    old_units = {unit['gid']: {**unit, 'army_gid': army['gid']} for army in old['armies'] for unit in army['units']}
+    new_units = {unit['gid']: {**unit, 'army_gid': army['gid']} for army in new['armies'] for unit in army['units']}
+
+    added_armies = new_armies.keys() - old_armies.keys()
+    removed_armies = old_armies.keys() - new_armies.keys()
+
+    removed_units = []
+    for gid, unit in old_units.items():
+        if unit['army_gid'] in removed_armies:
+            continue  # dropped together with its army
+        if gid not in new_units or (new_units[gid]['army_gid'] in added_armies):
+            removed_units.append(gid)
+
+    added_units = []
+    changed_units = []
+    for gid, unit in new_units.items():
+        if unit['army_gid'] in added_armies:
+            continue  # sent together with its army
+        if gid not in old_units:
+            added_units.append(unit)
+        elif old_units[gid] != unit:
+            changed_units.append(unit)
+
+    return {
+        'me': {
+            key: value for key, value in new.items()
+            if key != 'armies' and key not in DERIVED_FIELDS and old.get(key) != value
+        },
+        'armies': {
+            'added': [new_armies[gid] for gid in added_armies],
+            'changed': [
+                _army_fields(army) for gid, army in new_armies.items()
+                if gid in old_armies and _army_fields(old_armies[gid]) != _army_fields(army)
+            ],
+            'removed': list(removed_armies),
+        },
+        'units': {
+            'added': added_units,
+            'changed': changed_units,
+            'removed': removed_units,
+        },
+    }
+
+
+class StateSyncTracker:
+    """Remember the last `state_sync` payload sent to an agent and encode deltas against it."""
+
+    def __init__(self) -> None:
+        self.version = 0
+        self._last_state: dict[str, Any] | None = None
+
+    def reset(self) -> None:
+        """Forget the last sent state, the next payload will be a full snapshot."""
+        self._last_state = None
+
+    def encode(self, game_state: dict[str, Any]) -> dict[str, Any]:
+        """Encode a game state as a full snapshot or a delta against the last sent state."""
+        self.version += 1
+
+        if self._last_state is None:
+            payload = {'version': self.version, **game_state}
+        else:
+            delta = diff_state(self._last_state['me'], game_state['me'])
+            if game_state['visible'] != self._last_state['visible']:
+                delta['visible'] = game_state['visible']  # Replaced as a whole, it's small
+            payload = {
+                'version': self.version,
+                'base_version': self.version - 1,
+                'delta': delta,
+            }
+
+        self._last_state = game_state
+        return payload
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+from typing import Any
+from uuid import UUID
+
+import numpy as np
+
+from codeborn.model import Location, TerrainType
+
+
+NO_TERRAIN = np.iinfo(np.uint8).max  # Code of coordinates without a location
+TERRAIN_TYPES = tuple(TerrainType)
+
+
+def movement_cost_table() -> np.ndarray:
+    """Get movement costs indexed by terrain codes, NaN for unknown codes."""
+    table = np.full(NO_TERRAIN + 1, np.nan)
+    for terrain in TERRAIN_TYPES:
+        table[terrain.code] = terrain.movement_cost
+    return table
+
+
+class TerrainGrid:
+    """Terrain of the whole map held in NumPy arrays indexed by `[y, x]`.
+
+    `codes` holds `TerrainType.code` of every location, `costs` its movement cost and
+    `gids` the 16 bytes of its gid. Lookups are plain array reads, no queries.
+    """
+
+    def __init__(self, codes: np.ndarray, gids: np.ndarray) -> None:
+        self.codes = codes
+        self.gids = gids
+        self.costs = movement_cost_table()[codes]
+
+    @classmethod
+    def from_rows(cls, rows: list[tuple[Any, ...]]) -> TerrainGrid:
+        """Build the grid from `(gid, x, y, terrain)` rows of locations."""
+        if not rows:
+            return cls(np.full((0, 0), NO_TERRAIN, dtype=np.uint8), np.zeros((0, 0), dtype='V16'))
+
+        gids, xs, ys, terrains = zip(*rows)
+        xs = np.fromiter(xs, dtype=np.intp, count=len(rows))
+        ys = np.fromiter(ys, dtype=np.intp, count=len(rows))
+        shape = (int(ys.max()) + 1, int(xs.max()) + 1)
+
+        codes = np.full(shape, NO_TERRAIN, dtype=np.uint8)
+        codes[ys, xs] = [TerrainType(terrain).code for terrain in terrains]
+        gid_grid = np.zeros(shape, dtype='V16')
+        gid_grid[ys, xs] = np.frombuffer(b''.join(gid.bytes for gid in gids), dtype='V16')
+        return cls(codes, gid_grid)
+
+    @classmethod
+    async def load(cls) -> TerrainGrid:
+        """Load the grid of all locations from the database."""
+        return cls.from_rows(await Location.all().values_list('gid', 'x', 'y', 'terrain'))
+
+    @property
+    def width(self) -> int:
+        """Get the width of the map."""
+        return self.codes.shape[1]
+
+    @property
+    def height(self) -> int:
+        """Get the height of the map."""
+        return self.codes.shape[0]
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self.codes != NO_TERRAIN))
+
+    def contains(self, x: int, y: int) -> bool:
+        """Check if there is a location at given coordinates."""
+        return 0 <= x < self.width and 0 <= y < self.height and self.codes[y, x] != NO_TERRAIN
+
+    def terrain(self, x: int, y: int) -> TerrainType:
+        """Get terrain of a location, the location must exist."""
+        return TERRAIN_TYPES[self.codes[y, x]]
+
+    def gid(self, x: int, y: int) -> UUID:
+        """Get the gid of a location, the location must exist."""
+        return UUID(bytes=self.gids[y, x].tobytes())
+
+    def window(self, x: int, y: int, radius: int) -> tuple[int, int, np.ndarray]:
+        """Get terrain codes at most `radius` moves around a location, clipped to the map, with its origin."""
+        min_x, min_y = max(0, x - radius), max(0, y - radius)
+        return min_x, min_y, self.codes[min_y:y + radius + 1, min_x:x + radius + 1]
+
+    def movement_cost(self, x: int, y: int) -> float:
+        """Get the movement cost of a location, the location must exist."""
+        return float(self.costs[y, x])
@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+from typing import AbstractSet, NamedTuple, TYPE_CHECKING
+from uuid import UUID
+
+from tortoise.exceptions import DBConnectionError, IntegrityError
+from tortoise.transactions import in_transaction
+
+from codeborn.logger import get_logger
+from codeborn.model import Army, Unit
+
+if TYPE_CHECKING:
+    from codeborn.engine.world import ArmyState, UnitState
+
+
+class ChangeSet:
+    """Gids of entities of one model created, changed or deleted since the last commit."""
+
+    def __init__(self) -> None:
+        self.created: set[UUID] = set()
+        self.changed: set[UUID] = set()
+        self.deleted: set[UUID] = set()
+
+    def __bool__(self) -> bool:
+        return bool(self.created or self.changed or self.deleted)
+
+    def create(self, gid: UUID) -> None:
+        """Track a new entity."""
+        self.created.add(gid)
+
+    def change(self, gid: UUID) -> None:
+        """Track a changed entity, a new one is inserted with its latest values anyway."""
+        if gid not in self.created:
+            self.changed.add(gid)
+
+    def delete(self, gid: UUID) -> None:
+        """Track a deleted entity, a new one is just forgotten."""
+        self.changed.discard(gid)
+        if gid in self.created:
+            self.created.remove(gid)
+        else:
+            self.deleted.add(gid)
+
+    def take(self) -> ChangeSet:
+        """Move all tracked changes to a new change set."""
+        taken = ChangeSet()
+        taken.created, self.created = self.created, set()
+        taken.changed, self.changed = self.changed, set()
+        taken.deleted, self.deleted = self.deleted, set()
+        return taken
+
+    @classmethod
+    def of(cls, field: str, gid: UUID) -> ChangeSet:
+        """Create a change set of a single change, `field` is `created`, `changed` or `deleted`."""
+        changes = cls()
+        getattr(changes, field).add(gid)
+        return changes
+
+    def update(self, other: ChangeSet) -> None:
+        """Track changes of another change set as well."""
+        self.created |= other.created
+        self.changed |= other.changed
+        self.deleted |= other.deleted
+
+    def forget(self, gid: UUID) -> None:
+        """Stop tracking an entity, its changes are never persisted."""
+        self.created.discard(gid)
+        self.changed.discard(gid)
+        self.deleted.discard(gid)
+
+    def restore(self, taken: ChangeSet, existing: AbstractSet[UUID]) -> None:
+        """Track changes of a failed commit again, unless they were superseded in the meantime."""
+        self.created |= taken.created & existing
+        self.changed |= (taken.changed & existing) - self.created
+        self.deleted |= taken.deleted
+
+
+class Rows(NamedTuple):
+    """ORM objects of created and changed entities, taken from the in-memory state when a commit starts."""
+
+    armies: dict[UUID, Army]
+    units: dict[UUID, Unit]
+
+
+class CommitResult(NamedTuple):
+    """Changes persisted by a commit and gids of entities whose changes were dropped."""
+
+    armies: ChangeSet
+    units: ChangeSet
+    dropped_armies: set[UUID]
+    dropped_units: set[UUID]
+
+
+class UnitOfWork:
+    """Changes of in-memory armies and units, persisted together in a single transaction.
+
+    Every write is a bulk statement: one `bulk_create` and one `bulk_update` per model
+    and one `DELETE ... WHERE gid IN (...)`, however many commands made the changes.
+    Rows are taken from the in-memory state before the first await, so commands running
+    meanwhile don't affect the commit. When the transaction fails for another reason
+    than a lost connection, changes are written one by one to isolate the failing ones.
+    Changes violating integrity constraints are dropped, they would never succeed, and
+    reported so the world reloads their entities. Other failed changes are tracked again
+    for the next commit.
+    """
+
+    def __init__(self, armies: dict[UUID, ArmyState], units: dict[UUID, UnitState]) -> None:
+        self._logger = get_logger(component='unit_of_work')
+        self._armies = armies
+        self._units = units
+        self.army_changes = ChangeSet()
+        self.unit_changes = ChangeSet()
+
+    def __bool__(self) -> bool:
+        return bool(self.army_changes or self.unit_changes)
+
+    async def commit(self) -> CommitResult:
+        """Persist all tracked changes, get the committed and the dropped ones."""
+        armies, units = self.army_changes.take(), self.unit_changes.take()
+        rows = self._rows(armies, units)
+
+        try:
+            async with in_transaction():
+                await self._write(armies, units, rows)
+        except DBConnectionError:
+            self.army_changes.restore(armies, self._armies.keys())
+            self.unit_changes.restore(units, self._units.keys())
+            raise
+        except Exception as exc:
+            self._logger.warning('Commit failed, isolating failing changes.', exc_info=exc)
+            return await self._isolate(armies, units, rows)
+
+        return CommitResult(armies, units, set(), set())
+
+    def _rows(self, armies: ChangeSet, units: ChangeSet) -> Rows:
+        """Create ORM objects of created and changed entities from the in-memory state."""
+        unit_rows = {}
+        for gid in units.created | units.changed:
+            unit = self._units[gid]
+            unit.stamina = unit.stamina  # Snapshot stamina, so the stored timestamp matches it
+            unit_rows[gid] = Unit(
+                gid=unit.gid,
+                army_id=unit.army_gid,
+                type=unit.type,
+                count=unit.count,
+                stamina_snapshot=unit.stamina_snapshot,
+                updated_at=unit.updated_at,
+            )
+
+        army_rows = {}
+        for gid in armies.created | armies.changed:
+            army = self._armies[gid]
+            army_rows[gid] = Army(gid=army.gid, bot_id=army.bot_gid, location_id=army.location.gid)
+
+        return Rows(army_rows, unit_rows)
+
+    async def _write(self, armies: ChangeSet, units: ChangeSet, rows: Rows) -> None:
+        """Run statements persisting given changes, the caller runs them in a transaction."""
+        if units.deleted:
+            await Unit.filter(gid__in=units.deleted).delete()
+        if armies.created:
+            await Army.bulk_create([rows.armies[gid] for gid in armies.created])
+        if armies.changed:
+            await Army.bulk_update([rows.armies[gid] for gid in armies.changed], fields=['location_id'])
+        if units.created:
+            await Unit.bulk_create([rows.units[gid] for gid in units.created])
+        if units.changed:
+            await Unit.bulk_update(
+                [rows.units[gid] for gid in units.changed],
+                fields=['army_id', 'count', 'stamina_snapshot', 'updated_at']
+            )
+        if armies.deleted:
+            await Army.filter(gid__in=armies.deleted).delete()
+
+    async def _isolate(self, armies: ChangeSet, units: ChangeSet, rows: Rows) -> CommitResult:
+        """Persist changes one by one in the order of `_write()`, get the committed and dropped ones.
+
+        Changes failing on integrity constraints are dropped. Other failures are tracked
+        again and the last one is raised after all changes were tried.
+        """
+        order = [
+            (units, 'deleted'),
+            (armies, 'created'),
+            (armies, 'changed'),
+            (units, 'created'),
+            (units, 'changed'),
+            (armies, 'deleted'),
+        ]
+        result = CommitResult(ChangeSet(), ChangeSet(), set(), set())
+        error: Exception | None = None
+        for changes, field in order:
+            model = 'army' if changes is armies else 'unit'
+            for gid in getattr(changes, field):
+                single = ChangeSet.of(field, gid)
+                army, unit = (single, ChangeSet()) if changes is armies else (ChangeSet(), single)
+                try:
+                    async with in_transaction():
+                        await self._write(army, unit, rows)
+                except IntegrityError as exc:
+                    self._logger.error('Dropping change.', exc_info=exc, model=model, change=field, gid=str(gid))
+                    (result.dropped_armies if changes is armies else result.dropped_units).add(gid)
+                except Exception as exc:
+                    error = exc
+                    self.army_changes.restore(army, self._armies.keys())
+                    self.unit_changes.restore(unit, self._units.keys())
+                else:
+                    result.armies.update(army)
+                    result.units.update(unit)
+
+        if error is not None:
+            raise error
+        return result
@@ -0,0 +1,377 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Any
+from uuid import UUID, uuid4
+
+import msgspec
+from tortoise.expressions import Q
+from codeborn.logger import get_logger
+from codeborn.model import Army, TerrainType, Unit, UnitType
+from codeborn.spatial import SpatialIndex
+from codeborn.engine.terrain import TERRAIN_TYPES, TerrainGrid
+from codeborn.engine.unit_of_work import UnitOfWork
+
+
+def parse_gid(gid: UUID | str) -> UUID | None:
+    """Parse a gid received from a bot, return None if it's not a valid UUID."""
+    try:
+        return gid if isinstance(gid, UUID) else UUID(str(gid))
+    except ValueError:
+        return None
+
+
+class LocationState(msgspec.Struct, frozen=True):
+    """A location of the in-memory world."""
+
+    gid: UUID
+    x: int
+    y: int
+    terrain: TerrainType
+
+    def is_adjacent(self, other: LocationState) -> bool:
+        """Check if this location is adjacent to another location."""
+        delta_x = abs(self.x - other.x)
+        delta_y = abs(self.y - other.y)
+        return (delta_x <= 1) and (delta_y <= 1) and (delta_x + delta_y > 0)
+
+    def dump(self) -> dict[str, Any]:
+        """Dump the location as a dictionary, same as `Location.dump()`."""
+        return {
+            'gid': str(self.gid),
+            'terrain': self.terrain.value,
+            'x': self.x,
+            'y': self.y,
+        }
+
+
+class UnitState(msgspec.Struct, kw_only=True):
+    """A unit of the in-memory world."""
+
+    gid: UUID
+    army_gid: UUID
+    type: UnitType
+    count: int
+    stamina_snapshot: float = 1.0
+    updated_at: datetime | None = None
+
+    @property
+    def stamina(self) -> float:
+        """Dynamically computed stamina."""
+        if not self.updated_at:
+            return self.stamina_snapshot
+        update_age = (datetime.now(timezone.utc) - self.updated_at).total_seconds()
+        recovered_stamina = update_age * self.type.stamina_recovery
+        return max(0.0, min(1.0, self.stamina_snapshot + recovered_stamina))
+
+    @stamina.setter
+    def stamina(self, value: float) -> None:
+        """Set new stamina and update timestamp."""
+        self.stamina_snapshot = value
+        self.updated_at = datetime.now(timezone.utc)
+
+    def dump(self) -> dict[str, Any]:
+        """Dump the unit as a dictionary, same as `Unit.dump()`."""
+        return {
+            'gid': str(self.gid),
+            'type': self.type.value,
+            'stamina': self.stamina,
+            'count': self.count,
+        }
+
+
+class ArmyState(msgspec.Struct, kw_only=True):
+    """An army of the in-memory world."""
+
+    gid: UUID
+    bot_gid: UUID
+    location: LocationState
+    units: list[UnitState] = msgspec.field(default_factory=list)
+
+    def dump(self) -> dict[str, Any]:
+        """Dump the army as a dictionary, same as `Army.dump()`."""
+        return {
+            'gid': str(self.gid),
+            'bot_gid': str(self.bot_gid),
+            'location': self.location.dump(),
+            'units': [unit.dump() for unit in self.units],
+        }
+
+    def dump_foreign(self) -> dict[str, Any]:
+        """Dump the army as seen by other bots, without stamina and gids of its units."""
+        return {
+            'gid': str(self.gid),
+            'bot_gid': str(self.bot_gid),
+            'location': self.location.dump(),
+            'units': [{'type': unit.type.value, 'count': unit.count} for unit in self.units],
+        }
+
+
+class World:
+    """Authoritative in-memory model of the game world.
+
+    Command handlers read and mutate the world synchronously. All changes are
+    tracked by a unit of work and persisted to the database in batches by `flush()`.
+    Positions of armies are kept in a spatial index for proximity queries.
+    """
+
+    def __init__(self, chunk_size: int) -> None:
+        self._logger = get_logger(component='world')
+
+        self._terrain = TerrainGrid.from_rows([])
+        self._armies: dict[UUID, ArmyState] = {}
+        self._units: dict[UUID, UnitState] = {}
+        self._bot_armies: dict[UUID, dict[UUID, ArmyState]] = {}
+        self._spatial = SpatialIndex(chunk_size)
+
+        self._work = UnitOfWork(self._armies, self._units)
+
+    @property
+    def is_dirty(self) -> bool:
+        """Check if there are changes not persisted to the database yet."""
+        return bool(self._work)
+
+    async def load(self) -> None:
+        """Load the whole world from the database."""
+        self._logger.info('Loading world.')
+
+        self._terrain = await TerrainGrid.load()
+
+        for gid, bot_gid, x, y in await Army.all().values_list('gid', 'bot_id', 'location__x', 'location__y'):
+            self._insert_army(ArmyState(gid=gid, bot_gid=bot_gid, location=self._location(x, y)))
+
+        self._load_units(await Unit.all().values_list(*self._unit_fields()))
+        self._logger.info('World loaded.', locations=len(self._terrain), armies=len(self._armies))
+
+    async def reload_terrain(self) -> None:
+        """Load the terrain grid again after the map was regenerated."""
+        self._terrain = await TerrainGrid.load()
+        for army in self._armies.values():
+            if location := self.get_location(army.location.x, army.location.y):
+                army.location = location
+        self._logger.info('Terrain reloaded.', width=self._terrain.width, height=self._terrain.height)
+
+    async def load_bot(self, bot_gid: UUID) -> None:
+        """Load armies of a bot created after the world was loaded."""
+        if bot_gid in self._bot_armies:
+            return
+
+        self._bot_armies[bot_gid] = {}
+        armies = await Army.filter(bot_id=bot_gid).values_list('gid', 'location__x', 'location__y')
+        for gid, x, y in armies:
+            self._insert_army(ArmyState(gid=gid, bot_gid=bot_gid, location=self._location(x, y)))
+
+        if armies:
+            units = await Unit.filter(army_id__in=[gid for gid, _, _ in armies]).values_list(*self._unit_fields())
+            self._load_units(units)
+
+    def unload_bot(self, bot_gid: UUID) -> None:
+        """Forget armies and pending changes of a deleted bot, its rows were deleted with the bot."""
+        for army in list(self._bot_armies.pop(bot_gid, {}).values()):
+            self._evict_army(army)
+
+    async def _reload(self, army_gids: set[UUID], unit_gids: set[UUID]) -> None:
+        """Replace in-memory armies and units by their stored state, forgetting their pending changes.
+
+        Entities missing in the database are just forgotten. Units of a reloaded army are reloaded with it.
+        """
+        for gid in army_gids:
+            if army := self._armies.get(gid):
+                self._evict_army(army)
+        for gid in unit_gids:
+            if unit := self._units.get(gid):
+                self._evict_unit(unit)
+
+        armies = await Army.filter(gid__in=army_gids).values_list('gid', 'bot_id', 'location__x', 'location__y')
+        units = await Unit.filter(
+            Q(gid__in=unit_gids) | Q(army_id__in=army_gids)
+        ).values_list(*self._unit_fields())
+
+        for gid, bot_gid, x, y in armies:
+            if gid not in self._armies:
+                self._insert_army(ArmyState(gid=gid, bot_gid=bot_gid, location=self._location(x, y)))
+        self._load_units([row for row in units if row[0] not in self._units and row[1] in self._armies])
+
+    def _evict_army(self, army: ArmyState) -> None:
+        """Forget an army with its units and their pending changes."""
+        for unit in list(army.units):
+            self._evict_unit(unit)
+
+        del self._armies[army.gid]
+        self._bot_armies.get(army.bot_gid, {}).pop(army.gid, None)
+        self._spatial.remove(army.gid)
+        self._work.army_changes.forget(army.gid)
+
+    def _evict_unit(self, unit: UnitState) -> None:
+        """Forget a unit and its pending changes."""
+        if army := self._armies.get(unit.army_gid):
+            army.units.remove(unit)
+        del self._units[unit.gid]
+        self._work.unit_changes.forget(unit.gid)
+
+    @staticmethod
+    def _unit_fields() -> tuple[str, ...]:
+        """Unit fields loaded from the database."""
+        return ('gid', 'army_id', 'type', 'count', 'stamina_snapshot', 'updated_at')
+
+    def _load_units(self, rows: list[tuple[Any, ...]]) -> None:
+        """Insert units loaded from the database into their armies."""
+        for gid, army_gid, unit_type, count, stamina_snapshot, updated_at in rows:
+            unit = UnitState(
+                gid=gid,
+                army_gid=army_gid,
+                type=UnitType(unit_type),
+                count=count,
+                stamina_snapshot=stamina_snapshot,
+                updated_at=updated_at,
+            )
+            self._units[gid] = unit
+            self._armies[army_gid].units.append(unit)
+
+    def _insert_army(self, army: ArmyState) -> None:
+        """Insert an army into the lookup tables."""
+        self._armies[army.gid] = army
+        self._bot_armies.setdefault(army.bot_gid, {})[army.gid] = army
+        self._spatial.add(army.gid, army.location.x, army.location.y)
+
+    # Queries
+
+    def get_location(self, x: int, y: int) -> LocationState | None:
+        """Get a location by its coordinates."""
+        if isinstance(x, int) and isinstance(y, int) and self._terrain.contains(x, y):
+            return self._location(x, y)
+
+    def _location(self, x: int, y: int) -> LocationState:
+        """Get an existing location from the terrain grid."""
+        return LocationState(gid=self._terrain.gid(x, y), x=x, y=y, terrain=self._terrain.terrain(x, y))
+
+    def movement_cost(self, location: LocationState) -> float:
+        """Get the movement cost of entering a location."""
+        return self._terrain.movement_cost(location.x, location.y)
+
+    def get_army(self, bot_gid: UUID, army_gid: UUID | str) -> ArmyState | None:
+        """Get an army of a given bot."""
+        if gid := parse_gid(army_gid):
+            return self._bot_armies.get(bot_gid, {}).get(gid)
+
+    def get_bot_armies(self, bot_gid: UUID) -> list[ArmyState]:
+        """Get all armies of a given bot."""
+        return list(self._bot_armies.get(bot_gid, {}).values())
+
+    @property
+    def spatial(self) -> SpatialIndex:
+        """Get the spatial index of armies, it must not be modified."""
+        return self._spatial
+
+    def get_armies_within(self, location: LocationState, radius: int) -> list[ArmyState]:
+        """Get armies of all bots at most `radius` moves away from a location."""
+        return [self._armies[gid] for gid in self._spatial.within(location.x, location.y, radius)]
+
+    def get_nearest_armies(self, location: LocationState, count: int) -> list[ArmyState]:
+        """Get up to `count` armies of all bots closest to a location."""
+        return [self._armies[gid] for gid in self._spatial.nearest(location.x, location.y, count)]
+
+    def get_visible(self, bot_gid: UUID, radius: int) -> dict[str, Any]:
+        """Get terrain and armies of other bots at most `radius` moves away from armies of a bot.
+
+        Terrain is sent as one window of `TerrainType.code` rows around every location
+        occupied by the bot, codes are indexes into `terrain_types`.
+        """
+        locations = {(army.location.x, army.location.y) for army in self.get_bot_armies(bot_gid)}
+
+        terrain = []
+        foreign_gids: set[UUID] = set()
+        for x, y in sorted(locations):
+            min_x, min_y, codes = self._terrain.window(x, y, radius)
+            terrain.append({'x': min_x, 'y': min_y, 'rows': codes.tolist()})
+            foreign_gids.update(self._spatial.within(x, y, radius))
+
+        armies = (self._armies[gid] for gid in sorted(foreign_gids))
+        return {
+            'terrain_types': [terrain_type.value for terrain_type in TERRAIN_TYPES],
+            'terrain': terrain,
+            'armies': [army.dump_foreign() for army in armies if army.bot_gid != bot_gid],
+        }
+
+    # Mutations
+
+    def add_army(self, bot_gid: UUID, location: LocationState) -> ArmyState:
+        """Create a new empty army."""
+        army = ArmyState(gid=uuid4(), bot_gid=bot_gid, location=location)
+        self._insert_army(army)
+        self._work.army_changes.create(army.gid)
+        return army
+
+    def move_army(self, army: ArmyState, location: LocationState) -> None:
+        """Move an army to a new location."""
+        army.location = location
+        self._spatial.move(army.gid, location.x, location.y)
+        self._work.army_changes.change(army.gid)
+
+    def remove_army(self, army: ArmyState) -> None:
+        """Remove an army together with all its remaining units."""
+        for unit in list(army.units):
+            self.remove_unit(unit)
+
+        del self._armies[army.gid]
+        del self._bot_armies[army.bot_gid][army.gid]
+        self._spatial.remove(army.gid)
+        self._work.army_changes.delete(army.gid)
+
+    def add_unit(self, army: ArmyState, unit_type: UnitType, count: int, stamina: float) -> UnitState:
+        """Create a new unit in an army."""
+        unit = UnitState(gid=uuid4(), army_gid=army.gid, type=unit_type, count=count)
+        unit.stamina = stamina
+        army.units.append(unit)
+        self._units[unit.gid] = unit
+        self._work.unit_changes.create(unit.gid)
+        return unit
+
+    def update_unit(
+        self,
+        unit: UnitState,
+        *,
+        count: int | None = None,
+        stamina: float | None = None,
+        army: ArmyState | None = None,
+    ) -> None:
+        """Update count or stamina of a unit or move it to another army."""
+        if count is not None:
+            unit.count = count
+        if stamina is not None:
+            unit.stamina = stamina
+        if army is not None and army.gid != unit.army_gid:
+            self._armies[unit.army_gid].units.remove(unit)
+            army.units.append(unit)
+            unit.army_gid = army.gid
+
+        self._work.unit_changes.change(unit.gid)
+
+    def remove_unit(self, unit: UnitState) -> None:
+        """Remove a unit from its army."""
+        self._armies[unit.army_gid].units.remove(unit)
+        del self._units[unit.gid]
+        self._work.unit_changes.delete(unit.gid)
+
+    # Persistence
+
+    async def flush(self) -> None:
+        """Persist all pending changes to the database in a single transaction."""
+        if not self.is_dirty:
+            return
+
+        result = await self._work.commit()
+        if result.dropped_armies or result.dropped_units:
+            await self._reload(result.dropped_armies, result.dropped_units)
+
+        self._logger.debug(
+            'World flushed.',
+            created_armies=len(result.armies.created),
+            changed_armies=len(result.armies.changed),
+            deleted_armies=len(result.armies.deleted),
+            created_units=len(result.units.created),
+            changed_units=len(result.units.changed),
+            deleted_units=len(result.units.deleted),
+            dropped_armies=len(result.dropped_armies),
+            dropped_units=len(result.dropped_units),
+        )
@@ -1,17 +1,23 @@
 from __future__ import annotations
 
+import argparse
 import asyncio
+import time
 from pathlib import Path
-import random
+from typing import Callable, NamedTuple
 
+import asyncpg
 import numpy as np
 from perlin_noise import PerlinNoise
 import matplotlib.pyplot as plt
+from structlog import BoundLogger
 
 from codeborn.logger import get_logger, init_logging
 from codeborn.model import Army, Location, TerrainType
-from codeborn.database import init_db, close_db
-from codeborn.config import CodebornConfig, MapGeneratorConfig, get_config
+from codeborn.database import MAP_CHANGES_CHANNEL, init_db, close_db, connect, notify
+from codeborn.config import CodebornConfig, MapGeneratorConfig, MapNoise, get_config
+from codeborn.generators.noise import FractalNoise
+from codeborn.spatial import SpatialIndex
 
 
 COLOR_MAP = {
@@ -20,36 +26,53 @@ COLOR_MAP = {
     TerrainType.swamp: (0.5, 0.5, 0.5),
 }
 MAP_PATH = Path('map.png')
+NORMALIZATION_STEP = 4  # Locations between noise samples bounding its normalization
 
 
-async def random_location(config: MapGeneratorConfig) -> Location:
+async def army_index(config: MapGeneratorConfig) -> SpatialIndex:
+    """Load positions of all armies into a spatial index with a single query."""
+    return SpatialIndex.from_positions(
+        config.chunk_size,
+        await Army.all().values_list('gid', 'location__x', 'location__y'),
+    )
+
+
+class ArmyIndex:
+    """Spatial index of armies shared by `random_location()` calls.
+
+    It's loaded with a single query and loaded again once it's older than `index_ttl`,
+    so placing an army doesn't scan the army table. Placed armies are added to it.
+    """
+
+    def __init__(self, config: MapGeneratorConfig) -> None:
+        self._config = config
+        self._index: SpatialIndex | None = None
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def get(self) -> SpatialIndex:
+        """Get the index, load it if it's missing or stale."""
+        async with self._lock:
+            if self._index is None or time.monotonic() - self._loaded_at >= self._config.index_ttl:
+                self._index = await army_index(self._config)
+                self._loaded_at = time.monotonic()
+            return self._index
+
+
+async def random_location(config: MapGeneratorConfig, index: SpatialIndex) -> Location:
     """Find new random location in an least occupied chunk chunk."""
 
     rng = np.random.default_rng()
 
-    async def find_unoccupied_location(
-        x_bounds: tuple[int, int],
-        y_bounds: tuple[int, int],
-        occupied: set[tuple[int, int]]
-    ) -> Location | None:
+    async def find_unoccupied_location(x_bounds: tuple[int, int], y_bounds: tuple[int, int]) -> Location | None:
         """Randomly select an unoccupied location."""
         for _ in range(16):
-            x = rng.integers(*x_bounds)
-            y = rng.integers(*y_bounds)
-            if (x, y) not in occupied:
+            x = int(rng.integers(*x_bounds))
+            y = int(rng.integers(*y_bounds))
+            if not index.is_occupied(x, y):
                 return await Location.get(x=x, y=y)
 
-    chunk_x_count = (config.width + config.chunk_size - 1) // config.chunk_size
-    chunk_y_count = (config.height + config.chunk_size - 1) // config.chunk_size
-
-    chunk_counts = np.zeros((chunk_x_count, chunk_y_count), dtype=int)
-
-    for x, y in await Army.all().values_list('location__x', 'location__y'):
-        chunk_x = x // config.chunk_size
-        chunk_y = y // config.chunk_size
-        chunk_counts[chunk_x, chunk_y] += 1
-
-    weights = 1 / (chunk_counts + 1)
+    weights = 1 / (index.chunk_counts(config.width, config.height) + 1)
     flat_weights = weights.flatten()
     flat_weights /= flat_weights.sum()
 
@@ -60,54 +83,76 @@ async def random_location(config: MapGeneratorConfig) -> Location:
 
     x_bounds = (chunk_x * config.chunk_size, min((chunk_x + 1) * config.chunk_size, config.width))
     y_bounds = (chunk_y * config.chunk_size, min((chunk_y + 1) * config.chunk_size, config.height))
-    occupied = set(
-        await Army.filter(
-            location__x__gte=x_bounds[0], location__x__lt=x_bounds[1],
-            location__y__gte=y_bounds[0], location__y__lt=y_bounds[1],
-        ).values_list('location__x', 'location__y')
-    )
-    if location := await find_unoccupied_location(x_bounds, y_bounds, occupied):
+    if location := await find_unoccupied_location(x_bounds, y_bounds):
         return location
 
-    occupied = set(await Army.all().values_list('location__x', 'location__y'))
-    x_bounds = (0, config.width)
-    y_bounds = (0, config.height)
-    if location := await find_unoccupied_location(x_bounds, y_bounds, occupied):
+    if location := await find_unoccupied_location((0, config.width), (0, config.height)):
         return location
 
     raise RuntimeError('Cannot find an unoccupied location.')
 
 
-def generate_terrain(config: MapGeneratorConfig) -> np.ndarray:
-    """Generate terrain data."""
-
-    elevation = generate_noise_map(
-        config.octaves,
-        config.width,
-        config.height,
-        config.elevation_scale,
-        config.elevation_contrast_enhancement,
-        config.seed + 1
-    )
-
-    moisture = generate_noise_map(
-        config.octaves,
-        config.width,
-        config.height,
-        config.moisture_scale,
-        config.moisture_contrast_enhancement,
-        config.seed + 2
-    )
-
-    terrain = np.empty((config.height, config.width), dtype=object)
-
-    for y in range(config.height):
-        for x in range(config.width):
-            terrain[y][x] = classify_terrain(elevation[y][x], moisture[y][x], config.ranges)
-    return terrain
-
-
-def generate_noise_map(
+class NoiseMap:
+    """Noise of the map normalized to [0, 1] with enhanced contrast, generated block by block.
+
+    Fractal noise is normalized by its minimum and maximum sampled every `NORMALIZATION_STEP`
+    locations of the whole map, values beyond them are clipped. So a block is the same
+    whichever other blocks are generated. Legacy noise is generated for the whole map at once.
+    """
+
+    def __init__(self, config: MapGeneratorConfig, scale: float, contrast_enhancement: float, seed: int) -> None:
+        self._contrast_enhancement = contrast_enhancement
+        self._legacy: np.ndarray | None = None
+
+        if config.noise == MapNoise.legacy:
+            self._legacy = generate_legacy_noise_map(
+                config.octaves, config.width, config.height, scale, contrast_enhancement, seed
+            )
+            return
+
+        self._noise = FractalNoise(scale, config.octaves, config.persistence, config.lacunarity, seed)
+        samples = self._noise(
+            np.arange(0, config.width, NORMALIZATION_STEP), np.arange(0, config.height, NORMALIZATION_STEP)
+        )
+        self._bounds = float(samples.min()), float(samples.max())
+
+    def block(self, columns: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """Get noise of locations in given columns and rows, shaped `(len(rows), len(columns))`."""
+        if self._legacy is not None:
+            return self._legacy[np.ix_(rows, columns)]
+
+        noise_map = self._noise(columns, rows).astype(np.float64)
+        return normalize_noise_map(noise_map, self._contrast_enhancement, self._bounds)
+
+
+class TerrainGenerator:
+    """Terrain of the map generated block by block, the same for the same seed whichever blocks are generated."""
+
+    def __init__(self, config: MapGeneratorConfig) -> None:
+        self._config = config
+        self._elevation = NoiseMap(
+            config, config.elevation_scale, config.elevation_contrast_enhancement, config.seed + 1
+        )
+        self._moisture = NoiseMap(
+            config, config.moisture_scale, config.moisture_contrast_enhancement, config.seed + 2
+        )
+
+    def block(self, columns: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """Get `TerrainType.code` of locations in given columns and rows as a `uint8` array."""
+        # A generator per row, so choices don't depend on other rows being generated
+        choices = np.stack([
+            np.random.default_rng((self._config.seed + 3, int(y))).random(self._config.width)[columns]
+            for y in rows
+        ])
+        return classify_terrain(
+            self._elevation.block(columns, rows),
+            self._moisture.block(columns, rows),
+            self._config.ranges,
+            choices,
+        )
+
+
+def generate_legacy_noise_map(
     octaves: int,
     width: int,
     height: int,
@@ -121,72 +166,192 @@ def generate_noise_map(
     for y in range(height):
         for x in range(width):
             noise_map[y][x] = noise([x / scale, y / scale])
-    noise_map = (noise_map - noise_map.min()) / (noise_map.max() - noise_map.min())
-    noise_map = np.power(noise_map, contrast_enhancement)
-    return noise_map
+    return normalize_noise_map(noise_map, contrast_enhancement)
+
+
+def normalize_noise_map(
+    noise_map: np.ndarray,
+    contrast_enhancement: float,
+    bounds: tuple[float, float] | None = None,
+) -> np.ndarray:
+    """Stretch noise from `bounds`, its minimum and maximum by default, to [0, 1] and enhance its contrast."""
+    low, high = bounds or (noise_map.min(), noise_map.max())
+    noise_map = np.clip((noise_map - low) / (high - low), 0, 1)
+    return np.power(noise_map, contrast_enhancement)
 
 
 def classify_terrain(
-    elevation: float,
-    moisture: float,
-    config: dict[TerrainType, dict[str, tuple[float, float]]]
-) -> str:
-    """Get a terrain for given location based on elevation and moisture."""
-    candidates = set()
+    elevation: np.ndarray,
+    moisture: np.ndarray,
+    config: dict[TerrainType, dict[str, tuple[float, float]]],
+    choices: np.ndarray,
+) -> np.ndarray:
+    """Get terrain codes of all locations based on their elevation and moisture.
 
-    for terrain, ranges in config.items():
-        elev_range = ranges['elevation']
-        mois_range = ranges['moisture']
-        if elev_range[0] <= elevation <= elev_range[1] and mois_range[0] <= moisture <= mois_range[1]:
-            candidates.add(terrain)
+    A location matching ranges of several terrain types gets one of them chosen
+    by its random number in [0, 1) from `choices`.
+    """
+    terrains = sorted(config, key=lambda terrain: terrain.code)
+    candidates = np.stack([
+        (config[terrain]['elevation'][0] <= elevation) & (elevation <= config[terrain]['elevation'][1]) &
+        (config[terrain]['moisture'][0] <= moisture) & (moisture <= config[terrain]['moisture'][1])
+        for terrain in terrains
+    ])
+    counts = candidates.sum(axis=0, dtype=np.uint8)
 
-    if not candidates:
-        raise ValueError(f'No terrain available for elevation: {elevation}, moisture: {moisture}.')
+    if not counts.all():
+        y, x = np.argwhere(counts == 0)[0]
+        raise ValueError(f'No terrain available for elevation: {elevation[y, x]}, moisture: {moisture[y, x]}.')
 
-    return random.choice(tuple(candidates))
+    choices = (choices * counts).astype(np.uint8)  # Index of the chosen candidate of every location
+    chosen = np.argmax(candidates.cumsum(axis=0, dtype=np.uint8) > choices, axis=0)
+    codes = np.array([terrain.code for terrain in terrains], dtype=np.uint8)
+    return codes[chosen]
 
 
 def save_map_image(terrain: np.ndarray, path: Path) -> None:
-    rgb = np.zeros((terrain.shape[0], terrain.shape[1], 3))
-    for name, color in COLOR_MAP.items():
-        rgb[np.where(terrain == name)] = color
+    palette = np.zeros((256, 3), dtype=np.uint8)
+    for terrain_type, color in COLOR_MAP.items():
+        palette[terrain_type.code] = np.round(np.array(color) * 255)
 
-    plt.imshow(rgb, interpolation='nearest')
+    plt.imshow(palette[terrain], interpolation='nearest')
     plt.axis('off')
     plt.tight_layout(pad=0)
     plt.savefig(path, dpi=300, bbox_inches='tight', pad_inches=0)
     plt.close()
 
 
-async def main(config: CodebornConfig) -> None:
+class Region(NamedTuple):
+    """A rectangle of the map, `x` and `y` of its top-left corner."""
+
+    x: int
+    y: int
+    width: int
+    height: int
+
+
+async def completed_rows(connection: asyncpg.Connection, region: Region) -> set[int]:
+    """Get rows of a region whose locations are all saved already."""
+    rows = await connection.fetch(
+        f'SELECT y FROM {Location._meta.db_table} WHERE x >= $1 AND x < $2 AND y >= $3 AND y < $4 '
+        'GROUP BY y HAVING count(*) = $5',
+        region.x, region.x + region.width, region.y, region.y + region.height, region.width,
+    )
+    return {row['y'] for row in rows}
+
+
+async def save_locations(
+    connection: asyncpg.Connection,
+    terrain: Callable[[np.ndarray], np.ndarray],
+    region: Region,
+    batch_rows: int,
+    skip_rows: set[int],
+    logger: BoundLogger,
+) -> int:
+    """Generate and write locations of a region in batches of rows, return the number of written locations.
+
+    `terrain` gets terrain codes of given rows of the region, a batch is generated only
+    when it's written. Every batch is copied into a temporary table and upserted by
+    coordinates in its own transaction. Existing locations keep their gids and only get
+    a new terrain, so armies standing on them are kept. Memory use depends on
+    `batch_rows`, not on the size of the map.
+    """
+    names = np.array([terrain_type.value for terrain_type in TerrainType])
+    columns = np.arange(region.x, region.x + region.width)
+    table = Location._meta.db_table
+    rows_to_write = [y for y in range(region.y, region.y + region.height) if y not in skip_rows]
+    written = 0
+
+    for start in range(0, len(rows_to_write), batch_rows):
+        rows = rows_to_write[start:start + batch_rows]
+        ys, xs = np.meshgrid(rows, columns, indexing='ij')
+        codes = terrain(np.array(rows))
+        records = zip(xs.ravel().tolist(), ys.ravel().tolist(), names[codes].ravel().tolist())
+
+        async with connection.transaction():
+            await connection.execute(
+                'CREATE TEMPORARY TABLE location_import (x INT, y INT, terrain VARCHAR(16)) ON COMMIT DROP'
+            )
+            await connection.copy_records_to_table('location_import', records=records, columns=['x', 'y', 'terrain'])
+            await connection.execute(
+                f'INSERT INTO {table} (gid, x, y, terrain) '
+                'SELECT gen_random_uuid(), x, y, terrain FROM location_import '
+                'ON CONFLICT (x, y) DO UPDATE SET terrain = EXCLUDED.terrain'
+            )
+
+        written += len(rows) * region.width
+        logger.info(
+            'Locations saved.',
+            rows=start + len(rows),
+            total_rows=len(rows_to_write),
+            progress=f'{(start + len(rows)) / len(rows_to_write):.0%}',
+        )
+
+    return written
+
+
+async def main(config: CodebornConfig, region: Region | None, resume: bool, preview: bool) -> None:
     await init_db(config.database)
     map_config = config.generators.map
-    logger = get_logger(generator='map', seed=map_config.seed)
+    region = region or Region(0, 0, map_config.width, map_config.height)
+    inside_x = 0 <= region.x and region.x + region.width <= map_config.width
+    inside_y = 0 <= region.y and region.y + region.height <= map_config.height
+    if not (inside_x and inside_y):
+        raise ValueError(f'Region {region} is outside of the map.')
+    logger = get_logger(generator='map', seed=map_config.seed, region=region)
 
     try:
         logger.info('Generating map.')
 
-        terrain_map = generate_terrain(map_config)
+        generator = TerrainGenerator(map_config)
+        columns = np.arange(region.x, region.x + region.width)
+        preview_map = np.zeros((region.height, region.width), dtype=np.uint8) if preview else None
 
-        logger.info(f'Map image saved to "{MAP_PATH.absolute()}".')
-        save_map_image(terrain_map, MAP_PATH)
+        def terrain(rows: np.ndarray) -> np.ndarray:
+            codes = generator.block(columns, rows)
+            if preview_map is not None:
+                preview_map[rows - region.y] = codes
+            return codes
 
-        locations = []
-        height, width = terrain_map.shape
-        for y in range(height):
-            for x in range(width):
-                locations.append(Location(
-                    x=x, y=y, terrain=terrain_map[y, x]
-                ))
+        async with connect(config.database) as connection:
+            skip_rows = await completed_rows(connection, region) if resume else set()
+            logger.info('Saving locations to DB.', skipped_rows=len(skip_rows))
+            count = await save_locations(connection, terrain, region, map_config.batch_rows, skip_rows, logger)
 
-        logger.info(f'Saving {len(locations)} locations to DB.')
-        await Location.bulk_create(locations)
+        logger.info(f'Saved {count} locations to DB.')
+        await notify(MAP_CHANGES_CHANNEL, str(map_config.seed))  # Let the engine reload its terrain grid
+
+        if preview_map is not None:
+            skipped = sorted(skip_rows)
+            for start in range(0, len(skipped), map_config.batch_rows):
+                terrain(np.array(skipped[start:start + map_config.batch_rows]))
+            save_map_image(preview_map, MAP_PATH)
+            logger.info(f'Map image saved to "{MAP_PATH.absolute()}".')
 
     finally:
         await close_db()
 
 
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Generate the map and save it to the database.')
+    parser.add_argument(
+        '--region', type=int, nargs=4, metavar=('X', 'Y', 'WIDTH', 'HEIGHT'),
+        help='Regenerate only locations of a region of the map, the rest of the table is kept.',
+    )
+    parser.add_argument(
+        '--resume', action='store_true',
+        help='Skip map rows already saved completely, e.g. by an interrupted run with the same seed.',
+    )
+    parser.add_argument(
+        '--preview', action='store_true',
+        help=f'Save an image of the generated region to {MAP_PATH}, it holds terrain of the whole region in memory.',
+    )
+    return parser.parse_args()
+
+
 if __name__ == '__main__':
+    args = parse_args()
     config = get_config()
     init_logging(config.logging)
-    asyncio.run(main(config))
+    asyncio.run(main(config, Region(*args.region) if args.region else None, args.resume, args.preview))
@@ -0,0 +1,113 @@
+"""Vectorized 2D gradient (Perlin) noise.
+
+The lattice is a seeded permutation table with 8 gradient directions, like the
+classic Perlin noise. Noise of a grid is separable along its axes: contributions of
+lattice gradients are interpolated along columns once for every lattice row, then
+the rows are interpolated for every grid row. Both steps are plain NumPy array
+arithmetic, there is no Python loop over pixels.
+"""
+from __future__ import annotations
+
+import numpy as np
+
+
+PERIOD = 256
+GRADIENTS = np.array(
+    [(1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (-1, 1), (1, -1), (-1, -1)],
+    dtype=np.float32,
+)
+GRADIENTS[4:] /= np.sqrt(2)
+BLOCK_ROWS = 512  # Rows evaluated at once, bounds memory of temporary arrays
+
+
+def fade(t: np.ndarray) -> np.ndarray:
+    """Perlin's smootherstep curve."""
+    return t * t * t * (t * (t * 6 - 15) + 10)
+
+
+def lattice(coordinates: np.ndarray, offset: float) -> tuple[int, np.ndarray, np.ndarray, np.ndarray]:
+    """Get the first lattice point, lattice indexes relative to it, offsets and fade weights of coordinates."""
+    coordinates = coordinates + offset
+    floor = np.floor(coordinates)
+    points = floor.astype(np.int64)
+    first = int(points.min())
+    offsets = (coordinates - floor).astype(np.float32)
+    return first, points - first, offsets, fade(offsets)
+
+
+class GradientNoise:
+    """Perlin noise of a single octave, values are in about [-0.71, 0.71]."""
+
+    def __init__(self, rng: np.random.Generator) -> None:
+        permutation = rng.permutation(PERIOD)
+        self._permutation = np.concatenate([permutation, permutation])
+        self._offset = rng.uniform(0, PERIOD, size=2)  # Decorrelates octaves sharing the lattice
+
+    def _gradients(self, first_x: int, width: int, first_y: int, height: int) -> np.ndarray:
+        """Get gradients of a block of lattice points, shaped `(height, width, 2)`."""
+        xs = np.arange(first_x, first_x + width) % PERIOD
+        ys = np.arange(first_y, first_y + height) % PERIOD
+        hashes = self._permutation[self._permutation[xs][None, :] + ys[:, None]]
+        return GRADIENTS[hashes % len(GRADIENTS)]
+
+    def __call__(self, columns: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """Evaluate noise on a grid of 1D `columns` and `rows` coordinates, shaped `(len(rows), len(columns))`."""
+        first_x, xi, dx, u = lattice(columns, self._offset[0])
+        first_y, yi, dy, v = lattice(rows, self._offset[1])
+        gradients = self._gradients(first_x, int(xi.max()) + 2, first_y, int(yi.max()) + 2)
+        gradient_x, gradient_y = gradients[..., 0], gradients[..., 1]
+
+        # Lerp along columns of `dot(gradient, (dx, dy))` split into its dx and dy parts
+        along_x = gradient_x[:, xi] * ((1 - u) * dx) + gradient_x[:, xi + 1] * (u * (dx - 1))
+        along_y = gradient_y[:, xi] * (1 - u) + gradient_y[:, xi + 1] * u
+
+        v, dy = v[:, None], dy[:, None]
+        return (
+            (1 - v) * (along_x[yi] + dy * along_y[yi]) +
+            v * (along_x[yi + 1] + (dy - 1) * along_y[yi + 1])
+        )
+
+
+class FractalNoise:
+    """Fractal noise, a sum of octaves of gradient noise.
+
+    Octave `i` has frequency `lacunarity ** i / scale` and amplitude `persistence ** i`.
+    The sum is divided by the total amplitude, so the values stay in about [-0.71, 0.71].
+    The value at a point depends only on the seed and its coordinates, so any block of
+    a map can be generated on its own.
+    """
+
+    def __init__(self, scale: float, octaves: int, persistence: float, lacunarity: float, seed: int) -> None:
+        rng = np.random.default_rng(seed)
+        self._layers = [
+            (GradientNoise(rng), lacunarity ** octave / scale, persistence ** octave)
+            for octave in range(octaves)
+        ]
+        self._total_amplitude = sum(amplitude for _, _, amplitude in self._layers)
+
+    def __call__(self, columns: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """Evaluate noise on a grid of 1D `columns` and `rows` coordinates, shaped `(len(rows), len(columns))`."""
+        columns = np.asarray(columns, dtype=np.float64)
+        rows = np.asarray(rows, dtype=np.float64)
+        noise_map = np.zeros((len(rows), len(columns)), dtype=np.float32)
+        for start in range(0, len(rows), BLOCK_ROWS):
+            block_rows = rows[start:start + BLOCK_ROWS]
+            block = noise_map[start:start + len(block_rows)]
+            for noise, frequency, amplitude in self._layers:
+                block += np.float32(amplitude) * noise(columns * frequency, block_rows * frequency)
+
+        noise_map /= self._total_amplitude
+        return noise_map
+
+
+def fractal_noise(
+    width: int,
+    height: int,
+    scale: float,
+    octaves: int,
+    persistence: float,
+    lacunarity: float,
+    seed: int,
+) -> np.ndarray:
+    """Generate a `(height, width)` array of fractal noise, see `FractalNoise`."""
+    return FractalNoise(scale, octaves, persistence, lacunarity, seed)(np.arange(width), np.arange(height))
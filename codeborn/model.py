@@ -11,11 +11,12 @@ from enum import StrEnum
 
 from configobj import ConfigObj
 from tortoise import fields, models
+from tortoise.indexes import Index
 from github.Repository import Repository
 from github import Github
 from git import Repo
 
-from codeborn.client.messages import MessageType
+from codeborn.client.messages import ApiMessage, MessageType
 
 
 if TYPE_CHECKING:
@@ -64,6 +65,11 @@ class TerrainType(StrEnum):
         """Get the movement cost multiplier for this terrain type."""
         return self.config.movement_cost
 
+    @cached_property
+    def code(self) -> int:
+        """Get a compact code of this terrain type, its position in the enumeration."""
+        return list(TerrainType).index(self)
+
     async def dump(self, exclude: list[str] | set[str] | None = None) -> str:
         """Dump the terrain type as a string."""
         return self.value
@@ -315,6 +321,7 @@ class Bot(CodebornModel):
     last_heartbeat = fields.DatetimeField(null=True)
     start_at = fields.DatetimeField(null=True)
     enabled = fields.BooleanField(default=True)
+    updated_at = fields.DatetimeField(auto_now=True, db_index=True)
 
     memory: fields.ReverseRelation['BotMemory']
     armies: fields.ReverseRelation['Army']
@@ -360,6 +367,13 @@ class Bot(CodebornModel):
 
         return BotState.running
 
+    async def save(self, *args, update_fields: list[str] | None = None, **kwargs) -> None:
+        """Ensure updated_at is included when specific fields are updated."""
+        if update_fields and 'updated_at' not in update_fields:
+            update_fields = [*update_fields, 'updated_at']
+
+        await super().save(*args, update_fields=update_fields, **kwargs)
+
     async def dump(self, exclude: list[str] | set[str] | None = None) -> dict[str, Any]:
         """Dump the bot as a dictionary."""
         async def dump_armies(self, exclude: list[str] | set[str] | None = None) -> list[dict[str, Any]]:
@@ -498,6 +512,8 @@ class Unit(CodebornModel):
 class Message(CodebornModel):
     """A message associated with a user."""
 
+    # The table is partitioned by migrations, its primary key is (gid, datetime, type) as partitioning
+    # needs it and the index is descending by datetime. Tortoise can describe neither.
     gid = fields.UUIDField(pk=True, default=uuid4)
     bot = fields.ForeignKeyField('models.Bot', related_name='messages', on_delete=fields.CASCADE)
     type = fields.CharEnumField(MessageType)
@@ -505,6 +521,9 @@ class Message(CodebornModel):
     response_to = fields.UUIDField(null=True)
     payload = fields.JSONField(default=dict)
 
+    class Meta:
+        indexes = (Index(fields=('bot_id', 'datetime'), name='idx_message_bot_id_datetime'),)
+
     def __init__(self, *args, **kwargs) -> None:
         if 'datetime' not in kwargs:
             kwargs['datetime'] = datetime.now(timezone.utc)
@@ -515,31 +534,20 @@ class Message(CodebornModel):
         return f'<Message {self.type.value}: {self.gid}>'
 
     @classmethod
-    def from_bytes(cls, bot_id: UUID, raw: bytes) -> Self:
-        """Create an unsaved Message instance from JSON bytes (newline-safe)."""
-        data = json.loads(raw.strip().decode())
-        gid = UUID(data['gid']) if 'gid' in data else uuid4()
+    def from_api(cls, bot_id: UUID, message: ApiMessage, received_at: datetime | None = None) -> Self:
+        """Create an unsaved Message instance from a message exchanged with an agent.
 
+        `received_at` replaces the datetime set by the agent, its clock can't be trusted.
+        """
         return cls(
-            gid=gid,
+            gid=message.gid,
             bot_id=bot_id,
-            type=data['type'],
-            payload=data.get('payload', {}),
-            datetime=datetime.fromisoformat(data['datetime']),
+            type=message.type,
+            payload=message.payload,
+            datetime=received_at or message.datetime,
+            response_to=message.response_to,
         )
 
-    def to_bytes(self) -> bytes:
-        """Serialize this Message instance into newline-terminated JSON bytes."""
-        data = {
-            'gid': str(self.gid),
-            'bot_id': str(self.bot_id),  # type: ignore
-            'type': self.type,
-            'datetime': self.datetime.isoformat(),
-            'response_to': str(self.response_to) if self.response_to else None,
-            'payload': self.payload,
-        }
-        return json.dumps(data, ensure_ascii=False).encode() + b'\n'
-
     async def dump(self, exclude: list[str] | set[str] | None = None) -> dict[str, Any]:
         """Dump the message as a dictionary."""
         fields = {
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import heapq
+from collections.abc import Iterable, Iterator
+from uuid import UUID
+
+import numpy as np
+
+
+def distance(x1: int, y1: int, x2: int, y2: int) -> int:
+    """Get the number of moves between two locations, moves to all 8 neighbours are allowed."""
+    return max(abs(x1 - x2), abs(y1 - y2))
+
+
+class SpatialIndex:
+    """Positions of armies bucketed into a uniform grid of square chunks.
+
+    Queries only look into chunks overlapping the searched area, so their cost
+    depends on the number of armies nearby, not on all armies of the world. Distances
+    are counted in moves, see `distance()`.
+    """
+
+    def __init__(self, chunk_size: int) -> None:
+        self.chunk_size = chunk_size
+        self._positions: dict[UUID, tuple[int, int]] = {}
+        self._chunks: dict[tuple[int, int], set[UUID]] = {}
+        self._cells: dict[tuple[int, int], set[UUID]] = {}
+
+    @classmethod
+    def from_positions(cls, chunk_size: int, positions: Iterable[tuple[UUID, int, int]]) -> SpatialIndex:
+        """Build an index from `(gid, x, y)` tuples."""
+        index = cls(chunk_size)
+        for gid, x, y in positions:
+            index.add(gid, x, y)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __contains__(self, gid: UUID) -> bool:
+        return gid in self._positions
+
+    def chunk(self, x: int, y: int) -> tuple[int, int]:
+        """Get coordinates of the chunk containing a location."""
+        return x // self.chunk_size, y // self.chunk_size
+
+    # Updates
+
+    def add(self, gid: UUID, x: int, y: int) -> None:
+        """Add an army at a location."""
+        self._positions[gid] = (x, y)
+        self._chunks.setdefault(self.chunk(x, y), set()).add(gid)
+        self._cells.setdefault((x, y), set()).add(gid)
+
+    def remove(self, gid: UUID) -> None:
+        """Remove an army, if it is indexed."""
+        if (position := self._positions.pop(gid, None)) is None:
+            return
+
+        chunk = self.chunk(*position)
+        self._chunks[chunk].discard(gid)
+        if not self._chunks[chunk]:
+            del self._chunks[chunk]
+
+        self._cells[position].discard(gid)
+        if not self._cells[position]:
+            del self._cells[position]
+
+    def move(self, gid: UUID, x: int, y: int) -> None:
+        """Move an army to a new location."""
+        self.remove(gid)
+        self.add(gid, x, y)
+
+    # Queries
+
+    def position(self, gid: UUID) -> tuple[int, int] | None:
+        """Get the location of an army."""
+        return self._positions.get(gid)
+
+    def at(self, x: int, y: int) -> set[UUID]:
+        """Get armies at a location."""
+        return set(self._cells.get((x, y), ()))
+
+    def is_occupied(self, x: int, y: int) -> bool:
+        """Check if there is an army at a location."""
+        return (x, y) in self._cells
+
+    def in_bbox(self, min_x: int, min_y: int, max_x: int, max_y: int) -> list[UUID]:
+        """Get armies in a rectangle, bounds are inclusive."""
+        (min_chunk_x, min_chunk_y), (max_chunk_x, max_chunk_y) = self.chunk(min_x, min_y), self.chunk(max_x, max_y)
+        found = []
+        for chunk_x in range(min_chunk_x, max_chunk_x + 1):
+            for chunk_y in range(min_chunk_y, max_chunk_y + 1):
+                for gid in self._chunks.get((chunk_x, chunk_y), ()):
+                    x, y = self._positions[gid]
+                    if min_x <= x <= max_x and min_y <= y <= max_y:
+                        found.append(gid)
+        return found
+
+    def within(self, x: int, y: int, radius: int) -> list[UUID]:
+        """Get armies at most `radius` moves away from a location."""
+        return self.in_bbox(x - radius, y - radius, x + radius, y + radius)
+
+    def nearest(self, x: int, y: int, count: int) -> list[UUID]:
+        """Get up to `count` armies closest to a location, ordered by distance."""
+        if count <= 0 or not self._positions:
+            return []
+
+        center_x, center_y = self.chunk(x, y)
+        last_ring = max(max(abs(chunk_x - center_x), abs(chunk_y - center_y)) for chunk_x, chunk_y in self._chunks)
+        found: list[tuple[int, UUID]] = []
+
+        for ring in range(last_ring + 1):
+            for chunk in self._ring(center_x, center_y, ring):
+                for gid in self._chunks.get(chunk, ()):
+                    found.append((distance(x, y, *self._positions[gid]), gid))
+
+            # Armies in further rings are more than `ring * chunk_size` moves away
+            if len(found) >= count and heapq.nsmallest(count, found)[-1][0] <= ring * self.chunk_size:
+                break
+
+        return [gid for _, gid in heapq.nsmallest(count, found)]
+
+    @staticmethod
+    def _ring(center_x: int, center_y: int, ring: int) -> Iterator[tuple[int, int]]:
+        """Iterate over chunks exactly `ring` chunks away from a center chunk."""
+        if ring == 0:
+            yield center_x, center_y
+            return
+
+        for offset in range(-ring, ring + 1):
+            yield center_x + offset, center_y - ring
+            yield center_x + offset, center_y + ring
+        for offset in range(-ring + 1, ring):
+            yield center_x - ring, center_y + offset
+            yield center_x + ring, center_y + offset
+
+    def chunk_counts(self, width: int, height: int) -> np.ndarray:
+        """Get the number of armies in every chunk of a map, indexed by `[chunk_x, chunk_y]`."""
+        counts = np.zeros(
+            ((width + self.chunk_size - 1) // self.chunk_size, (height + self.chunk_size - 1) // self.chunk_size),
+            dtype=int,
+        )
+        for (chunk_x, chunk_y), gids in self._chunks.items():
+            if chunk_x < counts.shape[0] and chunk_y < counts.shape[1]:
+                counts[chunk_x, chunk_y] = len(gids)
+        return counts
@@ -0,0 +1,124 @@
+from tortoise import BaseDBAsyncClient
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "message" RENAME TO "message_unpartitioned";
+ALTER TABLE "message_unpartitioned" RENAME CONSTRAINT "message_pkey" TO "message_unpartitioned_pkey";
+CREATE TABLE "message" (
+    "gid" UUID NOT NULL,
+    "type" VARCHAR(18) NOT NULL,
+    "datetime" TIMESTAMPTZ NOT NULL,
+    "response_to" UUID,
+    "payload" JSONB NOT NULL,
+    "bot_id" UUID NOT NULL REFERENCES "bot" ("gid") ON DELETE CASCADE,
+    PRIMARY KEY ("gid", "datetime", "type")
+) PARTITION BY RANGE ("datetime");
+CREATE INDEX "idx_message_bot_id_datetime" ON "message" ("bot_id", "datetime" DESC);
+COMMENT ON COLUMN "message"."type" IS 'heartbeat_response: heartbeat_response\nheartbeat_request: heartbeat_request\nbot_log: bot_log\nstate_sync: state_sync\nmemory_download: memory_download\nmemory_upload: memory_upload\ncommand: command\ncommand_result: command_result';
+COMMENT ON TABLE "message" IS 'A message associated with a user.';
+DO $$
+DECLARE
+    partition_day DATE;
+    partition_name TEXT;
+    message_type TEXT;
+BEGIN
+    FOR partition_day IN
+        SELECT generate_series(
+            COALESCE((SELECT MIN("datetime") AT TIME ZONE 'UTC' FROM "message_unpartitioned")::DATE, CURRENT_DATE),
+            (NOW() AT TIME ZONE 'UTC')::DATE + 3,
+            INTERVAL '1 day'
+        )::DATE
+    LOOP
+        partition_name := 'message_p' || to_char(partition_day, 'YYYYMMDD');
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF "message" FOR VALUES FROM (%L) TO (%L) PARTITION BY LIST ("type")',
+            partition_name,
+            partition_day::TIMESTAMP AT TIME ZONE 'UTC',
+            (partition_day + 1)::TIMESTAMP AT TIME ZONE 'UTC'
+        );
+        FOREACH message_type IN ARRAY ARRAY[
+            'heartbeat_response', 'heartbeat_request', 'bot_log', 'state_sync',
+            'memory_download', 'memory_upload', 'command', 'command_result'
+        ]
+        LOOP
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF %I FOR VALUES IN (%L)',
+                partition_name || '_' || message_type, partition_name, message_type
+            );
+        END LOOP;
+        EXECUTE format('CREATE TABLE %I PARTITION OF %I DEFAULT', partition_name || '_default', partition_name);
+    END LOOP;
+END $$;
+INSERT INTO "message" ("gid", "type", "datetime", "response_to", "payload", "bot_id")
+    SELECT "gid", "type", "datetime", "response_to", "payload", "bot_id" FROM "message_unpartitioned";
+DROP TABLE "message_unpartitioned";"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "message" RENAME TO "message_partitioned";
+CREATE TABLE "message" (
+    "gid" UUID NOT NULL PRIMARY KEY,
+    "type" VARCHAR(18) NOT NULL,
+    "datetime" TIMESTAMPTZ NOT NULL,
+    "response_to" UUID,
+    "payload" JSONB NOT NULL,
+    "bot_id" UUID NOT NULL REFERENCES "bot" ("gid") ON DELETE CASCADE
+);
+COMMENT ON COLUMN "message"."type" IS 'heartbeat_response: heartbeat_response\nheartbeat_request: heartbeat_request\nbot_log: bot_log\nstate_sync: state_sync\nmemory_download: memory_download\nmemory_upload: memory_upload\ncommand: command\ncommand_result: command_result';
+COMMENT ON TABLE "message" IS 'A message associated with a user.';
+INSERT INTO "message" ("gid", "type", "datetime", "response_to", "payload", "bot_id")
+    SELECT "gid", "type", "datetime", "response_to", "payload", "bot_id" FROM "message_partitioned";
+DROP TABLE "message_partitioned";"""
+
+
+MODELS_STATE = (
+    "eJztXG1vo7gW/ison2alvdU0TbtVtbpS2mZ2credjjrt3dVORsgBJ0EFmwUzbXY0/32PzZ"
+    "sBk0BeWpjyJQT7HIMf7MNzzrH51nOoiW3/YOg5y96Z9q1HkIPhT6b8Z62HXDct5QUMTW0h"
+    "iGKJqc88ZDAomyHbx1BkYt/wLJdZlHDJIdG4sDbFNiVzi8w1RjWkBT72DngLJjWgCSivIh"
+    "wQ6+8A64zOMVtgD1Q+f4Fii5j4Cfvxqfugzyxsm5muzS2TtyAqdLZ0ReH9/fjynRDldzLV"
+    "DWoHDpHE3SVbUJLIB4FlHnAlXjfHBHuIYVPqPAlsO8IoLgrvGQqYF+DkZs20wMQzFNgcwt"
+    "6vs4AYHDlNXIn/DP7bK4DKr5KDLioyKOEPxCKMo/Hte9ittNOitMcvdfF+ePvm6OQn0Uvq"
+    "s7knKgUkve9CETEUqgpkUyinlOn10Ew1dgloXJAimo7BGNIYqufHL8XLpgbiV64JWk7ttS"
+    "DHZ/DsoWzgFQF8Rz1szcnveClgHMNtIGJgBWSRdTsPW2ksZmlpaiM89JjYNGk2QeegS5iJ"
+    "7l0MP10ML0c95djbAW5XUlPtBS83q9QI8jE4RcbDI/JMvWQwQt+YX4T1PFJ79/stthO81I"
+    "jeQxPtQlMgQ/tUQiSDVbHK6Tv5EkTQXNw1vza/kjQxFWwkmq/lZCQyCxW4iAaiGjIMGhCm"
+    "2RZ5wOZKOrJeXsFIPvd4bTS+RF++dCTl2UmKOBawvFggT41lLJ8DE260mTMUptGTbmMyZw"
+    "s4PX67AsX/D28FkMdvBZAUJkk4cT5ENX1RlSUtmDBvqbuUz/0aMObUNkIzGnIvBubh2ypo"
+    "glQpnKIuiyeMXIY8pnsYOuXzvhdfHZTaGBE1sEr9HLxTaGBfo1VtUncxyc9vbq74XTu+/7"
+    "ctCsZ3OWDvr89HgLjAG4Ss8HU9/nCXZ9rIZ/oCA05TjBTj9hJAYZaDSwh3QTuHrxmpH8R/"
+    "GjmYV0B9N74efbobXn/M4H05vBvxmr4oXeZK35zkhnnSiPbH+O69xk+1v24+jPJGOpG7+4"
+    "tz0h4KGNUJfdSRKXc7Lo6LMg80HPP1H6Ws1z3EF36ImHAY6xo8SesZzVxCdxps5SR6WZUp"
+    "SipdHEGgsQOH+D5qprGorXWGpWGxuSOMPMfCW3rCccS5PVBmZqSDfR982i1BuA5baRkOtS"
+    "ICMmQO9ZblgN0QfEfhZz1s55RdJ4019UWuxq1ecCTqpTpEkkKwMlCSwr4+XBI2qXnYoJ6p"
+    "0ZmGeDykGCZZIdclbJoQC+EVRSz/9+nmgxrLWD4H5j2B3nw2LYP9rNmWz77sy1JJsE4Dy2"
+    "YW8Q/4ZfeELAciQ81iR/7N9fDPvI9/cXVznn8EvIHzPElzuX9hbuC7ZDV34L28RHTKwwhM"
+    "uL1M35ZtcGeiCS55M4VXfVOSn+uNU2OIdzmJLHKHNcm+mBXsN9X3TNhunejbXerlN4u9D6"
+    "bDMNOhYhhZgZUsY26xRTBFkmiFxEzYfq3cTBWVjn80gX+EI0JpNseEleEp6eRQjZILTZvW"
+    "cENw+E//cPDL4PToZHAKIuJOkpJfVuCriGbTuaVI3JcnXxKFdiax9pJ3AfMAbjVYgAdcC8"
+    "u8Xjsh7VeCtL8C0n4RUoFJiEQNQLNa7YRz92lW36D1YEwU2ongXgYk+gpvHk8PPLvWDM9o"
+    "tTJTfVQJzaMVaB4V0RRp0NAJ3SiDmqp2mbcXzrw1J1P0Q7ir8moOaGm7aP9vguDeQkPNtN"
+    "s1Av7rMms1vfZN82pNcdvrZdW29dvjQaR22qUhts5j92K56u66mAYW49F/yf0msU++wmuv"
+    "otk5753z3lrn/XWtP90LrZ/BhfW6OGaUOjBTR9P6R4Fj6QyOxXczeZ8BwR1PX8OmBNf1KD"
+    "NK7Rx7e/EoF8yx62Ip63RQSo6HQxnWv2LPV+7qKge0qNnKkMdhtRjxihBxCaT+QrFGYi2c"
+    "kVYroRxUgXJQDuWgAGXE+yISXzPyoFTuVqvmcCkiWnvdaiGX21gg17rayjFTdynrPvc0Jp"
+    "tmFe65vKG23DmXd/BWcc1jec0iGrjNmr/0GXZUrvgKSeW2xides+x2M76AE/5Ug7o/vWbe"
+    "rlhRXArU8jUDxbDHG1dTnhEJnMLLJJvNTdWfj533XBuu6RdnZ1RxpoXHCZlRvl8S2hDHCf"
+    "EfkeOeaeKQt4RVqNJJBaaUT/SkROnkp03zDK90b8U+38jxLgvFC1nagFH+PnYkoQqv40hc"
+    "Q75PDYvDrz0CaVmxrq2CxvrI+LdeCoe0jjDJvHJx/OTC7ODeYIJaDIhlPunRfeihti4nbe"
+    "MR1hOtAAbi5HvHBPbPBMqX3VQw2s1YfNNL9ljr0G8XUMNnWrFsQuQyses9KyaKJoSPT5vO"
+    "z7Toz4R3n7vmS2KAyU/+T0i4+UU36SOxKTLPtFxBIhG4mfrwdEIM6oBZgfLoT1LC7xk6nF"
+    "RE55u8aQ5Pq8Q3TsvjG6d5p1yeuHUWc8h67dyF8CMt5YhnBRj9OqY0p7aFSW3USpwaX19z"
+    "0ZLP3iJo5fufJJVuC9TmW6CaslWmySN1Rdyv+9pd/U0wzxbXE59uU7gQ8Sfdyv2HIJao4D"
+    "xwWR6dQ+F3UVXegkpEGb2LyZ/4dGsXw+uY+ybM3bbmC5iOZIb4d77OtOy5YOxfl1J99hyY"
+    "uQv83cEEeHn0b0LCNgz0Fdlpk9Fp3GJSmzmdEOQZMMDPtPAIfNyjvj+ljzBvgYynJxsx8U"
+    "EVJj4oZ+KDwhoMhhyLIN0nyPUXSvMOvKNsRYZCOTccZlx7XwPi8ODtXmbU5c39+dVI+3g7"
+    "uhh/Gkc0JKHeopIXpR/EuR0Nr/KrNdSZsdLIbyL/WqO/3e70H3N3On+51+TckkpHupMP22"
+    "/JutsXc8/TbmlYNIp3+4LPFnl3tGdgBe+OJarwbpBdnz8vkeqWrTeBbXMqB66jIndWygpk"
+    "lecjBocvywo2Skuqga2TlGxdWGLT75yFK5TKwar+nbO6y7ba+62zIfYsY6Ey81HNSkOPUp"
+    "l1pr68Z1sY8Vo7ZapukYkeZvt3yJRb7A3WNG+7mPnF14j3j4+rbPU4Pi7f6sHrctvhXbcO"
+    "iJF4OwHcyzdD4IoMqwIK5SkjSeWlUkZ786Z2lhyqwTV270N8/xdHx1B/"
+)
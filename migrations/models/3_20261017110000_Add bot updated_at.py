@@ -0,0 +1,65 @@
+from tortoise import BaseDBAsyncClient
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "bot" ADD "updated_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP;
+CREATE INDEX IF NOT EXISTS "idx_bot_updated_bf8e4f" ON "bot" ("updated_at");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_bot_updated_bf8e4f";
+ALTER TABLE "bot" DROP COLUMN "updated_at";"""
+
+
+MODELS_STATE = (
+    "eJztXW1vozgQ/ison3alvapN015VnU5K2uxubttm1Ze7025WyAEnQQWbBdM2V/W/n23eDJ"
+    "gE8lbY8qUEe8bgB495Zsamzy0L69B097qONW+dKs8tBCxIfyTKPygtYNtxKSsgYGxyQRBK"
+    "jF3iAI3QsgkwXUiLdOhqjmETAyMm2UUKE1bG0MRoaqCpQrACFM+Fzh5rQccabYKWFxH2kP"
+    "HTgyrBU0hm0KEq33/QYgPp8Am64al9r04MaOqJrk0NnbXAK1Qyt3nh3d3g/CMXZXcyVjVs"
+    "ehYSxO05mWEUyXueoe8xJVY3hQg6gEBd6DzyTDPAKCzy75kWEMeD0c3qcYEOJ8AzGYStPy"
+    "Ye0hhyCr8S+9P5s5UBlV0lBV1QpGHEHoiBCEPj+cXvVtxpXtpilzr73L1+d3j8nvcSu2Tq"
+    "8EoOSeuFKwICfFWObAzlGBO1HJqxxiYBDQtiROMxGEIaQrV7/GK8TKwBduWSoKXU3gpyzI"
+    "In93kDLwvgR+xAY4q+wDmHcUBvAyANSiALZree30plMYtL4znCAY/RnCZYE+0c7RIkvHtn"
+    "3Zuz7nm/JR17G8DtQmiqvuClrEqOIBuDY6DdPwJHV3MGI+0bcbOw9gK1j1+uoRnhJUf0jj"
+    "ZRLzQ5MriNBUQSWGWrrLaVLgEITPlds2uzKwmGKWEjgb3mk5FgWijARRQqqgBNwx4iimmg"
+    "e6gvpCPL5SWM5HuL1Qbji/flR0NSdk5S+DGD5dkMOHIsQ/kUmPRGq2mh1IyeVBOiKZnR06"
+    "P9BSj+3b3mQB7tcyAxNRLfcK6CmjavSpIWiIgzV23MbL8EjCm1ldAMhtyrgXmwXwRNKpUL"
+    "J69L4klHLgEOUR1IO+WyvmdfHRibECA5sFL9FLxj2sC2Rqt8St2EkfeGwwt215br/jR5we"
+    "A2BezdZa9PEed4UyHDf10Prm7TTBu4RJ1BitMYAsm4PaegEMOCOYQ7o53CVw/U98IflRzM"
+    "C6C+HVz2b267l18TeJ93b/usps1L56nSd8epYR41ovwzuP2ssFPl2/Cqn56kI7nbb4yTto"
+    "BHsIrwowp0sdthcViUeKD+mC//KEW95iG+8kOEiMFYdsITtHY4zUV0p8KznGezoauvYBZJ"
+    "zQ0YRgGMMwRyzVe1A4E+ROY8aLomhhKgINhJcPPCY429hqIOgKDShIc4GhuIc9wFzVQWta"
+    "UxDmFYrB7fAI5lwDUDHGEioT5QJizSgq4LpuuCcOm3UjMcSgV6RMgs7MzzARsieIvpn+Ww"
+    "9TC5jBqrKj+T41Yu5hX0Uh75iiFYGP+KYV8eBfObVByoYUdX8EQBLMyVjX4tkGvycFUIcb"
+    "GKLJZ/3Qyv5FiG8ikw7xDtzXfd0MgHxTRc8mNbM5UA69gzTGIgd49ddkvIMiASzC+Mz7y7"
+    "7P6bDt2cXQx76UfAGujVmntvPE72y5LvquS0l09OlSHe+SQyyx2W5HBDVrDdDO6OsF07f7"
+    "u5jNong3z2xl0/gSVjGEmBhSxjapCZNwaCaIF8m99+qZRbEZWGf1SBf/gjQjptDhDJw1PQ"
+    "SaEa5IyqZtb0hujht/ZB5/fOyeFx54SK8DuJSn5fgK8kSYGnhmQ9Rn5OLVKoZ25yK+k0Oj"
+    "1Qt5rOAPewFJZpvXpC2i4EaXsBpO0spBwTH4kSgCa16gnn5rPnrobLwRgp1BPBrQxI8EDf"
+    "PI7qOWYpC09o1XIBwmEhNA8XoHmYRZNnt30ndKXEeKzaJFRfOaFanUzRL+Guiot0aEvrRf"
+    "s/cYJ7TRuq5rxdIuC/LLNW0mtfNa9WFbe9XFZtXb89HERyp10YYss8dieUK+6uczMwCIv+"
+    "C+43Cn3yBV57Ec3GeW+c99o6729rWfFWaP2EXlgti2NCqQEzdjSN/yQ45lpwKL4Z490Bgh"
+    "s2X83ECJb1KBNK9Rx7W/EoZ8Qyy2Ip6jRQCo6HhQlUH6DjSjfr5QOa1axlyOOgWIx4QYg4"
+    "B1J3JlkjsRTOQKuWUHaKQNnJh7KTgTLgfQGJLxl5kCo3q1VTuGQRLb1uNZPLrSyQS11t6Z"
+    "gpu5R1m1tVo73QEvdc3Ced75yLG7OLuOahvGIghbrNijt3CbRkrvgCSelu1SdWM282qb6C"
+    "E/5Ugro/vWXeLllRnAvU/C0DRaDDGpdTnj7yrMzLJJnNjdV3x85btkmv6WatM6g4VfzjCE"
+    "0w2wZL2+DHEXIfgWWfKvyQngmLUKXjAkwpneiJidLx+1XzDG90b8U238jhLgvJC1nYgJH/"
+    "PrYEoQKv40BcAa6LNYPBrzxS0rJgXVsBjeWR8edWDIewjjDKvDJx+GRT62DeYIRaCIihP6"
+    "nBfai+tiombcMR1uKtUAz4yUvDBLbPBPKX3RSYtKux+KYVbZ1Xab9tiho8VbJlIySW8Y8Z"
+    "JMV40Qix8Wni6akS/Bix7jPXfI40OuVHv0fI3/yi6vgRmRjop0qqIJLw7ES9fzpCGrbotE"
+    "LLgx9RCbtn2uGoIjhf5U1zcFIkvnGSH984STvlouGWWcwh6tVzF8KvtJQjtAo66ZeZSlNq"
+    "a0yplVqJU+KjejaYM+vNgpa//0lQabZArb4FqipbZao8UhfE/ZqPGJbfBLOzuB7/Ip/EhQ"
+    "i/1JfvP3ihRAHngcmy6BzwP3cr8xZkItLoXUj++Bd5mxhew9xXYe6mMZ1Rc0QTwD7fdqok"
+    "zzljf5gL9clzysxtyt8tiCgvD36NkN+GBh6AGTcZnIYtRrWJ0xECjkYH+KniHykfd7Drjv"
+    "EjtVtKxuOTlZh4pwgT7+Qz8U5mDQYBloGA6iJguzPp9E55R96KDIlyajhMmPa2BsTB3v5W"
+    "LOp8eNe76Ctfr/tng5tBQEMi6s0rWVH8naPrfvcivVpDnhnLjfxG8m81+tvsTv81d6ezl3"
+    "tJzi2oNKQ7+n8Fa7Lu+sXc07RbGBaV4t0u57NZ3h3sGVjAu0OJIrybyi7Pn+dINcvWq8C2"
+    "GZWjrqMkd5bLCkSV3RGDg9dlBSulJeXAlklK1i4ssep3zvwVSvlgFf/OWdllW/X91lkXOo"
+    "Y2k03zQc3CiR7EMsum+vyerTGJl9opU3SLTPAw679DJn/GXmFN87qLmV99jXj76KjIVo+j"
+    "o/ytHqwutR3etsuAGIjXE8CtfDOEXpFAWUAhP2UkqLxWymhr3tTGkkMluMbmfYiX/wFHRe"
+    "dY"
+)
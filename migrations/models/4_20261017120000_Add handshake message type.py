@@ -0,0 +1,63 @@
+from tortoise import BaseDBAsyncClient
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        COMMENT ON COLUMN "message"."type" IS 'heartbeat_response: heartbeat_response\nheartbeat_request: heartbeat_request\nbot_log: bot_log\nstate_sync: state_sync\nmemory_download: memory_download\nmemory_upload: memory_upload\ncommand: command\ncommand_result: command_result\nhandshake: handshake';"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        COMMENT ON COLUMN "message"."type" IS 'heartbeat_response: heartbeat_response\nheartbeat_request: heartbeat_request\nbot_log: bot_log\nstate_sync: state_sync\nmemory_download: memory_download\nmemory_upload: memory_upload\ncommand: command\ncommand_result: command_result';"""
+
+
+MODELS_STATE = (
+    "eJztXW1vo7gW/ison2alvdU0TbtVtbpS2mZ2credjjrt3dVORsgBJ0EFmwUzbXY0/32PzZ"
+    "sBk0BeWpjypQH7HIMffMxzzrHpt55DTWz7B0PPWfbOtG89ghwMB5nyn7Uect20lBcwNLWF"
+    "IIolpj7zkMGgbIZsH0ORiX3Ds1xmUcIlh0TjwtoU25TMLTLXGNWQFvjYO+AtmNSAJqC8in"
+    "BArL8DrDM6x2yBPVD5/AWKLWLiJ+zHp+6DPrOwbWa6NrdM3oKo0NnSFYX39+PLd0KU38lU"
+    "N6gdOEQSd5dsQUkiHwSWecCVeN0cE+whhk2p8ySw7QijuCi8ZyhgXoCTmzXTAhPPUGBzCH"
+    "u/zgJicOQ0cSX+Z/DfXgFUfpUcdFGRQQl/IBZhHI1v38NupZ0WpT1+qYv3w9s3Ryc/iV5S"
+    "n809USkg6X0XioihUFUgm0I5pUyvh2aqsUtA44IU0XQMxpDGUD0/fileNjUQv3JN0HJqrw"
+    "U5bsGzh7KBVwTwHfWwNSe/46WAcQy3gYiBFZBFs9t52EpjMUtL0znCQ4/JnCZZE3QOuoSZ"
+    "6N7F8NPF8HLUU469HeB2JTXVXvByVqVGkI/BKTIeHpFn6iWDEfrG/CKs55Hau99vsZ3gpU"
+    "b0HppoF5oCGdqnEiIZrIpVTt/JlyCC5uKu+bX5lSTDVLCRyF7LyUg0LVTgIhqIasgwaECY"
+    "ZlvkAZsr6ch6eQUj+dzjtdH4En350pGUZycp4reA5cUCeWosY/kcmHCjzbRQMKMn3cZkzh"
+    "Zwevx2BYr/H94KII/fCiApGEloOB+imr6oypIWTJi31F3Kbb8GjDm1jdCMhtyLgXn4tgqa"
+    "IFUKp6jL4gkjlyGP6R6GTvm878VXB6U2RkQNrFI/B+8UGtjXaFVPqbsw8vObmyt+147v/2"
+    "2LgvFdDtj76/MRIC7wBiErfF2PP9zlmTbymb7AgNMUI8W4vQRQmOXgEsJd0M7ha0bqB/FB"
+    "IwfzCqjvxtejT3fD648ZvC+HdyNe0xely1zpm5PcME8a0f4Y373X+Kn2182HUX6STuTu/u"
+    "KctIcCRnVCH3Vkyt2Oi+OizAMNx3z9RynrdQ/xhR8iJhzGuhOepPWM01xCdxo8ywUuH7rm"
+    "BmaR1dyBYVTAuEAgt3xVexiZN8ReRk23xFAiFCQ7iW5eeqyp11DVAZBUuvCQQGMHcY77qJ"
+    "nGorY2xiENi83jG8hzLLxlgCNOJLQHyoxFOtj30XxbEK7DVlqGQ61AjwyZQ71lOWA3BN9R"
+    "+LMetnPKrpPGmsrP1LjVi3lFvVRHvlIIVsa/UtjXR8HCJjUPG9QzNTrTEA9zFaNfK+S6PF"
+    "wTQly8oojl/z7dfFBjGcvnwLwn0JvPpmWwnzXb8tmXfc1UEqzTwLKZRfwDftk9IcuByDC/"
+    "OD7z5nr4Zz50c3F1c55/BLyB81Zz753HyX5Y8t2UnPb6yakxxLucRBa5w5ocbswK9pvBfS"
+    "Zst87f7i6j9pvF3gfTYZjAUjGMrMBKljG32CKYIkm0Qr4tbL9Wyq2KSsc/msA/whGhnDbH"
+    "hJXhKenkUI1yRk0za7gh+PlP/3Dwy+D06GRwCiLiTpKSX1bgq0hS0LmlWI9RnlNLFNqZm9"
+    "xLOg2mB3CrYQZ4wLWwzOu1E9J+JUj7KyDtFyEVmIRI1AA0q9VOOHefPfcNWg/GRKGdCO5l"
+    "QKKv8Obx9MCza1l4RquVCxCOKqF5tALNoyKaIrsdOqEbJcZT1S6h+sIJ1eZkin4Id1VepA"
+    "MtbRft/00Q3FtoqJnzdo2A/7rMWk2vfdO8WlPc9npZtW399ngQqZ12aYit89i9WK66uy7M"
+    "wGI8+i+53yT2yVd47VU0O+e9c95b67y/rmXFe6H1M7iwXhfHjFIHZupoWv8ocCy14Fh8N8"
+    "b7DAju2HwNmxJc16PMKLVz7O3Fo1wwx66LpazTQSk5Hg5lWP+KPV+5Wa8c0KJmK0Meh9Vi"
+    "xCtCxCWQ+gvFGom1cEZarYRyUAXKQTmUgwKUEe+LSHzNyINSuVutmsOliGjtdauFXG5jgV"
+    "zraivHTN2lrPvcqprshVa45/I+6XLnXN6YXcU1j+U1i2jgNmv+0mfYUbniKySVu1WfeM2y"
+    "26T6Ak74Uw3q/vSaebtiRXEpUMvXDBTDHm9cTXlGJHAKL5NsNjdVfz523nNtuKZftM6o4k"
+    "wLfydkRvk2WGhD/E6I/4gc90wTP/mZsApVOqnAlPKJnpQonfy0aZ7hle6t2OcbOd5loXgh"
+    "Sxswyt/HjiRU4XUciWvI96lhcfi1RyAtK9a1VdBYHxn/1kvhkNYRJplXLo6fXLAO7g0mqM"
+    "WAWOaTHt2HHmrrctI2HmE90QpgIE6+d0xg/0ygfNlNhUm7GYtvesnWeR367QJq+Ewrlk2I"
+    "XCY+ZpAVE0UTwsenTednWnQw4d3nrvmSGDDlJ8cTEm5+0U36SGyKzDMtV5BIBG6mPjydEI"
+    "M6MK1AeXSQlPB7hg4nFdE59ABO/AV64B2MDzd5/xyeVol6nJZHPU7zrrpsznWWeMh67dyb"
+    "8CMt8IhtBV4FdSbYnNoWE22j1ufU+NSei5bcpougle+KklS6jVGbb4xqygaaJo/UFdHA7t"
+    "OG9bfGPFu0T3ynT+FYxN/vK/cqgliigkvBZXnMDoUfwVX5ECoRZUwvpoTiO71dZK/j85vw"
+    "eduaL8AcyQzxj7qdadlzweO/LqX67DnwdRdYvYMJsPXoaELCNgz0Fdlpk9Fp3GJSmzmdEO"
+    "QZMMDPtPAXWLpHfX9KH8FugaKnJxsx8UEVJj4oZ+KDwsoMhhyLIN0nyPUXyukdeEfZOg2F"
+    "cm44zLj2vgbE4cHbvVjU5c39+dVI+3g7uhh/Gkc0JKHeopIXpV8/uh0Nr/JrONT5stJ4cC"
+    "L/WmPC3Z71H3PPOn+51+TckkpHupP/YrAl625fJD5Pu6Vh0Sje7Qs+W+Td0U6CFbw7lqjC"
+    "u0F2fVa9RKpbzN4Ets2pHLiOioxaKSuQVZ6PGBy+LCvYKFmpBrZOqrJ1YYlNv34WrlsqB6"
+    "v618/qLuZq7xfQhtizjIVqmo9qVk70KJVZN9WX92yLSbzW/pmqG2eih9n+fTPlM/YGK523"
+    "XeL84ivH+8fHVTaAHB+XbwDhdblN8q5bB8RIvJ0A7uVLInBFhlUBhfKUkaTyUimjvXlTO0"
+    "sO1eAau/chvv8Lo4Tvyg=="
+)
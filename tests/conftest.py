@@ -0,0 +1,115 @@
+"""Shared fixtures of the test suite.
+
+Tests run without the Ansible vault and without Postgres. Secrets come from
+environment variables and models live in an in-memory SQLite database.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from collections.abc import Awaitable, Callable, Iterator
+from types import SimpleNamespace
+from typing import Any
+from uuid import UUID, uuid4
+
+import pytest
+from tortoise import Tortoise
+
+os.environ.setdefault('CODEBORN_APP_MODE', 'development')
+os.environ.update({
+    'CODEBORN_VAULT_PASS': 'test',
+    'CODEBORN_API__SESSION_KEY': 'test',
+    'CODEBORN_AUTH__JWT__SECRET': 'test',
+    'CODEBORN_GITHUB__CLIENT_ID': 'test',
+    'CODEBORN_GITHUB__CLIENT_SECRET': 'test',
+    'CODEBORN_DATABASE__NAME': 'codeborn',
+    'CODEBORN_DATABASE__USER': 'codeborn',
+    'CODEBORN_DATABASE__PASSWORD': 'test',
+    'CODEBORN_DATABASE__HOST': 'localhost',
+    'CODEBORN_DATABASE__PORT': '5432',
+})
+
+import codeborn.config  # noqa: E402
+
+
+class NoVaultSettingsSource(codeborn.config.AnsibleVaultSettingsSource):
+    """Vault source without any secrets, they are set by environment variables above."""
+
+    def _load_vault_file(self, app_mode: codeborn.config.AppMode, vault_password: str) -> dict[str, Any]:
+        return {}
+
+
+codeborn.config.AnsibleVaultSettingsSource = NoVaultSettingsSource  # type: ignore
+
+from codeborn.client.messages import ApiMessage  # noqa: E402
+from codeborn.engine.agents import BotAgent  # noqa: E402
+
+
+class FakeAgent(BotAgent):
+    """Agent without a process, it records messages sent to it and being stopped."""
+
+    def __init__(self, bot_gid: UUID | None = None) -> None:
+        self.bot = SimpleNamespace(gid=bot_gid or uuid4())  # type: ignore
+        self.sent: list[ApiMessage] = []
+        self.stops = 0
+
+    @property
+    def is_alive(self) -> bool:
+        return not self.stops
+
+    async def start(self, on_message: Callable[[BotAgent, ApiMessage], Awaitable[None]]) -> None:
+        pass
+
+    async def stop(self) -> None:
+        await asyncio.sleep(0)
+        self.stops += 1
+
+    async def send_message(self, message: ApiMessage) -> None:
+        self.sent.append(message)
+
+
+@pytest.fixture
+def make_agent() -> type[FakeAgent]:
+    """Get the class of fake agents."""
+    return FakeAgent
+
+
+@pytest.fixture
+def run_db() -> Callable[[Callable[[], Awaitable[Any]]], Any]:
+    """Get a function running a coroutine function against a fresh in-memory database."""
+    def run(scenario: Callable[[], Awaitable[Any]]) -> Any:
+        async def main() -> Any:
+            await Tortoise.init(db_url='sqlite://:memory:', modules={'models': ['codeborn.model']})
+            await Tortoise.generate_schemas()
+            try:
+                return await scenario()
+            finally:
+                await Tortoise.close_connections()
+
+        return asyncio.run(main())
+
+    return run
+
+
+class QueryLog(logging.Handler):
+    """Collects queries logged by Tortoise clients."""
+
+    def __init__(self) -> None:
+        super().__init__(logging.DEBUG)
+        self.queries: list[str] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.queries.append(record.getMessage())
+
+
+@pytest.fixture
+def queries() -> Iterator[list[str]]:
+    """Get the list of queries run by the test."""
+    logger = logging.getLogger('tortoise.db_client')
+    handler, level = QueryLog(), logger.level
+    logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG)
+    yield handler.queries
+    logger.removeHandler(handler)
+    logger.setLevel(level)
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from codeborn.client.bot import Bot
+from codeborn.client.messages import ApiMessage, Framing, MessageType
+
+
+class TrickleReader:
+    """Binary stream returning at most a few bytes per read, like a pipe under load."""
+
+    def __init__(self, data: bytes, chunk: int = 3) -> None:
+        self.data = data
+        self.chunk = chunk
+
+    def read(self, size: int) -> bytes:
+        read, self.data = self.data[:min(size, self.chunk)], self.data[min(size, self.chunk):]
+        return read
+
+
+def msgpack_bot(monkeypatch: pytest.MonkeyPatch, data: bytes, chunk: int = 3) -> Bot:
+    monkeypatch.setattr(sys, 'stdin', SimpleNamespace(buffer=TrickleReader(data, chunk)))
+    bot = Bot()
+    bot._input_framing = Framing.msgpack
+    return bot
+
+
+def test_read_message_reads_whole_frame(monkeypatch):
+    message = ApiMessage(type=MessageType.state_sync, payload={'me': {'name': 'x' * 100}})
+    bot = msgpack_bot(monkeypatch, message.to_frame() * 2)
+
+    assert bot._read_message() == message
+    assert bot._read_message() == message
+    with pytest.raises(EOFError):
+        bot._read_message()
+
+
+def test_read_message_raises_eof_inside_frame(monkeypatch):
+    frame = ApiMessage(type=MessageType.heartbeat_request).to_frame()
+    bot = msgpack_bot(monkeypatch, frame[:-1], chunk=len(frame))
+
+    with pytest.raises(EOFError):
+        bot._read_message()
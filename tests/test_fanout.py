@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+from uuid import uuid4
+
+from codeborn.client.messages import ApiMessage, MessageType
+from codeborn.config import get_config
+from codeborn.engine.agents import BotAgent
+from codeborn.engine.agents.process import ProcessAgent
+from codeborn.engine.lifecycle import fan_out
+from codeborn.logger import get_logger
+
+
+async def on_message(agent: BotAgent, message: ApiMessage) -> None:
+    pass
+
+
+def test_fan_out_skips_agent_with_stalled_stdin(tmp_path):
+    stalled = tmp_path / 'stalled'
+    stalled.mkdir()
+    (stalled / '__main__.py').write_text('import time\ntime.sleep(60)\n')  # Never reads stdin
+
+    config = get_config().agents.model_copy(deep=True)
+    config.fanout.send_timeout = 0.2
+    config.transport.binary_framing = False
+
+    async def scenario() -> None:
+        agent = ProcessAgent(SimpleNamespace(gid=uuid4(), entry_point=str(stalled)), config)  # type: ignore
+        await agent.start(on_message)
+        try:
+            assert not agent.slow_consumer
+
+            # Far more than the pipe and the transport buffer hold
+            await agent.send_message(ApiMessage(type=MessageType.bot_log, payload={'data': 'x' * 4 * 1024 * 1024}))
+            async with asyncio.timeout(5):
+                while not agent.slow_consumer:
+                    await asyncio.sleep(0.05)
+
+            sent = []
+
+            async def send(agent: BotAgent) -> None:
+                sent.append(agent)
+
+            counts = await fan_out([agent], send, config.fanout, get_logger(component='test'))
+            assert counts['skipped'] == 1
+            assert sent == []
+        finally:
+            await agent.stop()
+
+    asyncio.run(scenario())
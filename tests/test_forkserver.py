@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import asyncio
+import signal
+from pathlib import Path
+
+import pytest
+
+from codeborn.config import get_config
+from codeborn.engine.agents.forkserver import ForkServer
+
+
+def test_forked_process_is_not_signalled_after_exit(tmp_path: Path):
+    package = tmp_path / 'echo_bot'
+    package.mkdir()
+    (package / '__main__.py').write_text('import sys\nprint(sys.stdin.readline().strip().upper(), flush=True)\n')
+
+    async def scenario() -> None:
+        server = ForkServer(get_config().agents.forkserver, 2 ** 20)
+        await server.start()
+        try:
+            process = await server.spawn(package)
+            process.stdin.write(b'hello\n')
+            await process.stdin.drain()
+            async with asyncio.timeout(10):
+                assert (await process.stdout.readline()).strip() == b'HELLO'
+                await process.wait()
+
+            assert process.returncode == 0
+            with pytest.raises(ProcessLookupError):
+                process.send_signal(signal.SIGKILL)
+
+            waiting = await server.spawn(package)  # Blocks reading stdin until killed
+            waiting.kill()
+            async with asyncio.timeout(10):
+                assert await waiting.wait() != 0
+        finally:
+            await server.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from codeborn.config import MapNoise, get_config
+from codeborn.generators.army import starting_army
+from codeborn.generators.map import ArmyIndex, TerrainGenerator, random_location
+from codeborn.model import Bot, Location, TerrainType, User
+
+
+def test_random_location_reuses_army_index(run_db, queries):
+    config = get_config().generators.map.model_copy(update={'width': 4, 'height': 4, 'chunk_size': 2})
+
+    async def scenario() -> None:
+        await Location.bulk_create([Location(x=x, y=y, terrain=TerrainType.plains) for x in range(4) for y in range(4)])
+        army_index = ArmyIndex(config)
+        occupied = set()
+
+        queries.clear()
+        for name in ['first', 'second', 'third']:
+            bot = await Bot.create(name=name, user=await User.create())
+            index = await army_index.get()
+            location = await random_location(config, index)
+            army = await starting_army(bot, location, get_config().generators.army)
+            index.add(army.gid, location.x, location.y)
+            occupied.add((location.x, location.y))
+
+        assert len(occupied) == 3
+        assert sum('FROM "army"' in query for query in queries) == 1
+
+    run_db(scenario)
+
+
+@pytest.mark.parametrize('noise', [MapNoise.fractal, MapNoise.legacy])
+def test_terrain_block_matches_full_map(noise):
+    config = get_config().generators.map.model_copy(update={'width': 48, 'height': 40, 'seed': 7, 'noise': noise})
+    full = TerrainGenerator(config).block(np.arange(config.width), np.arange(config.height))
+
+    columns, rows = np.arange(10, 30), np.arange(25, 40)
+    block = TerrainGenerator(config).block(columns, rows)
+
+    np.testing.assert_array_equal(block, full[np.ix_(rows, columns)])
+    assert block.dtype == np.uint8
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import sys
+from pathlib import Path
+
+import pytest
+
+from codeborn.config import get_config
+from codeborn.engine.agents.pool import ContainerPool
+
+
+# Runs containers as local processes, a container's file system is a directory named after it
+FAKE_DOCKER = '''#!{python}
+import os
+import shutil
+import sys
+from pathlib import Path
+
+root = Path(os.environ['FAKE_DOCKER_ROOT'])
+command, *args = sys.argv[1:]
+with (root / 'calls.log').open('a') as log:
+    log.write(' '.join([command, *args]) + '\\n')
+
+if command == 'run':
+    container = root / args[args.index('--name') + 1]
+    container.mkdir()
+    os.chdir(container)
+    os.execv(sys.executable, [
+        sys.executable, '-c',
+        'import runpy, sys; sys.path.insert(0, "."); '
+        'runpy.run_module(sys.stdin.buffer.readline().decode().strip(), run_name="__main__", alter_sys=True)',
+    ])
+elif command == 'cp':
+    source, target = args
+    name, path = target.split(':', 1)
+    if not (root / name).is_dir():
+        sys.exit(f'Error: No such container: {{name}}')
+    shutil.copytree(source, root / name / path.lstrip('/'))
+elif command == 'rm':
+    shutil.rmtree(root / args[-1], ignore_errors=True)
+'''
+
+
+@pytest.fixture
+def docker(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Put a fake `docker` executable on PATH, get its root directory."""
+    bin_dir, root = tmp_path / 'bin', tmp_path / 'docker'
+    bin_dir.mkdir()
+    root.mkdir()
+    executable = bin_dir / 'docker'
+    executable.write_text(FAKE_DOCKER.format(python=sys.executable))
+    executable.chmod(0o755)
+    monkeypatch.setenv('PATH', f'{bin_dir}:{Path(sys.executable).parent}:/usr/bin:/bin')
+    monkeypatch.setenv('FAKE_DOCKER_ROOT', str(root))
+    return root
+
+
+@pytest.fixture
+def bot_package(tmp_path: Path) -> Path:
+    """Create a bot package echoing a line of stdin."""
+    package = tmp_path / 'echo_bot'
+    package.mkdir()
+    (package / '__main__.py').write_text('import sys\nprint(sys.stdin.readline().strip().upper(), flush=True)\n')
+    return package
+
+
+def pool_config(size: int = 2, idle_ttl: float = 60.0):
+    config = get_config().agents.model_copy(deep=True)
+    config.pool.size, config.pool.idle_ttl, config.pool.interval = size, idle_ttl, 0.05
+    return config
+
+
+async def fill(pool: ContainerPool, size: int) -> asyncio.Task:
+    """Run the pool until it has `size` idle containers."""
+    task = asyncio.create_task(pool.run())
+    async with asyncio.timeout(10):
+        while len(pool._idle) < size:
+            await asyncio.sleep(0.01)
+    return task
+
+
+async def stop(task: asyncio.Task) -> None:
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+
+async def talk(container, line: str) -> str:
+    """Send a line to the bot running in a container and read its reply."""
+    container.process.stdin.write(f'{line}\n'.encode())
+    await container.process.stdin.drain()
+    async with asyncio.timeout(10):
+        return (await container.process.stdout.readline()).decode().strip()
+
+
+async def finish(container) -> None:
+    """Wait for the bot in a container to exit, kill it if it doesn't."""
+    with contextlib.suppress(ProcessLookupError):
+        container.process.kill()
+    await container.process.wait()
+
+
+def calls(docker: Path, command: str) -> list[str]:
+    return [line for line in (docker / 'calls.log').read_text().splitlines() if line.startswith(command)]
+
+
+def test_acquire_starts_container_when_pool_is_empty(docker, bot_package):
+    async def scenario() -> None:
+        pool = ContainerPool(pool_config())
+        container = await pool.acquire()
+        await pool.attach(container, bot_package)
+
+        assert await talk(container, 'hello') == 'HELLO'
+        assert len(calls(docker, 'run')) == 1
+        await finish(container)
+        await pool.close()
+
+    asyncio.run(scenario())
+
+
+def test_acquire_reuses_idle_container(docker, bot_package):
+    async def scenario() -> None:
+        pool = ContainerPool(pool_config())
+        task = await fill(pool, 2)
+        idle = list(pool._idle)
+
+        container = await pool.acquire()
+        assert container is idle[0]
+        await pool.attach(container, bot_package)
+        assert await talk(container, 'reused') == 'REUSED'
+
+        await stop(task)
+        await pool.close()
+        await finish(container)
+
+    asyncio.run(scenario())
+
+
+def test_expired_containers_are_recycled(docker):
+    async def scenario() -> None:
+        pool = ContainerPool(pool_config(idle_ttl=0.2))
+        task = await fill(pool, 2)
+        first = {container.name for container in pool._idle}
+
+        async with asyncio.timeout(10):
+            while first & {container.name for container in pool._idle} or len(pool._idle) < 2:
+                await asyncio.sleep(0.05)
+
+        await stop(task)
+        await pool.close()
+        removed = {line.split()[-1] for line in calls(docker, 'rm')}
+        assert first <= removed
+
+    asyncio.run(scenario())
+
+
+def test_dead_container_is_replaced(docker, bot_package):
+    async def scenario() -> None:
+        pool = ContainerPool(pool_config())
+        task = await fill(pool, 1)
+        await stop(task)
+
+        dead = pool._idle[0]
+        await finish(dead)
+
+        container = await pool.acquire()
+        assert container is not dead
+        assert dead.name in {line.split()[-1] for line in calls(docker, 'rm')}
+
+        await pool.attach(container, bot_package)
+        assert await talk(container, 'alive') == 'ALIVE'
+        await finish(container)
+
+    asyncio.run(scenario())
+
+
+def test_attach_to_removed_container_fails(docker, bot_package):
+    async def scenario() -> None:
+        pool = ContainerPool(pool_config())
+        container = await pool.acquire()
+        await pool._discard(container)
+
+        with pytest.raises(RuntimeError, match='No such container'):
+            await pool.attach(container, bot_package)
+
+    asyncio.run(scenario())
@@ -0,0 +1,98 @@
+"""Number of SQL queries of command handlers.
+
+Handlers only change the in-memory world, a tick persists all their changes with
+a fixed number of bulk statements, however many commands it resolved.
+"""
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+
+from codeborn.client.messages import ApiMessage, MessageType
+from codeborn.config import get_config
+from codeborn.engine.commands import Router, army
+from codeborn.engine.world import World
+from codeborn.model import Army, Bot, Location, TerrainType, Unit, UnitType, User
+
+ARMIES = 4
+
+
+async def create_world() -> tuple[World, Bot]:
+    """Create a map and a bot with armies of two units at the same location."""
+    await Location.bulk_create([Location(x=x, y=y, terrain=TerrainType.plains) for x in range(3) for y in range(3)])
+    bot = await Bot.create(name='bot', user=await User.create())
+    location = await Location.get(x=0, y=0)
+    for _ in range(ARMIES):
+        army = await Army.create(bot=bot, location=location)
+        await Unit.create(army=army, type=UnitType.light_infantry, count=10)
+        await Unit.create(army=army, type=UnitType.archer, count=10)
+
+    world = World(chunk_size=2)
+    await world.load()
+    return world, bot
+
+
+@pytest.fixture
+def router() -> Router:
+    """Get a router of army commands with its own pending commands and held responses."""
+    return Router(routers=[army.router])
+
+
+async def resolve(
+    router: Router,
+    world: World,
+    agent: Any,
+    payloads: list[dict[str, Any]],
+    queries: list[str],
+) -> list[str]:
+    """Resolve commands in a single tick, get queries it ran."""
+    for payload in payloads:
+        router.enqueue(agent, ApiMessage(type=MessageType.command, payload=payload))
+
+    queries.clear()
+    await router.resolve_tick(world, get_config().agents.command_tick)
+    assert [response.payload['status'] for response in agent.sent] == ['success'] * len(payloads)
+    return [query.split(' ', 1)[0] for query in queries]
+
+
+def test_move_queries(run_db, make_agent, queries, router):
+    async def scenario() -> None:
+        world, bot = await create_world()
+        payloads = [
+            {'command': 'move', 'army_gid': str(army.gid), 'location': {'x': 1, 'y': 1}}
+            for army in world.get_bot_armies(bot.gid)
+        ]
+
+        assert await resolve(router, world, make_agent(bot.gid), payloads, queries) == ['UPDATE', 'UPDATE']
+
+    run_db(scenario)
+
+
+def test_split_queries(run_db, make_agent, queries, router):
+    async def scenario() -> None:
+        world, bot = await create_world()
+        payloads = [
+            {'command': 'split', 'army_gid': str(army.gid), 'units': {str(army.units[0].gid): 4}}
+            for army in world.get_bot_armies(bot.gid)
+        ]
+
+        assert await resolve(router, world, make_agent(bot.gid), payloads, queries) == ['INSERT', 'INSERT', 'UPDATE']
+        assert await Army.all().count() == 2 * ARMIES
+
+    run_db(scenario)
+
+
+def test_merge_queries(run_db, make_agent, queries, router):
+    async def scenario() -> None:
+        world, bot = await create_world()
+        armies = world.get_bot_armies(bot.gid)
+        payloads = [
+            {'command': 'merge', 'armies': [str(armies[0].gid), str(armies[1].gid)]},
+            {'command': 'merge', 'armies': [str(armies[2].gid), str(armies[3].gid)]},
+        ]
+
+        assert await resolve(router, world, make_agent(bot.gid), payloads, queries) == ['DELETE', 'UPDATE', 'DELETE']
+        assert await Army.all().count() == ARMIES // 2
+
+    run_db(scenario)
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Any
+from uuid import uuid4
+
+from codeborn.client.messages import ApiMessage, MessageType
+from codeborn.config import get_config
+from codeborn.engine.agents import BotAgent
+from codeborn.engine.agents.registry import AgentRegistry
+from codeborn.engine.lifecycle import heartbeat
+
+
+async def on_message(agent: BotAgent, message: ApiMessage) -> None:
+    pass
+
+
+def test_remove_agent_is_idempotent(make_agent):
+    async def scenario() -> None:
+        registry = AgentRegistry(get_config().agents, on_message)
+        agent = make_agent()
+        await registry.add_agent(agent)
+
+        removed = await asyncio.gather(*(registry.remove_agent(agent.bot.gid, agent) for _ in range(3)))
+
+        assert sorted(removed) == [False, False, True]
+        assert agent.stops == 1
+        assert await registry.remove_agent(agent.bot.gid) is False
+        assert registry._locks == {}
+
+    asyncio.run(scenario())
+
+
+def test_remove_agent_keeps_replacement(make_agent):
+    async def scenario() -> None:
+        registry = AgentRegistry(get_config().agents, on_message)
+        bot_gid = uuid4()
+        stale, replacement = make_agent(bot_gid), make_agent(bot_gid)
+        await registry.add_agent(stale)
+        await registry.remove_agent(bot_gid)
+        await registry.add_agent(replacement)
+
+        assert await registry.remove_agent(bot_gid, stale) is False
+        assert await registry.get_agent(bot_gid) is replacement
+        assert replacement.stops == 0
+
+        await registry.remove_all()
+        assert await registry.get_agents() == []
+        assert registry._locks == {}
+
+    asyncio.run(scenario())
+
+
+def test_heartbeat_ignores_starting_agent(make_agent):
+    class SlowAgent(make_agent):
+        """Agent whose process is up only once its slow start finishes."""
+
+        started = False
+
+        @property
+        def is_alive(self) -> bool:
+            return self.started and not self.stops
+
+        async def start(self, on_message: Any) -> None:
+            await asyncio.sleep(0.2)
+            self.started = True
+
+    async def scenario() -> None:
+        config = get_config().agents
+        registry = AgentRegistry(config, on_message)
+        changes = SimpleNamespace(pushed=[])
+        changes.push = changes.pushed.append
+        agent = SlowAgent()
+        agent.last_heartbeat = datetime.now(timezone.utc)
+
+        heartbeats = asyncio.create_task(heartbeat(
+            config.heartbeat.model_copy(update={'interval': 0.01}), config.fanout, registry, changes,  # type: ignore
+        ))
+        await registry.add_agent(agent)
+        await asyncio.sleep(0.05)
+        heartbeats.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await heartbeats
+
+        assert await registry.get_agent(agent.bot.gid) is agent
+        assert agent.stops == 0
+        assert changes.pushed == []
+        assert agent.sent and agent.sent[0].type == MessageType.heartbeat_request
+
+    asyncio.run(scenario())
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+from structlog import BoundLogger
+
+from codeborn.client.messages import ApiMessage, MessageType
+from codeborn.config import CommandTickConfig
+from codeborn.engine.agents import BotAgent
+from codeborn.engine.commands import Router, success_response
+
+
+class FlakyWorld:
+    """World whose flush fails a given number of times."""
+
+    def __init__(self, failures: int) -> None:
+        self.failures = failures
+
+    async def flush(self) -> None:
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError('Database is gone.')
+
+
+def command(name: str) -> ApiMessage:
+    return ApiMessage(type=MessageType.command, payload={'command': name})
+
+
+def tick_config(max_held: int = 100, max_failed_flushes: int = 10) -> CommandTickConfig:
+    return CommandTickConfig(enabled=True, interval=0.5, max_held=max_held, max_failed_flushes=max_failed_flushes)
+
+
+def make_router() -> Router:
+    router = Router()
+
+    @router.route('noop')
+    async def noop(message: ApiMessage, agent: BotAgent, world: Any, logger: BoundLogger) -> dict[str, Any]:
+        return success_response()
+
+    @router.route('crash')
+    async def crash(message: ApiMessage, agent: BotAgent, world: Any, logger: BoundLogger) -> dict[str, Any]:
+        raise RuntimeError('Handler bug.')
+
+    return router
+
+
+def test_resolve_tick_holds_responses_until_flushed(make_agent):
+    async def scenario() -> None:
+        router, world, agent = make_router(), FlakyWorld(failures=1), make_agent()
+        first, second = command('noop'), command('noop')
+
+        router.enqueue(agent, first)
+        assert await router.resolve_tick(world, tick_config()) == 1  # type: ignore
+        assert agent.sent == []
+
+        router.enqueue(agent, second)
+        assert await router.resolve_tick(world, tick_config()) == 1  # type: ignore
+        assert [response.response_to for response in agent.sent] == [first.gid, second.gid]
+        assert all(response.payload['status'] == 'success' for response in agent.sent)
+
+    asyncio.run(scenario())
+
+
+def test_resolve_tick_answers_held_responses_with_errors(make_agent):
+    async def scenario() -> None:
+        router, world, agent = make_router(), FlakyWorld(failures=10), make_agent()
+        config = tick_config(max_held=2, max_failed_flushes=3)
+
+        for _ in range(2):
+            router.enqueue(agent, command('noop'))
+            await router.resolve_tick(world, config)  # type: ignore
+        assert agent.sent == []
+
+        router.enqueue(agent, command('noop'))
+        await router.resolve_tick(world, config)  # type: ignore
+        assert [response.payload['reason'] for response in agent.sent] == ['World not persisted'] * 3
+        assert router._unflushed == []
+
+    asyncio.run(scenario())
+
+
+def test_failing_command_gets_error_response(make_agent):
+    async def scenario() -> None:
+        router, agent = make_router(), make_agent()
+        queued, immediate = command('crash'), command('crash')
+
+        router.enqueue(agent, queued)
+        await router.resolve_tick(FlakyWorld(failures=0), tick_config())  # type: ignore
+        assert await router.match(agent, immediate, FlakyWorld(failures=0))  # type: ignore
+
+        assert [response.response_to for response in agent.sent] == [queued.gid, immediate.gid]
+        assert all(response.payload == {'status': 'error', 'reason': 'Command failed', 'command': 'crash'}
+                   for response in agent.sent)
+
+    asyncio.run(scenario())
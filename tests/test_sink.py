@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from tortoise.exceptions import DBConnectionError
+
+from codeborn.client.messages import ApiMessage, MessageType
+from codeborn.config import MessageSinkConfig
+from codeborn.engine.sink import MessageSink
+from codeborn.model import Bot, Message, User
+
+
+def sink_config() -> MessageSinkConfig:
+    return MessageSinkConfig(batch_size=2, flush_interval=1.0, max_size=100, retry_max=1.0)
+
+
+def test_flush_isolates_bad_messages(run_db):
+    async def scenario() -> None:
+        bot = await Bot.create(name='bot', user=await User.create())
+        sink = MessageSink(sink_config())
+
+        duplicate = ApiMessage(type=MessageType.bot_log, payload={'message': 'first'})
+        ancient = ApiMessage(type=MessageType.bot_log, datetime=datetime(1970, 1, 1, tzinfo=timezone.utc))
+        for message in [duplicate, ancient, duplicate, ApiMessage(type=MessageType.command)]:
+            await sink.put(bot.gid, message)
+
+        before = datetime.now(timezone.utc)
+        await sink.flush()
+
+        messages = await Message.filter(bot_id=bot.gid)
+        assert len(messages) == 3
+        assert {message.gid for message in messages} >= {duplicate.gid, ancient.gid}
+        assert all(before - message.datetime < timedelta(minutes=1) for message in messages)
+
+    run_db(scenario)
+
+
+def test_flush_keeps_messages_while_database_is_unavailable(run_db, monkeypatch):
+    async def scenario() -> None:
+        bot = await Bot.create(name='bot', user=await User.create())
+        sink = MessageSink(sink_config())
+        bulk_create = Message.bulk_create
+        outage = {'calls': 2}
+
+        async def flaky_bulk_create(rows: list[Message]) -> None:
+            if outage['calls']:
+                outage['calls'] -= 1
+                raise DBConnectionError('Connection refused.')
+            await bulk_create(rows)
+
+        messages = [ApiMessage(type=MessageType.bot_log, payload={'message': str(i)}) for i in range(3)]
+        for message in messages:
+            await sink.put(bot.gid, message)
+
+        monkeypatch.setattr(Message, 'bulk_create', flaky_bulk_create)
+        for _ in range(2):
+            with pytest.raises(DBConnectionError):
+                await sink.flush()
+            assert await Message.all().count() == 0
+
+        await sink.flush()
+        monkeypatch.undo()
+
+        assert {message.gid for message in await Message.filter(bot_id=bot.gid)} == {m.gid for m in messages}
+        assert sink._batch == []
+
+    run_db(scenario)
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import copy
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from codeborn.client.bot import Bot as ClientBot
+from codeborn.client.messages import ApiMessage, MessageType
+from codeborn.client.state import apply_state_delta
+from codeborn.engine.state import StateSyncTracker, build_state_snapshots, diff_state
+from codeborn.engine.world import World
+from codeborn.model import Bot, User
+
+STARTED_AT = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def unit(gid: str, count: int) -> dict[str, Any]:
+    return {'gid': gid, 'type': 'archer', 'count': count, 'stamina': 1.0}
+
+
+def army(gid: str, x: int, units: list[dict[str, Any]]) -> dict[str, Any]:
+    return {'gid': gid, 'location': {'x': x, 'y': 0}, 'units': units}
+
+
+def game_state(armies: list[dict[str, Any]], state: str, visible_x: int) -> dict[str, Any]:
+    me = {
+        'gid': 'bot',
+        'name': 'bot',
+        'state': state,
+        'last_heartbeat': STARTED_AT.isoformat(),
+        'start_at': STARTED_AT.isoformat(),
+        'heartbeat_age_sec': 0.0,
+        'uptime_sec': 0.0,
+        'armies': armies,
+    }
+    return {'me': me, 'visible': {'terrain': [{'x': visible_x, 'y': 0, 'rows': [[0]]}], 'armies': []}}
+
+
+def normalized(state: dict[str, Any]) -> dict[str, Any]:
+    """Sort armies and units by gid, deltas don't keep their order."""
+    state = copy.deepcopy(state)
+    state['me']['armies'] = sorted(state['me']['armies'], key=lambda army: army['gid'])
+    for army in state['me']['armies']:
+        army['units'] = sorted(army['units'], key=lambda unit: unit['gid'])
+    return state
+
+
+PREVIOUS = game_state([
+    army('a', 0, [unit('u1', 10), unit('u2', 5)]),
+    army('b', 1, [unit('u3', 3)]),
+    army('d', 2, [unit('u5', 1)]),
+], state='starting', visible_x=0)
+
+CURRENT = game_state([
+    army('a', 1, [unit('u1', 8), unit('u6', 2)]),  # Moved, a unit changed and a unit added
+    army('b', 1, [unit('u2', 5)]),  # A unit removed, another one moved in
+    army('c', 3, [unit('u4', 4)]),  # Added with its unit, `d` is removed with its unit
+], state='running', visible_x=1)
+
+
+def test_delta_roundtrip():
+    delta = diff_state(PREVIOUS['me'], CURRENT['me'])
+    delta['visible'] = CURRENT['visible']
+    state = copy.deepcopy(PREVIOUS)
+
+    apply_state_delta(state, delta)
+
+    assert normalized(state) == normalized(CURRENT)
+    assert delta['me'] == {'state': 'running'}
+
+
+def test_client_follows_versions_and_resets():
+    tracker, client = StateSyncTracker(), ClientBot()
+
+    def sync(state: dict[str, Any]) -> None:
+        payload = tracker.encode(copy.deepcopy(state))
+        client._sync_game_state(ApiMessage(type=MessageType.state_sync, payload=payload, datetime=STARTED_AT))
+
+    sync(PREVIOUS)
+    sync(CURRENT)
+    assert client.game_state_version == 2
+    assert normalized(client.game_state) == normalized(CURRENT)
+
+    tracker.encode(copy.deepcopy(PREVIOUS))  # Lost on the way, the next delta doesn't apply
+    sync(CURRENT)
+    assert client.game_state_version is None
+
+    tracker.reset()  # The client reported `state_version=None` in its heartbeat
+    sync(PREVIOUS)
+    assert client.game_state_version == 5
+    assert normalized(client.game_state) == normalized(PREVIOUS)
+
+
+def test_client_derives_ages_after_delta():
+    tracker, client = StateSyncTracker(), ClientBot()
+    later = copy.deepcopy(PREVIOUS)
+    later['me']['heartbeat_age_sec'] = later['me']['uptime_sec'] = 60.0
+    sent_at = STARTED_AT + timedelta(seconds=90)
+
+    for state in [PREVIOUS, later]:
+        payload = tracker.encode(copy.deepcopy(state))
+        client._sync_game_state(ApiMessage(type=MessageType.state_sync, payload=payload, datetime=sent_at))
+
+    assert payload['delta']['me'] == {}
+    assert client.game_state['me']['heartbeat_age_sec'] == client.game_state['me']['uptime_sec'] == 90.0
+
+
+def test_snapshot_keeps_bot_fields(run_db):
+    async def scenario() -> None:
+        bot = await Bot.create(name='bot', user=await User.create(), last_heartbeat=STARTED_AT, start_at=STARTED_AT)
+        world = World(chunk_size=2)
+        await world.load()
+
+        me = (await build_state_snapshots(world, [bot], 1))[bot.gid]['me']
+
+        assert me['last_heartbeat'] == me['start_at'] == STARTED_AT.isoformat()
+        assert me['heartbeat_age_sec'] > 0 and me['uptime_sec'] > 0
+
+    run_db(scenario)
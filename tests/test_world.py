@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+from codeborn.engine.world import World
+from codeborn.model import Army, Bot, Location, TerrainType, Unit, UnitType, User
+
+
+async def create_bot(name: str) -> Bot:
+    """Create a bot with an army of a single unit at the first location."""
+    user = await User.create()
+    bot = await Bot.create(name=name, user=user)
+    army = await Army.create(bot=bot, location=await Location.get(x=0, y=0))
+    await Unit.create(army=army, type=UnitType.light_infantry, count=10)
+    return bot
+
+
+async def create_world() -> World:
+    """Create a 3x3 map and load it into a world."""
+    await Location.bulk_create([Location(x=x, y=y, terrain=TerrainType.plains) for x in range(3) for y in range(3)])
+    return World(chunk_size=2)
+
+
+def test_deleted_bot_with_dirty_armies_flushes(run_db):
+    async def scenario() -> None:
+        world = await create_world()
+        bot = await create_bot('deleted')
+        other = await create_bot('other')
+        await world.load()
+
+        army = world.get_bot_armies(bot.gid)[0]
+        world.move_army(army, world.get_location(1, 1))
+        world.add_unit(army, UnitType.light_infantry, 5, 1.0)
+        world.add_army(bot.gid, world.get_location(2, 2))
+        other_army = world.get_bot_armies(other.gid)[0]
+        world.move_army(other_army, world.get_location(0, 1))
+
+        await bot.delete()
+        world.unload_bot(bot.gid)
+        await world.flush()
+
+        assert world.get_bot_armies(bot.gid) == []
+        assert world.get_armies_within(world.get_location(1, 1), 1) == [other_army]
+        assert not world.is_dirty
+        assert await Army.filter(bot_id=bot.gid).count() == 0
+        assert await Army.filter(location__x=0, location__y=1).values_list('gid', flat=True) == [other_army.gid]
+
+    run_db(scenario)
+
+
+def test_commit_drops_changes_violating_integrity(run_db):
+    async def scenario() -> None:
+        world = await create_world()
+        bot = await create_bot('deleted')
+        other = await create_bot('other')
+        await world.load()
+
+        await bot.delete()  # The world was not told, its armies now violate the foreign key
+        world.add_army(bot.gid, world.get_location(2, 2))
+        other_army = world.get_bot_armies(other.gid)[0]
+        world.move_army(other_army, world.get_location(0, 1))
+
+        await world.flush()
+
+        assert not world.is_dirty
+        assert await Army.filter(bot_id=bot.gid).count() == 0
+        assert await Army.filter(location__x=0, location__y=1).values_list('gid', flat=True) == [other_army.gid]
+        assert [army.location.y for army in world.get_bot_armies(bot.gid)] == [0]  # The dropped army is forgotten
+
+    run_db(scenario)
+
+
+def test_dropped_change_reloads_stored_state(run_db):
+    async def scenario() -> None:
+        world = await create_world()
+        bot = await create_bot('bot')
+        await world.load()
+        await Location.filter(x=2, y=2).delete()  # The world still has it, moving there violates the foreign key
+
+        army = world.get_bot_armies(bot.gid)[0]
+        world.move_army(army, world.get_location(2, 2))
+        world.update_unit(army.units[0], count=5)
+        await world.flush()
+
+        reloaded = world.get_army(bot.gid, army.gid)
+        assert not world.is_dirty
+        assert reloaded is not army
+        assert (reloaded.location.x, reloaded.location.y) == (0, 0)
+        assert [unit.count for unit in reloaded.units] == [5]
+        assert world.get_armies_within(world.get_location(0, 0), 0) == [reloaded]
+
+    run_db(scenario)
+
+
+def test_commit_takes_rows_before_writing(run_db, monkeypatch):
+    async def scenario() -> None:
+        world = await create_world()
+        bot = await create_bot('bot')
+        await world.load()
+
+        moved = world.get_bot_armies(bot.gid)[0]
+        world.move_army(moved, world.get_location(1, 1))
+        world.add_army(bot.gid, world.get_location(2, 2))
+        bulk_create = Army.bulk_create
+
+        async def remove_then_create(rows: list[Army]) -> None:
+            world.remove_army(moved)  # A command running while the commit awaits
+            await bulk_create(rows)
+
+        monkeypatch.setattr(Army, 'bulk_create', remove_then_create)
+        await world.flush()
+        monkeypatch.undo()
+
+        assert await Army.filter(bot_id=bot.gid).count() == 2
+        assert await Army.get(gid=moved.gid).values_list('location__x', flat=True) == 1
+        assert world.is_dirty
+        await world.flush()
+        assert await Army.filter(bot_id=bot.gid).count() == 1
+
+    run_db(scenario)